@@ -1,20 +1,362 @@
-from fastapi import APIRouter, Depends
-from sqlmodel import Session
+import asyncio
+import os
+from datetime import datetime
+from typing import List, Optional
 
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from services.broadcast import BroadcastHub, Message
 from services.exchange_rate_service import ExchangeRateService
+from services.snapshot_cache import Snapshot, SnapshotCache
+from services.shared_snapshot import DEFAULT_CAPACITY, SharedSnapshotFile
+from services.serialized_snapshot import SerializedSnapshot
+from services.write_behind import WriteBehindQueue
 from repositories.exchange_rate_repository import ExchangeRateRepository
-from external.dolar_api_client import DolarApiClient
-from database.connection import get_session
+from repositories.exchange_history_repository import (
+    ExchangeHistoryRepository,
+    decode_cursor,
+    encode_cursor,
+    to_utc
+)
+from external.dolar_api_client import dolar_api_client
+from api.http_cache import cache_control, etag_matches
+from api.responses import PreSerializedJSONResponse, select_encoding
+from metrics.instruments import registry
+from metrics.timing import request_phase
+from database.connection import async_session_maker, get_async_session
+from repositories.exchange_db_repository import to_exchange_rate
+from models.exchange_rate import (
+    ExchangeRate,
+    ExchangeRateResponse,
+    ExchangeRateHistoryItem,
+    ExchangeRateHistoryPage
+)
 
 route = APIRouter(prefix="/api/exchange", tags=["exchange"])
 
+CACHE_TTL_SECONDS = float(os.getenv("EXCHANGE_CACHE_TTL_SECONDS", "60"))
+CACHE_MAX_STALENESS_SECONDS = float(os.getenv("EXCHANGE_CACHE_MAX_STALENESS_SECONDS", "600"))
+PERSIST_BATCH_SIZE = int(os.getenv("PERSIST_BATCH_SIZE", "20"))
+PERSIST_MAX_DELAY_SECONDS = float(os.getenv("PERSIST_MAX_DELAY_SECONDS", "1"))
+PERSIST_QUEUE_MAXSIZE = int(os.getenv("PERSIST_QUEUE_MAXSIZE", "100"))
+# Archivo mmap donde el líder publica el snapshot para los demás workers (vacío = deshabilitado)
+SHARED_SNAPSHOT_PATH = os.getenv("SHARED_SNAPSHOT_PATH", "")
+SHARED_SNAPSHOT_CAPACITY = int(os.getenv("SHARED_SNAPSHOT_CAPACITY", str(DEFAULT_CAPACITY)))
+HISTORY_MAX_PAGE_SIZE = 1000
+STREAM_HEARTBEAT_SECONDS = float(os.getenv("STREAM_HEARTBEAT_SECONDS", "15"))
+# Mensajes encolados por suscriptor antes de resincronizarlo con el estado completo
+STREAM_MAX_PENDING = int(os.getenv("STREAM_MAX_PENDING", "32"))
+
+
+async def flush_snapshots(responses: List[ExchangeRateResponse]) -> None:
+    async with async_session_maker() as session:
+        await service.persist_responses_async(responses, session)
+
+
 # Inyección de dependencias
-api_client = DolarApiClient()
-api_repository = ExchangeRateRepository(api_client)
-service = ExchangeRateService(api_repository)
+persist_queue: WriteBehindQueue[ExchangeRateResponse] = WriteBehindQueue(
+    flush=flush_snapshots,
+    max_batch=PERSIST_BATCH_SIZE,
+    max_delay=PERSIST_MAX_DELAY_SECONDS,
+    maxsize=PERSIST_QUEUE_MAXSIZE
+)
+api_repository = ExchangeRateRepository.from_env(dolar_api_client)
+service = ExchangeRateService(
+    api_repository,
+    persist_queue=persist_queue,
+    fallback_session_factory=async_session_maker
+)
+history_repository = ExchangeHistoryRepository()
+shared_snapshot: Optional[SharedSnapshotFile] = (
+    SharedSnapshotFile(SHARED_SNAPSHOT_PATH, capacity=SHARED_SNAPSHOT_CAPACITY)
+    if SHARED_SNAPSHOT_PATH else None
+)
+
+
+async def fetch_snapshot() -> SerializedSnapshot:
+    # La persistencia va a la cola write-behind: el request no espera el commit
+    return await service.get_serialized_snapshot(persist=True)
+
+
+def share_snapshot(serialized: SerializedSnapshot) -> None:
+    """Publica lo traído de la API para los demás workers; si falla, sólo se loguea."""
+    # Un dato de fallback (stale) no se publica: los demás lo tomarían como fresco
+    if shared_snapshot is None or serialized.response.stale:
+        return
+    try:
+        shared_snapshot.publish(serialized)
+    except (ValueError, OSError) as e:
+        print(f"[CACHE] No se pudo publicar el snapshot compartido: {str(e)}")
+
+
+async def load_snapshot() -> SerializedSnapshot:
+    # Primero lo publicado por el líder, si todavía está dentro del TTL; si no
+    # hay o ya venció, se va a la API y se publica, así el resto de los
+    # workers no vuelve a consultarla
+    if shared_snapshot is not None:
+        serialized = shared_snapshot.read(max_age=CACHE_TTL_SECONDS)
+        if serialized is not None:
+            return serialized
+    serialized = await fetch_snapshot()
+    share_snapshot(serialized)
+    return serialized
+
+
+async def sync_snapshot() -> Snapshot[SerializedSnapshot]:
+    """Sincronización del scheduler: consulta la API, actualiza el cache y publica."""
+    serialized = await fetch_snapshot()
+    # Se publica antes de actualizar el cache para que la edad del snapshot
+    # sea la de esta publicación; un error al publicar sólo se loguea
+    share_snapshot(serialized)
+    return snapshot_cache.set(serialized)
+
+
+async def current_snapshot() -> Snapshot[SerializedSnapshot]:
+    # Una versión nueva publicada por el líder se adopta sin esperar al TTL;
+    # mientras no cambie, el chequeo es leer el seq del header
+    if shared_snapshot is not None and shared_snapshot.has_new_version():
+        serialized = shared_snapshot.read()
+        if serialized is not None:
+            # Se adopta con la edad de la publicación: si ya venció el TTL,
+            # get_snapshot lo refresca como a cualquier otro
+            snapshot_cache.set(serialized)
+    return await snapshot_cache.get_snapshot()
+
+
+def has_snapshot() -> bool:
+    """True si hay un snapshot en memoria o uno publicado por el líder para adoptar."""
+    if snapshot_cache.snapshot is not None:
+        return True
+    return shared_snapshot is not None and shared_snapshot.has_new_version()
+
+
+def snapshot_version(snapshot: SerializedSnapshot) -> str:
+    return snapshot.version
+
+
+def snapshot_age(snapshot: SerializedSnapshot) -> float:
+    # Lo adoptado del archivo compartido ya tiene la edad de su publicación
+    if shared_snapshot is None:
+        return 0.0
+    return shared_snapshot.age(snapshot)
+
+
+def publish_snapshot(
+    previous: Optional[Snapshot[SerializedSnapshot]],
+    current: Snapshot[SerializedSnapshot]
+) -> None:
+    """Publica en el hub el delta de cada versión nueva, serializado una sola vez."""
+    serialized = current.value
+    state = Message.build("snapshot", serialized.body, id=serialized.version)
+    if previous is None:
+        hub.publish(state, state=state)
+        return
+    delta = Message.build("delta", serialized.delta_since(previous.value), id=serialized.version)
+    hub.publish(delta, state=state)
+
+
+async def stream_tick() -> None:
+    # Con clientes conectados a los streams nadie hace polling de /api/exchange:
+    # el hub revisa periódicamente si hay versión nueva (TTL o líder)
+    await current_snapshot()
+
+
+hub = BroadcastHub(
+    max_pending=STREAM_MAX_PENDING,
+    heartbeat=STREAM_HEARTBEAT_SECONDS,
+    tick=stream_tick
+)
+
+snapshot_cache: SnapshotCache[SerializedSnapshot] = SnapshotCache(
+    loader=load_snapshot,
+    ttl=CACHE_TTL_SECONDS,
+    max_staleness=CACHE_MAX_STALENESS_SECONDS,
+    versioner=snapshot_version,
+    on_change=publish_snapshot,
+    age_of=snapshot_age
+)
+
+
+# Los componentes llevan sus propios contadores; se leen al hacer scrape
+registry.callback_counter(
+    "exchange_cache_requests",
+    "Lecturas del snapshot en memoria por resultado (hit, stale, miss)",
+    lambda: {(result,): count for result, count in snapshot_cache.stats().items()},
+    labelnames=("result",)
+)
+registry.callback_counter(
+    "exchange_sync_calls",
+    "Llamadas al fetch de la API externa: ejecutadas o agrupadas (single-flight)",
+    lambda: {
+        ("executed",): service.single_flight.executions,
+        ("coalesced",): service.single_flight.coalesced
+    },
+    labelnames=("result",)
+)
+registry.callback_counter(
+    "exchange_stream_messages",
+    "Mensajes del hub de streaming: publicados, descartados por consumidores lentos y resincronizaciones",
+    lambda: {
+        ("published",): hub.published,
+        ("dropped",): hub.dropped,
+        ("coalesced",): hub.coalesced
+    },
+    labelnames=("result",)
+)
+
+
+@route.get(
+    "/",
+    response_model=ExchangeRateResponse,
+    response_class=PreSerializedJSONResponse
+)
+async def get_exchange_rates(request: Request):
+    with request_phase("service"):
+        snapshot = await current_snapshot()
+    serialized = snapshot.value
+    encoding = select_encoding(request.headers.get("accept-encoding"), serialized.encoded)
+
+    headers = {
+        "ETag": serialized.etag(encoding),
+        "Cache-Control": cache_control(snapshot_cache.time_to_live(snapshot)),
+        "Vary": "Accept-Encoding"
+    }
+
+    if_none_match = request.headers.get("if-none-match")
+    if any(etag_matches(if_none_match, etag) for etag in serialized.etags()):
+        return PreSerializedJSONResponse(status_code=304, headers=headers)
+
+    if encoding is not None:
+        headers["Content-Encoding"] = encoding
+    return PreSerializedJSONResponse(content=serialized.content(encoding), headers=headers)
+
+
+@route.get("/history", response_model=ExchangeRateHistoryPage)
+async def get_exchange_rate_history(
+    type: str = Query(..., description="Tipo de cambio normalizado, ej: blue"),
+    start: Optional[datetime] = Query(None, alias="from"),
+    end: Optional[datetime] = Query(None, alias="to"),
+    cursor: Optional[str] = Query(None, description="nextCursor de la página anterior"),
+    limit: int = Query(100, ge=1, le=HISTORY_MAX_PAGE_SIZE),
+    session: AsyncSession = Depends(get_async_session)
+):
+    after = None
+    if cursor is not None:
+        try:
+            after = decode_cursor(cursor)
+        except (ValueError, OverflowError):
+            raise HTTPException(status_code=400, detail="Cursor inválido")
+
+    # Se pide una fila extra para saber si hay página siguiente sin un COUNT
+    with request_phase("db"):
+        rows = await history_repository.get_page_async(
+            type=type.lower().replace(" ", "_"),
+            session=session,
+            start=start,
+            end=end,
+            after=after,
+            limit=limit + 1
+        )
+
+    items = [
+        ExchangeRateHistoryItem(
+            type=row.type,
+            compra=float(row.buy),
+            venta=float(row.sell),
+            observedAt=to_utc(row.observed_at)
+        )
+        for row in rows[:limit]
+    ]
+    next_cursor = encode_cursor(items[-1].observedAt) if len(rows) > limit else None
+
+    return ExchangeRateHistoryPage(items=items, nextCursor=next_cursor)
+
+
+@route.get("/stream")
+async def stream_exchange_rates():
+    """
+    Server-Sent Events: primero el snapshot completo (event: snapshot) y
+    después un event: delta por cada sync que cambia alguna tasa.
+    """
+    # Garantiza un estado inicial; si la API falla sin fallback, responde el error
+    with request_phase("service"):
+        await current_snapshot()
+    subscription = hub.subscribe()
+
+    async def events():
+        try:
+            async for message in subscription:
+                yield message.sse
+        finally:
+            hub.unsubscribe(subscription)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@route.websocket("/ws")
+async def exchange_rates_websocket(websocket: WebSocket):
+    """Mismos mensajes que /stream, como texto JSON: {"event", "id", "data"}."""
+    await websocket.accept()
+    try:
+        await current_snapshot()
+    except HTTPException as exc:
+        await websocket.close(code=1011, reason=str(exc.detail)[:120])
+        return
+    subscription = hub.subscribe()
+    try:
+        async for message in subscription:
+            await websocket.send_text(message.ws)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        hub.unsubscribe(subscription)
+
+
+# Va después de /history y /stream: si no, se tomarían como un tipo de cambio
+@route.get(
+    "/{type}",
+    response_model=ExchangeRate,
+    response_class=PreSerializedJSONResponse
+)
+async def get_exchange_rate_by_type(type: str, request: Request):
+    key = type.lower().replace(" ", "_")
+
+    if not has_snapshot():
+        # Arranque en frío: se carga el snapshot en segundo plano y mientras
+        # tanto se responde con la fila persistida en vez de esperar a la API.
+        # La fila trae el tipo normalizado y su updated_at, no el nombre y la
+        # fecha del origen: por eso no se cachea
+        loading = snapshot_cache.schedule_refresh()
+        with request_phase("db"):
+            async with async_session_maker() as session:
+                db_rate = await service.db_repository.get_rate_by_type_async(key, session)
+        if db_rate is not None:
+            return PreSerializedJSONResponse(
+                content=to_exchange_rate(db_rate).model_dump_json().encode(),
+                headers={"Cache-Control": "no-cache"}
+            )
+        # Puede ser un tipo que la base todavía no tiene: decide el origen.
+        # Se espera la carga ya disparada (shield: si el cliente corta, la
+        # carga sigue); si falló, current_snapshot reintenta y propaga el error
+        await asyncio.shield(loading)
 
+    with request_phase("service"):
+        snapshot = await current_snapshot()
+    entry = snapshot.value.lookup(key)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"Tipo de cambio no encontrado: {type}")
 
-@route.get("/")
-async def get_exchange_rates(session: Session = Depends(get_session)):
-    result = await service.get_all_rates_with_average(session=session, persist=True)
-    return result
+    body, etag = entry
+    headers = {
+        "ETag": etag,
+        "Cache-Control": cache_control(snapshot_cache.time_to_live(snapshot))
+    }
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return PreSerializedJSONResponse(status_code=304, headers=headers)
+    return PreSerializedJSONResponse(content=body, headers=headers)
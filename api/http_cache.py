@@ -0,0 +1,21 @@
+from typing import Optional
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Comparación débil de If-None-Match (RFC 9110 §13.1.2): acepta "*",
+    listas separadas por coma y validadores con prefijo W/.
+    """
+    if not if_none_match:
+        return False
+
+    opaque = etag.removeprefix("W/")
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def cache_control(max_age: float) -> str:
+    return f"public, max-age={int(max_age)}"
@@ -0,0 +1,12 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from metrics.instruments import registry
+from metrics.registry import CONTENT_TYPE
+
+route = APIRouter(tags=["metrics"])
+
+
+@route.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    return PlainTextResponse(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,108 @@
+import cProfile
+import os
+import re
+import time
+import uuid
+from typing import Optional
+
+from metrics.timing import format_server_timing, start_request_timings
+
+PROFILE_HEADER = "x-profile"
+PROFILE_MODES = ("off", "header", "all")
+
+
+class ServerTimingMiddleware:
+    """
+    Middleware ASGI que mide las fases de cada request (service, upstream,
+    validation, average, db, serialization, ...) y las envía en el header
+    Server-Timing junto con el total.
+    """
+
+    def __init__(self, app, enabled: bool = True):
+        self.app = app
+        self.enabled = enabled
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.enabled:
+            await self.app(scope, receive, send)
+            return
+
+        timings = start_request_timings()
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                timings["total"] = time.perf_counter() - started
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", format_server_timing(timings).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
+
+
+class ProfilingMiddleware:
+    """
+    Middleware ASGI opcional que guarda un volcado cProfile (pstats) de un
+    request en `output_dir`.
+
+    - mode="header": sólo los requests con `X-Profile: 1`.
+    - mode="all": todos los requests.
+
+    cProfile mide el hilo del event loop, así que el volcado incluye lo que
+    hagan otros requests concurrentes; se perfila un request a la vez y los
+    demás pasan sin perfilar mientras tanto.
+    """
+
+    def __init__(self, app, mode: str = "off", output_dir: str = "./profiles"):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"mode debe ser uno de {PROFILE_MODES}")
+
+        self.app = app
+        self.mode = mode
+        self.output_dir = output_dir
+        self._active = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self._should_profile(scope) or self._active:
+            await self.app(scope, receive, send)
+            return
+
+        path = self._profile_path(scope)
+        profiler = cProfile.Profile()
+
+        async def send_with_profile_path(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-file", os.path.basename(path).encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        self._active = True
+        profiler.enable()
+        try:
+            await self.app(scope, receive, send_with_profile_path)
+        finally:
+            profiler.disable()
+            self._active = False
+            os.makedirs(self.output_dir, exist_ok=True)
+            profiler.dump_stats(path)
+            print(f"[PROFILE] {scope['method']} {scope['path']} -> {path}")
+
+    def _should_profile(self, scope) -> bool:
+        if self.mode == "all":
+            return True
+        if self.mode == "header":
+            return self._header(scope, PROFILE_HEADER) in ("1", "true")
+        return False
+
+    def _profile_path(self, scope) -> str:
+        slug = re.sub(r"[^A-Za-z0-9]+", "_", scope["path"]).strip("_") or "root"
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{scope['method'].lower()}-{slug}-{uuid.uuid4().hex[:8]}.prof"
+        return os.path.join(self.output_dir, name)
+
+    def _header(self, scope, name: str) -> Optional[str]:
+        for key, value in scope.get("headers", []):
+            if key.decode("latin-1").lower() == name:
+                return value.decode("latin-1").strip().lower()
+        return None
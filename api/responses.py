@@ -0,0 +1,55 @@
+from typing import Iterable, Optional
+
+from fastapi import Response
+
+# Preferencia del servidor cuando el cliente acepta varias con el mismo q
+ENCODING_PREFERENCE = ("br", "gzip")
+
+
+class PreSerializedJSONResponse(Response):
+    """
+    Respuesta JSON cuyo cuerpo ya viene serializado en bytes: no pasa por
+    jsonable_encoder ni por json.dumps en cada request.
+    """
+    media_type = "application/json"
+
+    def render(self, content) -> bytes:
+        if content is None:
+            return b""
+        if isinstance(content, (bytes, bytearray, memoryview)):
+            return bytes(content)
+        raise TypeError("PreSerializedJSONResponse sólo acepta bytes")
+
+
+def select_encoding(accept_encoding: Optional[str], available: Iterable[str]) -> Optional[str]:
+    """
+    Elige la codificación a partir de Accept-Encoding entre las disponibles.
+    Devuelve None para enviar el cuerpo sin comprimir.
+    """
+    if not accept_encoding:
+        return None
+
+    accepted = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        if token:
+            accepted[token] = quality
+
+    best = None
+    best_quality = 0.0
+    for encoding in ENCODING_PREFERENCE:
+        if encoding not in available:
+            continue
+        quality = accepted.get(encoding, accepted.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+
+    return best
@@ -0,0 +1,78 @@
+"""
+Stand-in local de dolarapi.com para benchmarks: un transporte httpx en
+memoria con latencia y tamaño de payload configurables.
+"""
+import asyncio
+import json
+from datetime import datetime, timezone
+
+import httpx
+
+
+class FakeDolarApi:
+    """
+    Responde GET /dolares con `items` cotizaciones tras `latency` segundos.
+    Con change_every=N el payload cambia cada N llamadas (precios nuevos),
+    para que el servicio tenga algo que persistir; con 0 nunca cambia.
+    Soporta If-None-Match para ejercitar el GET condicional.
+    """
+
+    def __init__(self, items: int = 7, latency: float = 0.05, change_every: int = 0):
+        if items < 1:
+            raise ValueError("items debe ser >= 1")
+        if latency < 0:
+            raise ValueError("latency debe ser >= 0")
+
+        self.items = items
+        self.latency = latency
+        self.change_every = change_every
+        self.calls = 0
+        self.not_modified = 0
+        self._generation = -1
+        self._body = b""
+        self._etag = ""
+
+    def transport(self) -> httpx.MockTransport:
+        return httpx.MockTransport(self.handle)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        if not request.url.path.endswith("/dolares"):
+            return httpx.Response(404)
+
+        body, etag = self._payload()
+        if request.headers.get("if-none-match") == etag:
+            self.not_modified += 1
+            return httpx.Response(304, headers={"ETag": etag})
+
+        return httpx.Response(
+            200,
+            content=body,
+            headers={"Content-Type": "application/json", "ETag": etag}
+        )
+
+    def _payload(self):
+        generation = (self.calls - 1) // self.change_every if self.change_every else 0
+        if generation != self._generation:
+            self._generation = generation
+            self._body = self._build_body(generation)
+            self._etag = f'"gen-{generation}"'
+        return self._body, self._etag
+
+    def _build_body(self, generation: int) -> bytes:
+        updated_at = datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp() + generation * 60
+        fecha = datetime.fromtimestamp(updated_at, tz=timezone.utc).isoformat().replace("+00:00", "Z")
+        return json.dumps([
+            {
+                "moneda": "USD",
+                "casa": f"casa_{i}",
+                "nombre": f"Casa {i}",
+                "compra": 1000.0 + i + generation,
+                "venta": 1040.0 + i + generation,
+                "fechaActualizacion": fecha
+            }
+            for i in range(self.items)
+        ]).encode()
@@ -0,0 +1,394 @@
+"""
+Benchmark de carga de GET /api/exchange con la app en proceso y un
+dolarapi falso en memoria.
+
+    python -m benchmarks.load --requests 2000 --concurrency 64 --latency 0.05
+    python -m benchmarks.load --cache-ttl 0 --backend file --change-every 10
+    python -m benchmarks.load --baseline benchmarks/results/<anterior>.json
+    python -m benchmarks.load --url http://localhost:8000   # un deploy real
+
+Informa req/s, latencias p50/p95/p99, llamadas a la API externa y filas
+escritas en la base por request, y guarda el resultado como JSON.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import asdict, dataclass, field, replace
+from typing import AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel import SQLModel
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api import exchange_routes
+from benchmarks.fake_dolarapi import FakeDolarApi
+from database.connection import build_async_engine
+from database.settings import PRODUCTION_PROFILE, TEST_PROFILE
+from external.dolar_api_client import DolarApiClient
+from metrics.instruments import ROWS_WRITTEN
+from repositories.exchange_rate_repository import ExchangeRateRepository
+from services.exchange_rate_service import ExchangeRateService
+from services.snapshot_cache import SnapshotCache
+from services.write_behind import WriteBehindQueue
+
+BACKENDS = ("memory", "file")
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+
+@dataclass
+class LoadConfig:
+    requests: int = 1000
+    concurrency: int = 32
+    warmup: int = 10
+    path: str = "/api/exchange/"
+    backend: str = "memory"
+    cache_ttl: float = 60.0
+    items: int = 7
+    latency: float = 0.05
+    change_every: int = 0
+    name: Optional[str] = None
+
+    def __post_init__(self):
+        if self.backend not in BACKENDS:
+            raise ValueError(f"backend debe ser uno de {BACKENDS}")
+        if self.requests < 1 or self.concurrency < 1:
+            raise ValueError("requests y concurrency deben ser >= 1")
+
+    @property
+    def label(self) -> str:
+        return self.name or f"{self.backend}-ttl{self.cache_ttl:g}-c{self.concurrency}"
+
+
+@dataclass
+class LoadResult:
+    config: LoadConfig
+    requests: int
+    errors: int
+    elapsed_seconds: float
+    requests_per_second: float
+    latency_ms: Dict[str, float]
+    # None cuando se mide un deploy remoto (--url): no son observables
+    upstream_calls: Optional[int]
+    db_rows_written: Optional[float]
+    db_writes_per_request: Optional[float]
+    environment: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    # Nearest-rank: siempre es un valor observado
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize_latencies(latencies: List[float]) -> Dict[str, float]:
+    values = sorted(latency * 1000 for latency in latencies)
+    return {
+        "p50": round(percentile(values, 50), 3),
+        "p95": round(percentile(values, 95), 3),
+        "p99": round(percentile(values, 99), 3),
+        "max": round(values[-1], 3) if values else 0.0,
+        "mean": round(sum(values) / len(values), 3) if values else 0.0
+    }
+
+
+@contextmanager
+def _patched(module, **attributes):
+    # Igual que los tests: se reemplazan las dependencias del módulo de rutas
+    previous = {name: getattr(module, name) for name in attributes}
+    for name, value in attributes.items():
+        setattr(module, name, value)
+    try:
+        yield
+    finally:
+        for name, value in previous.items():
+            setattr(module, name, value)
+
+
+@asynccontextmanager
+async def bench_database(backend: str) -> AsyncIterator[async_sessionmaker]:
+    """Base aislada con las tablas creadas: en memoria o en un archivo temporal."""
+    tmpdir = None
+    if backend == "file":
+        tmpdir = tempfile.mkdtemp(prefix="exchange-bench-")
+        profile = replace(
+            PRODUCTION_PROFILE,
+            name="bench-file",
+            database_url=f"sqlite:///{os.path.join(tmpdir, 'bench.db')}"
+        )
+    else:
+        profile = TEST_PROFILE
+
+    engine = build_async_engine(profile)
+    try:
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+        yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    finally:
+        await engine.dispose()
+        if tmpdir is not None:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+
+def fake_api_client(fake: FakeDolarApi) -> DolarApiClient:
+    client = DolarApiClient(base_url="http://dolarapi.bench/v1")
+    client._client = httpx.AsyncClient(transport=fake.transport())
+    return client
+
+
+@asynccontextmanager
+async def bench_app(config: LoadConfig, fake: FakeDolarApi) -> AsyncIterator[FastAPI]:
+    """
+    App con las rutas reales cableadas a una base aislada y al dolarapi
+    falso. Al salir vacía la cola de persistencia y libera todo.
+    """
+    async with bench_database(config.backend) as session_maker:
+        client = fake_api_client(fake)
+        try:
+            async with _wired_app(config, client, session_maker) as app:
+                yield app
+        finally:
+            await client.close()
+
+
+@asynccontextmanager
+async def _wired_app(
+    config: LoadConfig,
+    client: DolarApiClient,
+    session_maker: async_sessionmaker
+) -> AsyncIterator[FastAPI]:
+    async def flush(responses):
+        async with session_maker() as session:
+            await service.persist_responses_async(responses, session)
+
+    queue = WriteBehindQueue(flush=flush)
+    service = ExchangeRateService(ExchangeRateRepository(client), persist_queue=queue)
+
+    async def loader():
+        return await service.get_serialized_snapshot(persist=True)
+
+    cache = SnapshotCache(
+        loader=loader,
+        ttl=config.cache_ttl,
+        max_staleness=max(config.cache_ttl, exchange_routes.CACHE_MAX_STALENESS_SECONDS)
+        if config.cache_ttl > 0 else 0.0,
+        versioner=exchange_routes.snapshot_version
+    )
+
+    app = FastAPI()
+    app.include_router(exchange_routes.route)
+    app.state.persist_queue = queue
+
+    try:
+        with _patched(
+            exchange_routes,
+            service=service,
+            snapshot_cache=cache,
+            persist_queue=queue,
+            shared_snapshot=None
+        ):
+            yield app
+    finally:
+        await queue.stop()
+
+
+async def run_concurrently(operation: Callable[[], Awaitable[None]], total: int, concurrency: int):
+    """
+    Ejecuta `operation` `total` veces con `concurrency` workers en paralelo.
+    Devuelve las latencias, la cantidad de errores y el tiempo total.
+    """
+    tickets = itertools.count()
+    latencies: List[float] = []
+    errors = 0
+
+    async def worker():
+        nonlocal errors
+        while next(tickets) < total:
+            started = time.perf_counter()
+            try:
+                await operation()
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def drive(client: httpx.AsyncClient, path: str, requests: int, concurrency: int):
+    """Lanza `requests` GETs con `concurrency` clientes en paralelo."""
+    async def get():
+        response = await client.get(path)
+        response.raise_for_status()
+
+    return await run_concurrently(get, requests, concurrency)
+
+
+async def run_load(config: LoadConfig) -> LoadResult:
+    fake = FakeDolarApi(items=config.items, latency=config.latency, change_every=config.change_every)
+
+    async with bench_app(config, fake) as app:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            if config.warmup:
+                await drive(client, config.path, config.warmup, min(config.warmup, config.concurrency))
+                # Lo que encoló el warmup se escribe antes de medir
+                await app.state.persist_queue.stop()
+
+            upstream_before = fake.calls
+            rows_before = ROWS_WRITTEN.total()
+            latencies, errors, elapsed = await drive(
+                client, config.path, config.requests, config.concurrency
+            )
+            upstream_calls = fake.calls - upstream_before
+
+        await app.state.persist_queue.stop()
+        rows_written = ROWS_WRITTEN.total() - rows_before
+
+    return LoadResult(
+        config=config,
+        requests=config.requests,
+        errors=errors,
+        elapsed_seconds=round(elapsed, 4),
+        requests_per_second=round(config.requests / elapsed, 2) if elapsed else 0.0,
+        latency_ms=summarize_latencies(latencies),
+        upstream_calls=upstream_calls,
+        db_rows_written=rows_written,
+        db_writes_per_request=round(rows_written / config.requests, 4),
+        environment=environment()
+    )
+
+
+async def run_remote_load(url: str, config: LoadConfig) -> LoadResult:
+    """Misma carga contra un deploy ya levantado (por HTTP real)."""
+    limits = httpx.Limits(max_connections=config.concurrency, max_keepalive_connections=config.concurrency)
+    async with httpx.AsyncClient(base_url=url, timeout=30.0, limits=limits) as client:
+        if config.warmup:
+            await drive(client, config.path, config.warmup, min(config.warmup, config.concurrency))
+        latencies, errors, elapsed = await drive(client, config.path, config.requests, config.concurrency)
+
+    return LoadResult(
+        config=config,
+        requests=config.requests,
+        errors=errors,
+        elapsed_seconds=round(elapsed, 4),
+        requests_per_second=round(config.requests / elapsed, 2) if elapsed else 0.0,
+        latency_ms=summarize_latencies(latencies),
+        upstream_calls=None,
+        db_rows_written=None,
+        db_writes_per_request=None,
+        environment={**environment(), "url": url}
+    )
+
+
+def environment() -> Dict[str, str]:
+    info = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    try:
+        info["commit"] = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True, timeout=5
+        ).stdout.strip()
+    except Exception:
+        pass
+    return info
+
+
+def save_result(result: LoadResult, directory: str = RESULTS_DIR) -> str:
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, f"{time.strftime('%Y%m%d-%H%M%S')}-{result.config.label}.json")
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(result.to_dict(), file, indent=2, ensure_ascii=False)
+    return path
+
+
+def compare(result: LoadResult, baseline_path: str) -> Dict[str, float]:
+    """Cociente actual/baseline de req/s y de cada percentil."""
+    with open(baseline_path, encoding="utf-8") as file:
+        baseline = json.load(file)
+
+    ratios = {}
+    if baseline["requests_per_second"]:
+        ratios["requests_per_second"] = round(result.requests_per_second / baseline["requests_per_second"], 3)
+    for key, value in result.latency_ms.items():
+        if baseline["latency_ms"].get(key):
+            ratios[key] = round(value / baseline["latency_ms"][key], 3)
+    return ratios
+
+
+def print_result(result: LoadResult) -> None:
+    latency = result.latency_ms
+    print(f"\n{result.config.label}: {result.requests} requests, concurrencia {result.config.concurrency}")
+    print(f"  req/s             {result.requests_per_second:>10.2f}")
+    print(f"  p50 / p95 / p99   {latency['p50']:>8.2f} / {latency['p95']:.2f} / {latency['p99']:.2f} ms")
+    print(f"  errores           {result.errors:>10}")
+    if result.upstream_calls is not None:
+        print(f"  llamadas upstream {result.upstream_calls:>10}")
+        print(f"  filas escritas/req{result.db_writes_per_request:>10.4f}")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    defaults = LoadConfig()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=defaults.requests)
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    parser.add_argument("--warmup", type=int, default=defaults.warmup)
+    parser.add_argument("--path", default=defaults.path)
+    parser.add_argument("--backend", choices=BACKENDS, default=defaults.backend)
+    parser.add_argument("--cache-ttl", type=float, default=defaults.cache_ttl, help="0 = sin cache")
+    parser.add_argument("--items", type=int, default=defaults.items, help="Cotizaciones en el payload")
+    parser.add_argument("--latency", type=float, default=defaults.latency, help="Latencia de la API falsa (s)")
+    parser.add_argument("--change-every", type=int, default=defaults.change_every,
+                        help="El payload cambia cada N llamadas (0 = nunca)")
+    parser.add_argument("--name", default=None)
+    parser.add_argument("--output-dir", default=RESULTS_DIR)
+    parser.add_argument("--no-save", action="store_true")
+    parser.add_argument("--baseline", default=None, help="JSON de una corrida anterior para comparar")
+    parser.add_argument("--url", default=None, help="Medir un deploy en esta URL en lugar de la app en proceso")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None):
+    args = build_parser().parse_args(argv)
+    config = LoadConfig(
+        requests=args.requests,
+        concurrency=args.concurrency,
+        warmup=args.warmup,
+        path=args.path,
+        backend=args.backend,
+        cache_ttl=args.cache_ttl,
+        items=args.items,
+        latency=args.latency,
+        change_every=args.change_every,
+        name=args.name
+    )
+
+    result = asyncio.run(run_remote_load(args.url, config) if args.url else run_load(config))
+    print_result(result)
+
+    if not args.no_save:
+        print(f"  resultado         {save_result(result, args.output_dir)}")
+    if args.baseline:
+        print(f"  vs baseline       {compare(result, args.baseline)}")
+
+
+if __name__ == "__main__":
+    main()
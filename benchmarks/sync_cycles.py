@@ -0,0 +1,141 @@
+"""
+Benchmark de ciclos de sincronización completos (fetch, validación,
+promedio y persistencia inline), como los que corre el scheduler o el CLI.
+
+    python -m benchmarks.sync_cycles --cycles 200 --concurrency 8 --change-every 1
+    python -m benchmarks.sync_cycles --no-shared-service --backend file
+"""
+import argparse
+import asyncio
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+
+from benchmarks.fake_dolarapi import FakeDolarApi
+from benchmarks.load import (
+    BACKENDS,
+    bench_database,
+    environment,
+    fake_api_client,
+    run_concurrently,
+    summarize_latencies
+)
+from metrics.instruments import ROWS_WRITTEN
+from repositories.exchange_rate_repository import ExchangeRateRepository
+from services.exchange_rate_service import ExchangeRateService
+
+
+@dataclass
+class SyncConfig:
+    cycles: int = 50
+    concurrency: int = 4
+    backend: str = "memory"
+    # True: un servicio compartido (single-flight y detección de cambios);
+    # False: un servicio nuevo por ciclo, sin nada en memoria
+    shared_service: bool = True
+    items: int = 7
+    latency: float = 0.05
+    change_every: int = 1
+    name: Optional[str] = None
+
+    def __post_init__(self):
+        if self.backend not in BACKENDS:
+            raise ValueError(f"backend debe ser uno de {BACKENDS}")
+        if self.cycles < 1 or self.concurrency < 1:
+            raise ValueError("cycles y concurrency deben ser >= 1")
+
+    @property
+    def label(self) -> str:
+        service = "shared" if self.shared_service else "fresh"
+        return self.name or f"sync-{self.backend}-{service}-c{self.concurrency}"
+
+
+@dataclass
+class SyncResult:
+    config: SyncConfig
+    cycles: int
+    errors: int
+    elapsed_seconds: float
+    cycles_per_second: float
+    latency_ms: Dict[str, float]
+    upstream_calls: int
+    db_rows_written: float
+    db_writes_per_cycle: float
+    environment: Dict[str, str] = field(default_factory=dict)
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+async def run_sync_cycles(config: SyncConfig) -> SyncResult:
+    fake = FakeDolarApi(items=config.items, latency=config.latency, change_every=config.change_every)
+
+    async with bench_database(config.backend) as session_maker:
+        client = fake_api_client(fake)
+        shared = ExchangeRateService(ExchangeRateRepository(client)) if config.shared_service else None
+        # En memoria todas las sesiones comparten una única conexión (StaticPool):
+        # los ciclos se serializan; con archivo corren en paralelo (WAL + busy_timeout)
+        memory_lock = asyncio.Lock() if config.backend == "memory" else None
+
+        async def cycle():
+            service = shared or ExchangeRateService(ExchangeRateRepository(client))
+            if memory_lock is None:
+                async with session_maker() as session:
+                    await service.get_all_rates_with_average(session=session, persist=True)
+                return
+            async with memory_lock, session_maker() as session:
+                await service.get_all_rates_with_average(session=session, persist=True)
+
+        rows_before = ROWS_WRITTEN.total()
+        try:
+            latencies, errors, elapsed = await run_concurrently(cycle, config.cycles, config.concurrency)
+        finally:
+            await client.close()
+        rows_written = ROWS_WRITTEN.total() - rows_before
+
+    return SyncResult(
+        config=config,
+        cycles=config.cycles,
+        errors=errors,
+        elapsed_seconds=round(elapsed, 4),
+        cycles_per_second=round(config.cycles / elapsed, 2) if elapsed else 0.0,
+        latency_ms=summarize_latencies(latencies),
+        upstream_calls=fake.calls,
+        db_rows_written=rows_written,
+        db_writes_per_cycle=round(rows_written / config.cycles, 4),
+        environment=environment()
+    )
+
+
+def main(argv: Optional[List[str]] = None):
+    defaults = SyncConfig()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cycles", type=int, default=defaults.cycles)
+    parser.add_argument("--concurrency", type=int, default=defaults.concurrency)
+    parser.add_argument("--backend", choices=BACKENDS, default=defaults.backend)
+    parser.add_argument("--no-shared-service", action="store_true", help="Un servicio nuevo por ciclo")
+    parser.add_argument("--items", type=int, default=defaults.items)
+    parser.add_argument("--latency", type=float, default=defaults.latency)
+    parser.add_argument("--change-every", type=int, default=defaults.change_every)
+    args = parser.parse_args(argv)
+
+    result = asyncio.run(run_sync_cycles(SyncConfig(
+        cycles=args.cycles,
+        concurrency=args.concurrency,
+        backend=args.backend,
+        shared_service=not args.no_shared_service,
+        items=args.items,
+        latency=args.latency,
+        change_every=args.change_every
+    )))
+
+    latency = result.latency_ms
+    print(f"\n{result.config.label}: {result.cycles} ciclos")
+    print(f"  ciclos/s          {result.cycles_per_second:>10.2f}")
+    print(f"  p50 / p95 / p99   {latency['p50']:>8.2f} / {latency['p95']:.2f} / {latency['p99']:.2f} ms")
+    print(f"  errores           {result.errors:>10}")
+    print(f"  llamadas upstream {result.upstream_calls:>10}")
+    print(f"  filas escritas/ciclo {result.db_writes_per_cycle:>7.4f}")
+
+
+if __name__ == "__main__":
+    main()
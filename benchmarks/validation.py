@@ -0,0 +1,75 @@
+"""
+Microbenchmark: validación del payload de dolarapi.
+
+Compara el parseo original (response.json() + un ExchangeRate por item con
+.get()) contra TypeAdapter.validate_json sobre los bytes crudos.
+
+    python -m benchmarks.validation --items 7 --items 500 --repeat 2000
+"""
+import argparse
+import json
+import timeit
+from typing import Any, Dict, List
+
+from models.exchange_rate import ExchangeRate
+from repositories.exchange_rate_repository import parse_rates_json
+
+
+def build_payload(items: int) -> bytes:
+    return json.dumps([
+        {
+            "moneda": "USD",
+            "casa": f"casa_{i}",
+            "nombre": f"Casa {i}",
+            "compra": 1000.0 + i,
+            "venta": 1020.0 + i,
+            "fechaActualizacion": "2025-11-13T10:00:00.000Z"
+        }
+        for i in range(items)
+    ]).encode()
+
+
+def legacy_parse(raw: bytes) -> List[ExchangeRate]:
+    raw_data: List[Dict[str, Any]] = json.loads(raw)
+    exchange_rates = []
+    for item in raw_data:
+        exchange_rates.append(ExchangeRate(
+            nombre=item.get("nombre", ""),
+            compra=item.get("compra", 0.0),
+            venta=item.get("venta", 0.0),
+            fechaActualizacion=item.get("fechaActualizacion", "")
+        ))
+    return exchange_rates
+
+
+def run(items: int, repeat: int) -> Dict[str, float]:
+    raw = build_payload(items)
+    candidates = {
+        "legacy_loop": lambda: legacy_parse(raw),
+        "validate_json_lenient": lambda: parse_rates_json(raw),
+        "validate_json_strict": lambda: parse_rates_json(raw, strict=True)
+    }
+
+    results = {}
+    for name, fn in candidates.items():
+        best = min(timeit.repeat(fn, number=repeat, repeat=5))
+        results[name] = best / repeat * 1_000_000
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--items", type=int, action="append", help="Items por payload (repetible)")
+    parser.add_argument("--repeat", type=int, default=2000, help="Iteraciones por medición")
+    args = parser.parse_args()
+
+    for items in args.items or [7, 100, 1000]:
+        results = run(items, args.repeat)
+        baseline = results["legacy_loop"]
+        print(f"\n{items} items")
+        for name, micros in results.items():
+            print(f"  {name:<24} {micros:10.2f} µs/op  x{baseline / micros:5.2f}")
+
+
+if __name__ == "__main__":
+    main()
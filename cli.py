@@ -2,16 +2,18 @@
 import asyncio
 import json
 from datetime import datetime
+from typing import List, Optional
 
 import typer
 from rich.console import Console
 from rich.panel import Panel
+from rich.table import Table
 
 from sqlmodel import Session
 from database.connection import engine, create_db_and_tables
 from services.exchange_rate_service import ExchangeRateService
 from repositories.exchange_rate_repository import ExchangeRateRepository
-from external.dolar_api_client import DolarApiClient
+from external.dolar_api_client import dolar_api_client
 
 app = typer.Typer(
     name="exchange-cli",
@@ -22,17 +24,20 @@ console = Console()
 
 
 async def sync_rates_async():
-    api_client = DolarApiClient()
-    api_repository = ExchangeRateRepository(api_client)
+    api_repository = ExchangeRateRepository.from_env(dolar_api_client)
     service = ExchangeRateService(api_repository)
     
-    with Session(engine) as session:
-        result = await service.get_all_rates_with_average(
-            session=session, 
-            persist=True
-        )
-        
-        return result
+    async with dolar_api_client:
+        try:
+            with Session(engine) as session:
+                result = await service.get_all_rates_with_average(
+                    session=session, 
+                    persist=True
+                )
+                
+                return result
+        finally:
+            await api_repository.aclose()
 
 
 @app.command("sync-rates")
@@ -76,6 +81,138 @@ def init_db():
         raise typer.Exit(code=1)
 
 
+BENCH_MODES = ("http", "sync", "both")
+
+
+def _bench_table(results: List[dict]) -> Table:
+    table = Table(title="Benchmark (latencias en ms)")
+    table.add_column("Escenario", style="cyan")
+    for header in ("Ops", "ops/s", "p50", "p95", "p99", "Err", "API", "Filas/op"):
+        table.add_column(header, justify="right", no_wrap=True)
+
+    for result in results:
+        latency = result["latency_ms"]
+        table.add_row(
+            result["label"],
+            str(result["operations"]),
+            f"{result['ops_per_second']:.2f}",
+            f"{latency['p50']:.2f}",
+            f"{latency['p95']:.2f}",
+            f"{latency['p99']:.2f}",
+            str(result["errors"]),
+            "-" if result["upstream_calls"] is None else str(result["upstream_calls"]),
+            "-" if result["writes_per_op"] is None else f"{result['writes_per_op']:.3f}"
+        )
+    return table
+
+
+async def bench_async(
+    mode: str,
+    requests: int,
+    cycles: int,
+    concurrency: int,
+    backend: str,
+    cache: bool,
+    url: Optional[str],
+    latency: float,
+    items: int,
+    change_every: int,
+    save: bool
+) -> List[dict]:
+    # Import diferido: el benchmark arma su propia base y su dolarapi falso
+    from benchmarks.load import LoadConfig, run_load, run_remote_load, save_result
+    from benchmarks.sync_cycles import SyncConfig, run_sync_cycles
+
+    results = []
+
+    if mode in ("http", "both"):
+        config = LoadConfig(
+            requests=requests,
+            concurrency=concurrency,
+            backend=backend,
+            cache_ttl=60.0 if cache else 0.0,
+            items=items,
+            latency=latency,
+            change_every=change_every
+        )
+        load = await (run_remote_load(url, config) if url else run_load(config))
+        if save:
+            save_result(load)
+        results.append({
+            "label": "http remoto" if url else f"http {backend}",
+            "operations": load.requests,
+            "ops_per_second": load.requests_per_second,
+            "latency_ms": load.latency_ms,
+            "errors": load.errors,
+            "upstream_calls": load.upstream_calls,
+            "writes_per_op": load.db_writes_per_request
+        })
+
+    if mode in ("sync", "both"):
+        config = SyncConfig(
+            cycles=cycles,
+            concurrency=concurrency,
+            backend=backend,
+            shared_service=cache,
+            items=items,
+            latency=latency,
+            change_every=change_every or 1
+        )
+        sync = await run_sync_cycles(config)
+        results.append({
+            "label": f"sync {backend}",
+            "operations": sync.cycles,
+            "ops_per_second": sync.cycles_per_second,
+            "latency_ms": sync.latency_ms,
+            "errors": sync.errors,
+            "upstream_calls": sync.upstream_calls,
+            "writes_per_op": sync.db_writes_per_cycle
+        })
+
+    return results
+
+
+@app.command("bench")
+def bench(
+    mode: str = typer.Option("http", help="http (GET /api/exchange), sync (ciclos de sincronización) o both"),
+    requests: int = typer.Option(1000, help="Requests HTTP a enviar"),
+    cycles: int = typer.Option(50, help="Ciclos de sincronización a ejecutar"),
+    concurrency: int = typer.Option(32, help="Operaciones en paralelo"),
+    backend: str = typer.Option("memory", help="Base del benchmark: memory o file (SQLite temporal)"),
+    cache: bool = typer.Option(True, "--cache/--no-cache", help="Con cache de snapshot / servicio compartido o sin nada en memoria"),
+    url: Optional[str] = typer.Option(None, help="Medir un deploy en esta URL (modo http) en lugar de la app en proceso"),
+    latency: float = typer.Option(0.05, help="Latencia simulada de la API externa (s)"),
+    items: int = typer.Option(7, help="Cotizaciones en el payload simulado"),
+    change_every: int = typer.Option(0, help="El payload simulado cambia cada N llamadas (0 = nunca)"),
+    save: bool = typer.Option(False, "--save/--no-save", help="Guardar el resultado HTTP en benchmarks/results/")
+):
+    """
+    Mide throughput y latencias (p50/p95/p99) de GET /api/exchange y/o de
+    ciclos de sincronización completos.
+    """
+    if mode not in BENCH_MODES:
+        console.print(f"\nError: --mode debe ser uno de {', '.join(BENCH_MODES)}\n")
+        raise typer.Exit(code=1)
+    if url and mode != "http":
+        console.print("\nError: --url sólo se puede usar con --mode http\n")
+        raise typer.Exit(code=1)
+
+    target = url or f"app en proceso ({backend}, {'con' if cache else 'sin'} cache)"
+    console.print(f"\nEjecutando benchmark {mode} contra {target}, concurrencia {concurrency}...\n")
+
+    try:
+        results = asyncio.run(bench_async(
+            mode, requests, cycles, concurrency, backend, cache,
+            url, latency, items, change_every, save
+        ))
+    except Exception as e:
+        console.print(f"\nError: {str(e)}\n")
+        raise typer.Exit(code=1)
+
+    console.print(_bench_table(results))
+    console.print(f"\nTimestamp: {datetime.now()}\n")
+
+
 @app.command("version")
 def version():
     """
@@ -1,12 +1,73 @@
 from sqlmodel import SQLModel, create_engine, Session
-from typing import Generator
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import Engine, event
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine, async_sessionmaker
+from sqlalchemy.pool import StaticPool
+from typing import Any, AsyncGenerator, Dict, Generator
 
-DATABASE_URL = "sqlite:///./exchange.db"
+from database.settings import EngineProfile, load_engine_profile
+from metrics.timing import request_phase
 
-engine = create_engine(
-    DATABASE_URL,
-    echo=True, 
-    connect_args={"check_same_thread": False} 
+
+def _engine_kwargs(profile: EngineProfile) -> Dict[str, Any]:
+    if profile.is_memory:
+        # Una única conexión compartida: cada conexión nueva sería otra base vacía
+        return {"echo": profile.echo, "poolclass": StaticPool}
+    return {
+        "echo": profile.echo,
+        "pool_size": profile.pool_size,
+        "max_overflow": profile.max_overflow,
+        "pool_timeout": profile.pool_timeout,
+        "pool_recycle": profile.pool_recycle,
+        "pool_pre_ping": False
+    }
+
+
+def _register_pragmas(engine: Engine, profile: EngineProfile) -> None:
+    pragmas = profile.pragmas()
+
+    @event.listens_for(engine, "connect")
+    def set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for name, value in pragmas.items():
+                cursor.execute(f"PRAGMA {name}={value}")
+        finally:
+            cursor.close()
+
+
+def build_engine(profile: EngineProfile) -> Engine:
+    engine = create_engine(
+        profile.database_url,
+        connect_args={"check_same_thread": False},
+        **_engine_kwargs(profile)
+    )
+    _register_pragmas(engine, profile)
+    return engine
+
+
+def build_async_engine(profile: EngineProfile) -> AsyncEngine:
+    engine = create_async_engine(
+        profile.async_database_url,
+        **_engine_kwargs(profile)
+    )
+    _register_pragmas(engine.sync_engine, profile)
+    return engine
+
+
+engine_profile = load_engine_profile()
+DATABASE_URL = engine_profile.database_url
+ASYNC_DATABASE_URL = engine_profile.async_database_url
+
+engine = build_engine(engine_profile)
+async_engine = build_async_engine(engine_profile)
+
+# expire_on_commit=False: con AsyncSession no se puede recargar un atributo
+# expirado de forma implícita (no hay I/O perezoso fuera de un await)
+async_session_maker = async_sessionmaker(
+    async_engine,
+    class_=AsyncSession,
+    expire_on_commit=False
 )
 
 
@@ -17,3 +78,11 @@ def create_db_and_tables():
 def get_session() -> Generator[Session, None, None]:
     with Session(engine) as session:
         yield session
+
+
+async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
+    async with async_session_maker() as session:
+        # La conexión se toma del pool acá para que su costo quede en la fase "session"
+        with request_phase("session"):
+            await session.connection()
+        yield session
@@ -20,3 +20,34 @@ class ExchangeRateDB(SQLModel, table=True):
             Decimal: float,
             datetime: lambda v: v.isoformat()
         }
+
+
+class ExchangeRateHistoryDB(SQLModel, table=True):
+    """
+    Historial append-only de cotizaciones.
+
+    La clave primaria compuesta (type, observed_at) es el índice de las
+    consultas por rango; con WITHOUT ROWID las filas quedan ordenadas
+    físicamente por esa clave y un rango es un recorrido contiguo del B-tree.
+    """
+    __tablename__: ClassVar[str] = "exchange_rate_history"
+    __table_args__: ClassVar[dict] = {"sqlite_with_rowid": False}
+    
+    type: str = Field(primary_key=True, max_length=50)
+    observed_at: datetime = Field(primary_key=True)
+    buy: Decimal = Field(default=Decimal("0.0"), max_digits=10, decimal_places=2)
+    sell: Decimal = Field(default=Decimal("0.0"), max_digits=10, decimal_places=2)
+
+
+class SchedulerLeaseDB(SQLModel, table=True):
+    """
+    Lease de liderazgo entre workers: una fila por lease (ej: "sync").
+    Lo tiene `holder` hasta `expires_at`; el líder lo renueva con un
+    heartbeat y, si muere, otro worker lo toma cuando vence.
+    """
+    __tablename__: ClassVar[str] = "scheduler_leases"
+    
+    name: str = Field(primary_key=True, max_length=50)
+    holder: str = Field(max_length=100)
+    expires_at: datetime
+    acquired_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
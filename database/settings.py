@@ -0,0 +1,133 @@
+import os
+from dataclasses import dataclass, replace
+from typing import Dict, Mapping, Optional
+
+JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+
+
+@dataclass(frozen=True)
+class EngineProfile:
+    """
+    Configuración del engine de SQLite: URL, logging, PRAGMAs por conexión
+    y tamaño del pool.
+    """
+    name: str
+    database_url: str
+    echo: bool = False
+    journal_mode: str = "WAL"
+    synchronous: str = "NORMAL"
+    mmap_size: int = 0
+    # Negativo = KiB (convención de SQLite), positivo = páginas
+    cache_size: int = -2000
+    busy_timeout_ms: int = 5000
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30.0
+    pool_recycle: int = -1
+
+    def __post_init__(self):
+        # Los PRAGMA no admiten parámetros: sólo se aceptan valores conocidos
+        if self.journal_mode.upper() not in JOURNAL_MODES:
+            raise ValueError(f"journal_mode inválido: {self.journal_mode}")
+        if self.synchronous.upper() not in SYNCHRONOUS_MODES:
+            raise ValueError(f"synchronous inválido: {self.synchronous}")
+
+    @property
+    def is_memory(self) -> bool:
+        return (
+            ":memory:" in self.database_url
+            or "mode=memory" in self.database_url
+            or self.database_url in ("sqlite://", "sqlite+aiosqlite://")
+        )
+
+    @property
+    def async_database_url(self) -> str:
+        return self.database_url.replace("sqlite://", "sqlite+aiosqlite://", 1)
+
+    def pragmas(self) -> Dict[str, object]:
+        return {
+            "journal_mode": self.journal_mode.upper(),
+            "synchronous": self.synchronous.upper(),
+            "mmap_size": int(self.mmap_size),
+            "cache_size": int(self.cache_size),
+            "busy_timeout": int(self.busy_timeout_ms)
+        }
+
+
+# WAL: los lectores de la API no se bloquean mientras el scheduler escribe.
+# synchronous=NORMAL en WAL sólo hace fsync en los checkpoints.
+PRODUCTION_PROFILE = EngineProfile(
+    name="production",
+    database_url="sqlite:///./exchange.db",
+    echo=False,
+    journal_mode="WAL",
+    synchronous="NORMAL",
+    mmap_size=256 * 1024 * 1024,
+    cache_size=-64000,
+    busy_timeout_ms=5000,
+    pool_size=10,
+    max_overflow=20
+)
+
+# Base en memoria y sin durabilidad: los tests no necesitan sobrevivir a un crash.
+# Cache compartido con nombre: el engine sync y el async (aiosqlite) abren la
+# misma base; con :memory: cada uno tendría la suya, sin las tablas del otro
+TEST_PROFILE = EngineProfile(
+    name="test",
+    database_url="sqlite:///file:exchange_test?mode=memory&cache=shared&uri=true",
+    echo=False,
+    journal_mode="MEMORY",
+    synchronous="OFF",
+    mmap_size=0,
+    cache_size=-2000,
+    busy_timeout_ms=0
+)
+
+PROFILES: Dict[str, EngineProfile] = {
+    PRODUCTION_PROFILE.name: PRODUCTION_PROFILE,
+    TEST_PROFILE.name: TEST_PROFILE
+}
+
+
+def _env_bool(value: str) -> bool:
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def load_engine_profile(env: Optional[Mapping[str, str]] = None) -> EngineProfile:
+    """
+    Elige el preset con DB_PROFILE (production por defecto) y aplica encima
+    los overrides individuales que estén definidos en el entorno.
+    """
+    env = os.environ if env is None else env
+
+    profile_name = env.get("DB_PROFILE", PRODUCTION_PROFILE.name).lower()
+    if profile_name not in PROFILES:
+        raise ValueError(f"DB_PROFILE desconocido: {profile_name}")
+    profile = PROFILES[profile_name]
+
+    overrides = {}
+    if "DATABASE_URL" in env:
+        overrides["database_url"] = env["DATABASE_URL"]
+    if "DB_ECHO" in env:
+        overrides["echo"] = _env_bool(env["DB_ECHO"])
+    if "DB_JOURNAL_MODE" in env:
+        overrides["journal_mode"] = env["DB_JOURNAL_MODE"]
+    if "DB_SYNCHRONOUS" in env:
+        overrides["synchronous"] = env["DB_SYNCHRONOUS"]
+    if "DB_MMAP_SIZE" in env:
+        overrides["mmap_size"] = int(env["DB_MMAP_SIZE"])
+    if "DB_CACHE_SIZE" in env:
+        overrides["cache_size"] = int(env["DB_CACHE_SIZE"])
+    if "DB_BUSY_TIMEOUT_MS" in env:
+        overrides["busy_timeout_ms"] = int(env["DB_BUSY_TIMEOUT_MS"])
+    if "DB_POOL_SIZE" in env:
+        overrides["pool_size"] = int(env["DB_POOL_SIZE"])
+    if "DB_MAX_OVERFLOW" in env:
+        overrides["max_overflow"] = int(env["DB_MAX_OVERFLOW"])
+    if "DB_POOL_TIMEOUT" in env:
+        overrides["pool_timeout"] = float(env["DB_POOL_TIMEOUT"])
+    if "DB_POOL_RECYCLE" in env:
+        overrides["pool_recycle"] = int(env["DB_POOL_RECYCLE"])
+
+    return replace(profile, **overrides) if overrides else profile
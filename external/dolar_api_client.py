@@ -1,28 +1,275 @@
+import asyncio
+import hashlib
+import importlib.util
+import json
+import os
 import httpx
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 from fastapi import HTTPException
 
+from external.resilience import CircuitBreaker, RetryPolicy, hedged
+from metrics.instruments import UPSTREAM_ERRORS, UPSTREAM_FETCH_SECONDS, UPSTREAM_RESILIENCE
+
+# Validadores del GET condicional por URL: (etag, last-modified, hash del cuerpo)
+Validators = Dict[str, Tuple[Optional[str], Optional[str], str]]
+
+# Respuestas que indican un problema pasajero del origen: se reintentan
+RETRYABLE_STATUS = frozenset({429, 500, 502, 503, 504})
+
+
+def _optional_seconds(value: str) -> Optional[float]:
+    # Vacío o 0 deshabilita
+    seconds = float(value or 0)
+    return seconds if seconds > 0 else None
+
 
 class DolarApiClient:
-    def __init__(self, base_url: str = "https://dolarapi.com/v1"):
+    def __init__(
+        self,
+        base_url: str = "https://dolarapi.com/v1",
+        connect_timeout: float = 5.0,
+        read_timeout: float = 10.0,
+        max_connections: int = 20,
+        max_keepalive_connections: int = 10,
+        keepalive_expiry: float = 30.0,
+        http2: bool = False,
+        retry_attempts: int = 3,
+        retry_base_delay: float = 0.1,
+        retry_max_delay: float = 1.0,
+        breaker_threshold: int = 5,
+        breaker_reset_timeout: float = 30.0,
+        hedge_after: Optional[float] = None,
+        total_timeout: Optional[float] = None,
+        circuit_breaker: Optional[CircuitBreaker] = None
+    ):
         self.base_url = base_url
-    
+        self.timeout = httpx.Timeout(
+            read_timeout,
+            connect=connect_timeout,
+            read=read_timeout
+        )
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        # HTTP/2 requiere el extra opcional httpx[http2] (paquete h2)
+        if http2 and importlib.util.find_spec("h2") is None:
+            print("⚠️  HTTP/2 solicitado pero 'h2' no está instalado, se usa HTTP/1.1")
+            http2 = False
+        self.http2 = http2
+        self._client: Optional[httpx.AsyncClient] = None
+        # Validadores por defecto para quien no pasa los suyos. El cliente es
+        # compartido: cada consumidor (repositorio) lleva su propio dict, así
+        # el fetch de otro no le hace recibir un 304 con datos que no vio
+        self._validators: Validators = {}
+        # Resiliencia: reintentos con backoff, circuit breaker, hedging y
+        # un presupuesto total por llamada (reintentos incluidos)
+        self.retry_policy = RetryPolicy(retry_attempts, retry_base_delay, retry_max_delay)
+        self.circuit_breaker = circuit_breaker or CircuitBreaker(breaker_threshold, breaker_reset_timeout)
+        self.hedge_after = hedge_after
+        self.total_timeout = total_timeout
+
+    @classmethod
+    def from_env(cls, base_url: Optional[str] = None) -> "DolarApiClient":
+        return cls(
+            base_url=base_url or os.getenv("DOLAR_API_BASE_URL", "https://dolarapi.com/v1"),
+            connect_timeout=float(os.getenv("DOLAR_API_CONNECT_TIMEOUT", "5")),
+            read_timeout=float(os.getenv("DOLAR_API_READ_TIMEOUT", "10")),
+            max_connections=int(os.getenv("DOLAR_API_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("DOLAR_API_MAX_KEEPALIVE_CONNECTIONS", "10")),
+            keepalive_expiry=float(os.getenv("DOLAR_API_KEEPALIVE_EXPIRY", "30")),
+            http2=os.getenv("DOLAR_API_HTTP2", "false").lower() == "true",
+            retry_attempts=int(os.getenv("DOLAR_API_RETRY_ATTEMPTS", "3")),
+            retry_base_delay=float(os.getenv("DOLAR_API_RETRY_BASE_DELAY", "0.1")),
+            retry_max_delay=float(os.getenv("DOLAR_API_RETRY_MAX_DELAY", "1")),
+            breaker_threshold=int(os.getenv("DOLAR_API_BREAKER_THRESHOLD", "5")),
+            breaker_reset_timeout=float(os.getenv("DOLAR_API_BREAKER_RESET_SECONDS", "30")),
+            hedge_after=_optional_seconds(os.getenv("DOLAR_API_HEDGE_AFTER", "0")),
+            total_timeout=_optional_seconds(os.getenv("DOLAR_API_TOTAL_TIMEOUT", "15"))
+        )
+
+    @property
+    def is_open(self) -> bool:
+        return self._client is not None
+
+    async def open(self) -> None:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                timeout=self.timeout,
+                limits=self.limits,
+                http2=self.http2
+            )
+
+    async def close(self) -> None:
+        if self._client is not None:
+            client, self._client = self._client, None
+            await client.aclose()
+
+    async def __aenter__(self) -> "DolarApiClient":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    async def _get_client(self) -> httpx.AsyncClient:
+        # Se abre de forma perezosa si nadie llamó a open()
+        if self._client is None:
+            await self.open()
+        assert self._client is not None
+        return self._client
+
     async def fetch_all_exchange_rates(self) -> List[Dict[str, Any]]:
-        url = f"{self.base_url}/dolares"
-        
-        async with httpx.AsyncClient() as client:
-            try:
-                response = await client.get(url)
-                response.raise_for_status()
-                return response.json()
-                
-            except httpx.HTTPStatusError as exc:
-                raise HTTPException(
-                    status_code=exc.response.status_code,
-                    detail=f'Error al consultar la API externa: {exc.response.text}'
-                )
-            except Exception as exc:
-                raise HTTPException(
-                    status_code=500,
-                    detail=f'Error de conexión con la API externa: {str(exc)}'
+        return json.loads(await self.fetch_raw("/dolares"))
+
+    async def fetch_all_exchange_rates_raw(self, validators: Optional[Validators] = None) -> bytes:
+        return await self.fetch_raw("/dolares", validators)
+
+    async def fetch_exchange_rates_if_changed(self) -> Optional[List[Dict[str, Any]]]:
+        raw = await self.fetch_exchange_rates_raw_if_changed()
+        if raw is None:
+            return None
+        return json.loads(raw)
+
+    async def fetch_exchange_rates_raw_if_changed(self, validators: Optional[Validators] = None) -> Optional[bytes]:
+        return await self.fetch_raw_if_changed("/dolares", validators)
+
+    async def fetch_raw(self, path: str, validators: Optional[Validators] = None) -> bytes:
+        """GET de `path` relativo a base_url; devuelve el cuerpo crudo."""
+        url = f"{self.base_url}{path}"
+        response = await self._get(url)
+        self._remember(url, response, validators)
+        return response.content
+
+    async def fetch_raw_if_changed(self, path: str, validators: Optional[Validators] = None) -> Optional[bytes]:
+        """
+        GET condicional con If-None-Match / If-Modified-Since.
+        Devuelve None si no hubo cambios (304 o mismo cuerpo que la última
+        vez para estos `validators`); si cambió devuelve el cuerpo crudo,
+        sin parsear.
+        """
+        url = f"{self.base_url}{path}"
+        response = await self._get(url, headers=self._conditional_headers(url, validators))
+        if response.status_code == 304:
+            return None
+        if not self._remember(url, response, validators):
+            return None
+        return response.content
+
+    def _conditional_headers(self, url: str, validators: Optional[Validators] = None) -> Dict[str, str]:
+        if validators is None:
+            validators = self._validators
+        headers = {}
+        etag, last_modified, _ = validators.get(url, (None, None, ""))
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return headers
+
+    def _remember(self, url: str, response: httpx.Response, validators: Optional[Validators] = None) -> bool:
+        if validators is None:
+            validators = self._validators
+        body_hash = hashlib.sha256(response.content).hexdigest()
+        previous = validators.get(url)
+        changed = previous is None or body_hash != previous[2]
+
+        validators[url] = (
+            response.headers.get("etag"),
+            response.headers.get("last-modified"),
+            body_hash
+        )
+
+        return changed
+
+    async def _get(self, url: str, **kwargs) -> httpx.Response:
+        breaker = self.circuit_breaker
+        if not breaker.allow():
+            # Abierto: se falla en el acto en vez de esperar al timeout del origen
+            UPSTREAM_ERRORS.labels("circuit_open").inc()
+            raise HTTPException(
+                status_code=503,
+                detail='API externa no disponible (circuit breaker abierto)',
+                headers={"Retry-After": str(max(1, round(breaker.retry_after())))}
+            )
+
+        client = await self._get_client()
+
+        try:
+            if self.total_timeout is None:
+                response = await self._get_with_retries(client, url, **kwargs)
+            else:
+                response = await asyncio.wait_for(
+                    self._get_with_retries(client, url, **kwargs),
+                    timeout=self.total_timeout
                 )
+
+        except asyncio.CancelledError:
+            # Cancelada desde afuera (ej: deadline del fan-out): no es una falla
+            # del origen, pero si era la prueba de half_open hay que liberarla
+            breaker.release()
+            raise
+        except httpx.HTTPStatusError as exc:
+            # Un 4xx es un error nuestro, no una caída del origen
+            if exc.response.status_code in RETRYABLE_STATUS:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            UPSTREAM_ERRORS.labels("http").inc()
+            raise HTTPException(
+                status_code=exc.response.status_code,
+                detail=f'Error al consultar la API externa: {exc.response.text}'
+            )
+        except asyncio.TimeoutError:
+            breaker.record_failure()
+            UPSTREAM_ERRORS.labels("timeout").inc()
+            raise HTTPException(
+                status_code=504,
+                detail=f'Timeout consultando la API externa ({self.total_timeout:g}s)'
+            )
+        except Exception as exc:
+            breaker.record_failure()
+            UPSTREAM_ERRORS.labels("connection").inc()
+            raise HTTPException(
+                status_code=500,
+                detail=f'Error de conexión con la API externa: {str(exc)}'
+            )
+
+        breaker.record_success()
+        return response
+
+    async def _get_with_retries(self, client: httpx.AsyncClient, url: str, **kwargs) -> httpx.Response:
+        async def attempt() -> httpx.Response:
+            # El status se valida dentro de cada copia: un 5xx rápido no le
+            # gana a un 200 más lento de la otra
+            response = await client.get(url, **kwargs)
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+
+        retry = 0
+        while True:
+            try:
+                with UPSTREAM_FETCH_SECONDS.time():
+                    return await hedged(
+                        attempt,
+                        self.hedge_after,
+                        on_hedge=UPSTREAM_RESILIENCE.labels("hedge").inc
+                    )
+
+            except (httpx.TransportError, httpx.HTTPStatusError) as exc:
+                retry += 1
+                if retry >= self.retry_policy.attempts or not self._is_retryable(exc):
+                    raise
+                UPSTREAM_RESILIENCE.labels("retry").inc()
+                await asyncio.sleep(self.retry_policy.delay(retry))
+
+    def _is_retryable(self, exc: Exception) -> bool:
+        if isinstance(exc, httpx.HTTPStatusError):
+            return exc.response.status_code in RETRYABLE_STATUS
+        return True
+
+
+# Instancia compartida (pool de conexiones) para la API, el CLI y el scheduler
+dolar_api_client = DolarApiClient.from_env()
@@ -0,0 +1,157 @@
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+T = TypeVar("T")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class RetryPolicy:
+    """
+    Reintentos acotados con backoff exponencial y jitter completo: el
+    reintento n espera un valor al azar entre 0 y min(max_delay, base * 2^(n-1)),
+    así varios workers que fallan juntos no vuelven a pegarle juntos.
+    """
+
+    def __init__(
+        self,
+        attempts: int = 3,
+        base_delay: float = 0.1,
+        max_delay: float = 1.0,
+        rng: Callable[[float, float], float] = random.uniform
+    ):
+        self.attempts = max(1, attempts)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._rng = rng
+
+    def delay(self, retry: int) -> float:
+        """Espera antes del reintento número `retry` (1 = primer reintento)."""
+        ceiling = min(self.max_delay, self.base_delay * (2 ** (retry - 1)))
+        if ceiling <= 0:
+            return 0.0
+        return self._rng(0.0, ceiling)
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker de tres estados.
+
+    closed: las llamadas pasan; `failure_threshold` fallas seguidas lo abren.
+    open: las llamadas fallan en el acto durante `reset_timeout` segundos.
+    half_open: pasa una sola llamada de prueba; si sale bien se cierra,
+    si falla vuelve a abrirse por otro `reset_timeout`.
+    """
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+        self._clock = clock
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self.opened = 0
+        self.rejected = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self._clock() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+            self._probing = False
+        return self._state
+
+    def allow(self) -> bool:
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        self.rejected += 1
+        return False
+
+    def release(self) -> None:
+        """Libera la llamada de prueba sin veredicto (ej: se canceló): la próxima puede probar."""
+        self._probing = False
+
+    def record_success(self) -> None:
+        self._state = CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        self._failures += 1
+        if self._state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self._state != OPEN:
+                self.opened += 1
+            self._state = OPEN
+            self._opened_at = self._clock()
+            self._probing = False
+
+    def retry_after(self) -> float:
+        """Segundos hasta que se permita la llamada de prueba."""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self._clock() - self._opened_at))
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "failures": self._failures,
+            "opened": self.opened,
+            "rejected": self.rejected
+        }
+
+
+async def hedged(
+    call: Callable[[], Awaitable[T]],
+    hedge_after: Optional[float],
+    on_hedge: Optional[Callable[[], None]] = None
+) -> T:
+    """
+    Ejecuta `call`; si no terminó en `hedge_after` segundos lanza una segunda
+    copia y devuelve la primera que salga bien (la otra se cancela). Si las
+    dos fallan se propaga el último error. Con hedge_after None no hay copia.
+    """
+    if hedge_after is None:
+        return await call()
+
+    primary = asyncio.ensure_future(call())
+    tasks = {primary}
+    try:
+        # También la primera espera va dentro del try: si cancelan al que
+        # llama (timeout total, deadline del fan-out) la copia no sigue sola
+        done, _ = await asyncio.wait({primary}, timeout=hedge_after)
+        if done:
+            return primary.result()
+
+        if on_hedge is not None:
+            on_hedge()
+        tasks.add(asyncio.ensure_future(call()))
+        pending = set(tasks)
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        assert error is not None
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+            elif not task.cancelled():
+                # Marca el error como leído aunque haya ganado la otra copia
+                task.exception()
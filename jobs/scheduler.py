@@ -1,53 +1,120 @@
 import asyncio
 import json
+import os
 from datetime import datetime
+from typing import Awaitable, Callable, Optional
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.schedulers.background import BackgroundScheduler
 from apscheduler.triggers.interval import IntervalTrigger
 
-from sqlmodel import Session
-from database.connection import engine
+from database.connection import async_engine, async_session_maker
 from services.exchange_rate_service import ExchangeRateService
+from services.snapshot_cache import Snapshot
+from services.leader_election import LeaderElection
 from repositories.exchange_rate_repository import ExchangeRateRepository
-from external.dolar_api_client import DolarApiClient
+from external.dolar_api_client import DolarApiClient, dolar_api_client
 
+SYNC_INTERVAL_SECONDS = float(os.getenv("SYNC_INTERVAL_SECONDS", "7200"))
+SYNC_JITTER_SECONDS = float(os.getenv("SYNC_JITTER_SECONDS", "30"))
+SYNC_MISFIRE_GRACE_SECONDS = int(os.getenv("SYNC_MISFIRE_GRACE_SECONDS", "300"))
 
-async def sync_exchange_rates_job():
+
+def _is_follower(election: Optional[LeaderElection]) -> bool:
+    # Con varios workers sólo el líder sincroniza; sin elección corre siempre
+    if election is not None and not election.is_leader:
+        print(f"[JOB] {election.holder} no es líder, se omite la sincronización")
+        return True
+    return False
+
+
+async def sync_exchange_rates_job(
+    api_client: Optional[DolarApiClient] = None,
+    election: Optional[LeaderElection] = None
+):
+    if _is_follower(election):
+        return
+    
     print(f"\n{'='*80}")
     print(f"[JOB] Iniciando sincronización de tasas de cambio - {datetime.now()}")
     print(f"{'='*80}\n")
     
     try:
-        api_client = DolarApiClient()
-        api_repository = ExchangeRateRepository(api_client)
+        api_repository = ExchangeRateRepository.from_env(api_client or dolar_api_client)
         service = ExchangeRateService(api_repository)
         
-        with Session(engine) as session:
-            result = await service.get_all_rates_with_average(
-                session=session, 
-                persist=True
-            )
-            
-            result_dict = result.model_dump()
-            result_json = json.dumps(result_dict, indent=2, ensure_ascii=False, default=str)
-            
-            print("[JOB] Sincronización completada exitosamente")
-            print(f"\n[JOB] Resultado:\n{result_json}\n")
-            print(f"{'='*80}\n")
-            
+        try:
+            async with async_session_maker() as session:
+                result = await service.get_all_rates_with_average(
+                    session=session, 
+                    persist=True
+                )
+        finally:
+            await api_repository.aclose()
+        
+        result_dict = result.model_dump()
+        result_json = json.dumps(result_dict, indent=2, ensure_ascii=False, default=str)
+        
+        print("[JOB] Sincronización completada exitosamente")
+        print(f"\n[JOB] Resultado:\n{result_json}\n")
+        print(f"{'='*80}\n")
+        
     except Exception as e:
         print(f"[JOB] Error en sincronización: {str(e)}")
         print(f"{'='*80}\n")
         raise
 
 
-def run_sync_job():
-    asyncio.run(sync_exchange_rates_job())
+async def refresh_snapshot_job(
+    refresh: Callable[[], Awaitable[Snapshot]],
+    election: Optional[LeaderElection] = None
+):
+    """
+    Job del modo async: corre en el loop de la app y refresca el snapshot en
+    memoria (y el compartido, si está habilitado), de modo que comparte
+    cache, single-flight, pool HTTP y cola de persistencia con los requests.
+    """
+    if _is_follower(election):
+        return
+    
+    print(f"[JOB] Refrescando snapshot de tasas de cambio - {datetime.now()}")
+    
+    try:
+        snapshot = await refresh()
+        print(f"[JOB] Snapshot actualizado (versión {snapshot.version})")
+    except Exception as e:
+        print(f"[JOB] Error refrescando snapshot: {str(e)}")
+        raise
+
+
+async def run_standalone_sync_job():
+    # Sin event loop de la app los pools viven sólo lo que dura el job
+    try:
+        await sync_exchange_rates_job()
+    finally:
+        await dolar_api_client.close()
+        await async_engine.dispose()
+
+
+def run_sync_job(
+    loop: Optional[asyncio.AbstractEventLoop] = None,
+    election: Optional[LeaderElection] = None
+):
+    if loop is not None:
+        # Se ejecuta en el loop de la app para reutilizar su pool de conexiones
+        future = asyncio.run_coroutine_threadsafe(sync_exchange_rates_job(election=election), loop)
+        future.result()
+    else:
+        asyncio.run(run_standalone_sync_job())
 
 
-def start_scheduler():
+def start_scheduler(
+    loop: Optional[asyncio.AbstractEventLoop] = None,
+    election: Optional[LeaderElection] = None
+):
     scheduler = BackgroundScheduler()
     scheduler.add_job(
         func=run_sync_job,
+        kwargs={'loop': loop, 'election': election},
         trigger=IntervalTrigger(hours=2),
         id='sync_exchange_rates',
         name='Sincronizar tasas de cambio cada 2 horas',
@@ -60,6 +127,33 @@ def start_scheduler():
     return scheduler
 
 
+def start_async_scheduler(
+    refresh: Callable[[], Awaitable[Snapshot]],
+    interval_seconds: float = SYNC_INTERVAL_SECONDS,
+    jitter_seconds: float = SYNC_JITTER_SECONDS,
+    misfire_grace_seconds: int = SYNC_MISFIRE_GRACE_SECONDS,
+    election: Optional[LeaderElection] = None
+) -> AsyncIOScheduler:
+    # Debe llamarse con el loop de la app corriendo (lifespan)
+    scheduler = AsyncIOScheduler(event_loop=asyncio.get_running_loop())
+    scheduler.add_job(
+        func=refresh_snapshot_job,
+        args=[refresh, election],
+        trigger=IntervalTrigger(seconds=interval_seconds, jitter=jitter_seconds or None),
+        id='sync_exchange_rates',
+        name='Refrescar snapshot de tasas de cambio',
+        max_instances=1,
+        coalesce=True,
+        misfire_grace_time=misfire_grace_seconds,
+        replace_existing=True
+    )
+    
+    scheduler.start()
+    print(f"Job programado cada {interval_seconds:g} segundos (jitter {jitter_seconds:g}s)")
+    
+    return scheduler
+
+
 if __name__ == "__main__":
     print("Ejecutando job de prueba")
     run_sync_job()
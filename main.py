@@ -1,15 +1,29 @@
 from fastapi import FastAPI
 from contextlib import asynccontextmanager
+import asyncio
 import os
 
-from api import exchange_routes
+from api import exchange_routes, metrics_routes
+from api.middleware import ProfilingMiddleware, ServerTimingMiddleware
 from database.connection import create_db_and_tables
+from external.dolar_api_client import dolar_api_client
 
 # Importar scheduler solo si está habilitado
 ENABLE_SCHEDULER = os.getenv("ENABLE_SCHEDULER", "false").lower() == "true"
+# async: el job corre en el loop de la app; thread: BackgroundScheduler aparte
+SCHEDULER_MODE = os.getenv("SCHEDULER_MODE", "async").lower()
+# Con varios workers de uvicorn sólo el que tiene el lease sincroniza
+LEADER_ELECTION = os.getenv("SCHEDULER_LEADER_ELECTION", "true").lower() == "true"
+
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "true").lower() == "true"
+# off | header (requests con X-Profile: 1) | all
+REQUEST_PROFILING = os.getenv("REQUEST_PROFILING", "off").lower()
+REQUEST_PROFILE_DIR = os.getenv("REQUEST_PROFILE_DIR", "./profiles")
 
 if ENABLE_SCHEDULER:
-    from jobs.scheduler import start_scheduler
+    from jobs.scheduler import start_async_scheduler, start_scheduler
+    from services.leader_election import LeaderElection
+    from database.connection import async_session_maker
 
 
 @asynccontextmanager
@@ -23,18 +37,47 @@ async def lifespan(app: FastAPI):
     create_db_and_tables()
     print("✅ Base de datos inicializada")
     
+    # Pool de conexiones HTTP compartido con la API externa
+    await dolar_api_client.open()
+    print("✅ Cliente HTTP iniciado")
+    
+    # Worker de la cola write-behind que persiste los snapshots
+    exchange_routes.persist_queue.start()
+    print("✅ Cola de persistencia iniciada")
+    
     # Iniciar scheduler si está habilitado
     scheduler = None
+    election = None
     if ENABLE_SCHEDULER:
-        scheduler = start_scheduler()
-        print("✅ Scheduler iniciado")
+        if LEADER_ELECTION:
+            election = LeaderElection.from_env(async_session_maker)
+            election.start()
+            print(f"✅ Elección de líder iniciada ({election.holder})")
+        
+        if SCHEDULER_MODE == "thread":
+            scheduler = start_scheduler(loop=asyncio.get_running_loop(), election=election)
+        else:
+            scheduler = start_async_scheduler(exchange_routes.sync_snapshot, election=election)
+        print(f"✅ Scheduler iniciado (modo {SCHEDULER_MODE})")
     
     yield
     
     # Shutdown
     if scheduler:
-        scheduler.shutdown()
+        scheduler.shutdown(wait=False)
         print("⏹️  Scheduler detenido")
+    if election:
+        await election.stop()
+        print("⏹️  Lease de liderazgo liberado")
+    await exchange_routes.hub.stop()
+    print("⏹️  Streams cerrados")
+    await exchange_routes.persist_queue.stop()
+    print("⏹️  Cola de persistencia vaciada")
+    if exchange_routes.shared_snapshot is not None:
+        exchange_routes.shared_snapshot.close()
+    await exchange_routes.api_repository.aclose()
+    await dolar_api_client.close()
+    print("⏹️  Cliente HTTP cerrado")
     print("👋 Cerrando aplicación...")
 
 
@@ -45,7 +88,13 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+# El último agregado es el más externo: el profiling envuelve también al Server-Timing
+app.add_middleware(ServerTimingMiddleware, enabled=SERVER_TIMING_ENABLED)
+if REQUEST_PROFILING != "off":
+    app.add_middleware(ProfilingMiddleware, mode=REQUEST_PROFILING, output_dir=REQUEST_PROFILE_DIR)
+
 app.include_router(exchange_routes.route)
+app.include_router(metrics_routes.route)
 
 
 @app.get("/")
@@ -56,6 +105,8 @@ async def root():
         "version": "1.0.0",
         "endpoints": {
             "exchange_rates": "/api/exchange",
+            "stream": "/api/exchange/stream",
+            "metrics": "/metrics",
             "docs": "/docs"
         }
     }
@@ -0,0 +1,55 @@
+from metrics.registry import MetricsRegistry
+
+# Registro del proceso: lo expone GET /metrics
+registry = MetricsRegistry()
+
+UPSTREAM_FETCH_SECONDS = registry.histogram(
+    "exchange_upstream_fetch_seconds",
+    "Latencia de los GET a la API externa (incluye 304)",
+    phase="upstream"
+)
+UPSTREAM_ERRORS = registry.counter(
+    "exchange_upstream_errors",
+    "Errores de la API externa por tipo (http, connection, timeout, circuit_open, validation)",
+    labelnames=("kind",)
+)
+UPSTREAM_RESILIENCE = registry.counter(
+    "exchange_upstream_resilience_events",
+    "Reintentos y requests hedged hacia la API externa",
+    labelnames=("event",)
+)
+UPSTREAM_SOURCES = registry.counter(
+    "exchange_upstream_source_fetches",
+    "Resultado de cada fuente en el fan-out multi-fuente (ok, unchanged, error, timeout)",
+    labelnames=("source", "result")
+)
+STALE_FALLBACKS = registry.counter(
+    "exchange_stale_fallbacks",
+    "Respuestas servidas con el último dato conocido por falla del origen (memory, db)",
+    labelnames=("source",)
+)
+VALIDATION_SECONDS = registry.histogram(
+    "exchange_payload_validation_seconds",
+    "Tiempo de validación del payload crudo de la API externa",
+    phase="validation"
+)
+AVERAGE_SECONDS = registry.histogram(
+    "exchange_average_computation_seconds",
+    "Tiempo de cálculo del promedio de compra/venta",
+    phase="average"
+)
+DB_UPSERT_SECONDS = registry.histogram(
+    "exchange_db_upsert_seconds",
+    "Tiempo de escritura de las cotizaciones que cambiaron",
+    phase="db"
+)
+ROWS_WRITTEN = registry.counter(
+    "exchange_db_rows_written",
+    "Filas escritas por tabla",
+    labelnames=("table",)
+)
+SERIALIZATION_SECONDS = registry.histogram(
+    "exchange_response_serialization_seconds",
+    "Tiempo de serialización (y compresión) de la respuesta de /api/exchange",
+    phase="serialization"
+)
@@ -0,0 +1,229 @@
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple, Union
+
+from metrics.timing import record_phase
+
+# Buckets en segundos: desde sub-milisegundo (validación) hasta timeouts de red
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Counter:
+    """Contador monótono, opcionalmente con labels."""
+
+    type = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._inc(self._key(()), amount)
+
+    def labels(self, *labels: str) -> "_BoundCounter":
+        return _BoundCounter(self, self._key(labels))
+
+    def value(self, *labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def total(self) -> float:
+        return sum(self._values.values())
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield self.name + "_total", labels, value
+
+    def _inc(self, key: LabelValues, amount: float) -> None:
+        if amount < 0:
+            raise ValueError("Un counter sólo puede incrementarse")
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def _key(self, labels: Sequence[str]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} espera labels {self.labelnames}")
+        return tuple(str(label) for label in labels)
+
+
+class _BoundCounter:
+    def __init__(self, counter: Counter, labels: LabelValues):
+        self._counter = counter
+        self._labels = labels
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._counter._inc(self._labels, amount)
+
+
+class CallbackCounter:
+    """
+    Contador cuyo valor se lee al hacer scrape, para componentes que ya
+    llevan sus propios contadores (ej: SingleFlight, SnapshotCache).
+    """
+
+    type = "counter"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        callback: Callable[[], Dict[LabelValues, float]],
+        labelnames: Sequence[str] = ()
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.callback = callback
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        for labels, value in sorted(self.callback().items()):
+            yield self.name + "_total", labels, value
+
+
+class Histogram:
+    """
+    Histograma de latencias con buckets acumulativos fijos.
+
+    Con `phase`, time() además suma la duración a esa fase del request en
+    curso (header Server-Timing).
+    """
+
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        phase: Optional[str] = None
+    ):
+        if list(buckets) != sorted(buckets):
+            raise ValueError("Los buckets deben estar ordenados")
+
+        self.name = name
+        self.help = help
+        self.phase = phase
+        self.labelnames: Tuple[str, ...] = ()
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def observe(self, value: float) -> None:
+        # bisect_left: un valor igual al límite cuenta en ese bucket (le = <=)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self, clock: Callable[[], float] = time.perf_counter):
+        started = clock()
+        try:
+            yield
+        finally:
+            elapsed = clock() - started
+            self.observe(elapsed)
+            if self.phase is not None:
+                record_phase(self.phase, elapsed)
+
+    def samples(self) -> Iterator[Tuple[str, LabelValues, float]]:
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            yield self.name + "_bucket", (_format_value(bound),), cumulative
+        yield self.name + "_sum", (), total
+        yield self.name + "_count", (), cumulative
+
+
+Metric = Union[Counter, CallbackCounter, Histogram]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrica duplicada: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        phase: Optional[str] = None
+    ) -> Histogram:
+        return self.register(Histogram(name, help, buckets, phase))
+
+    def callback_counter(
+        self,
+        name: str,
+        help: str,
+        callback: Callable[[], Dict[LabelValues, float]],
+        labelnames: Sequence[str] = ()
+    ) -> CallbackCounter:
+        return self.register(CallbackCounter(name, help, callback, labelnames))
+
+    def get(self, name: str) -> Optional[Metric]:
+        return self._metrics.get(name)
+
+    def render(self) -> str:
+        """Exposición en formato de texto de Prometheus (0.0.4)."""
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.type}")
+            for sample, labels, value in metric.samples():
+                names = ("le",) if sample.endswith("_bucket") else metric.labelnames
+                lines.append(f"{sample}{_format_labels(names, labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
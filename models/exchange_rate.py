@@ -1,3 +1,6 @@
+from datetime import datetime
+from typing import Optional
+
 from pydantic import BaseModel
 
 
@@ -16,3 +19,17 @@ class ExchangeRateAverage(BaseModel):
 class ExchangeRateResponse(BaseModel):
     rates: list[ExchangeRate]
     average: ExchangeRateAverage
+    # True si la API externa falló y se sirve el último dato conocido
+    stale: bool = False
+
+
+class ExchangeRateHistoryItem(BaseModel):
+    type: str
+    compra: float
+    venta: float
+    observedAt: datetime
+
+
+class ExchangeRateHistoryPage(BaseModel):
+    items: list[ExchangeRateHistoryItem]
+    nextCursor: Optional[str] = None
@@ -0,0 +1,106 @@
+import sys
+from array import array
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+
+from models.exchange_rate import ExchangeRate
+
+
+def normalize_type(nombre: str) -> str:
+    # Misma normalización que la columna type de la base
+    return nombre.lower().replace(" ", "_")
+
+
+class RateTable(Sequence[ExchangeRate]):
+    """
+    Representación compacta de las cotizaciones para el camino caliente.
+
+    Guarda columnas paralelas (nombres y tipos internados, compra/venta en
+    arrays de doubles): promedio, filas a persistir e historial se calculan
+    sobre las columnas. Los ExchangeRate salen del parseo (pydantic-core) y
+    from_rates los reutiliza; model_construct sólo corre para las tablas
+    armadas con merge, una vez por tabla.
+    """
+    __slots__ = ("names", "types", "buy", "sell", "updated", "_models")
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        buy: Iterable[float],
+        sell: Iterable[float],
+        updated: Iterable[str]
+    ):
+        self.names: Tuple[str, ...] = tuple(sys.intern(name) for name in names)
+        self.types: Tuple[str, ...] = tuple(sys.intern(normalize_type(name)) for name in self.names)
+        self.buy = array("d", buy)
+        self.sell = array("d", sell)
+        self.updated: Tuple[str, ...] = tuple(updated)
+        self._models: Optional[Tuple[ExchangeRate, ...]] = None
+
+        if not len(self.names) == len(self.buy) == len(self.sell) == len(self.updated):
+            raise ValueError("Las columnas de RateTable deben tener el mismo largo")
+
+    @classmethod
+    def from_rates(cls, rates: Iterable[ExchangeRate]) -> "RateTable":
+        if isinstance(rates, RateTable):
+            return rates
+        rates = tuple(rates)
+        table = cls(
+            [rate.nombre for rate in rates],
+            [rate.compra for rate in rates],
+            [rate.venta for rate in rates],
+            [rate.fechaActualizacion for rate in rates]
+        )
+        # Los modelos ya existen: no se vuelven a construir
+        table._models = rates
+        return table
+
+    @classmethod
+    def merge(cls, tables: Sequence["RateTable"]) -> "RateTable":
+        """Combina por tipo; ante tipos repetidos queda el de la primera tabla."""
+        if len(tables) == 1:
+            return tables[0]
+
+        names, buy, sell, updated = [], [], [], []
+        seen = set()
+        for table in tables:
+            for position, type in enumerate(table.types):
+                if type in seen:
+                    continue
+                seen.add(type)
+                names.append(table.names[position])
+                buy.append(table.buy[position])
+                sell.append(table.sell[position])
+                updated.append(table.updated[position])
+        return cls(names, buy, sell, updated)
+
+    def average(self) -> Tuple[float, float]:
+        count = len(self.names)
+        if not count:
+            return 0.0, 0.0
+        return round(sum(self.buy) / count, 2), round(sum(self.sell) / count, 2)
+
+    def models(self) -> Tuple[ExchangeRate, ...]:
+        if self._models is None:
+            # Los valores ya se validaron al parsear: model_construct no revalida
+            self._models = tuple(
+                ExchangeRate.model_construct(
+                    nombre=name,
+                    compra=buy,
+                    venta=sell,
+                    fechaActualizacion=updated
+                )
+                for name, buy, sell, updated in zip(self.names, self.buy, self.sell, self.updated)
+            )
+        return self._models
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __getitem__(self, index):
+        return self.models()[index]
+
+    def __iter__(self) -> Iterator[ExchangeRate]:
+        return iter(self.models())
+
+    def __repr__(self) -> str:
+        return f"RateTable({len(self)} tasas: {', '.join(self.types)})"
@@ -1,11 +1,25 @@
 from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from database.models import ExchangeRateDB
+from models.exchange_rate import ExchangeRate
+from repositories.exchange_history_repository import to_utc
 from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 
 
-class ExchangeDBRepository:    
+def to_exchange_rate(db_rate: ExchangeRateDB) -> ExchangeRate:
+    # La base guarda el tipo normalizado, no el nombre original
+    return ExchangeRate(
+        nombre=db_rate.type,
+        compra=float(db_rate.buy),
+        venta=float(db_rate.sell),
+        fechaActualizacion=to_utc(db_rate.updated_at).isoformat()
+    )
+
+
+class ExchangeDBRepository:
     def update_or_create_rate(
         self,
         type: str,
@@ -17,40 +31,170 @@ class ExchangeDBRepository:
     ) -> ExchangeRateDB:
         statement = select(ExchangeRateDB).where(ExchangeRateDB.type == type)
         existing_rate = session.exec(statement).first()
-        
+
         if existing_rate:
-            existing_rate.buy = Decimal(str(buy))
-            existing_rate.sell = Decimal(str(sell))
-            existing_rate.rate = Decimal(str(rate))
-            existing_rate.diff = Decimal(str(diff))
-            existing_rate.updated_at = datetime.now(timezone.utc)
-            
+            self._apply_values(existing_rate, buy, sell, rate, diff)
+
             session.add(existing_rate)
             session.commit()
             session.refresh(existing_rate)
-            
+
             return existing_rate
         else:
-            new_rate = ExchangeRateDB(
-                type=type,
-                buy=Decimal(str(buy)),
-                sell=Decimal(str(sell)),
-                rate=Decimal(str(rate)),
-                diff=Decimal(str(diff)),
-                updated_at=datetime.now(timezone.utc)
-            )
-            
+            new_rate = self._new_rate(type, buy, sell, rate, diff)
+
             session.add(new_rate)
             session.commit()
             session.refresh(new_rate)
-            
+
             return new_rate
-    
+
+    async def update_or_create_rate_async(
+        self,
+        type: str,
+        buy: float,
+        sell: float,
+        rate: float,
+        diff: float,
+        session: AsyncSession
+    ) -> ExchangeRateDB:
+        statement = select(ExchangeRateDB).where(ExchangeRateDB.type == type)
+        existing_rate = (await session.exec(statement)).first()
+
+        if existing_rate:
+            self._apply_values(existing_rate, buy, sell, rate, diff)
+            db_rate = existing_rate
+        else:
+            db_rate = self._new_rate(type, buy, sell, rate, diff)
+
+        session.add(db_rate)
+        await session.commit()
+        await session.refresh(db_rate)
+
+        return db_rate
+
+    def upsert_many(
+        self,
+        rates: List[Dict[str, Any]],
+        session: Session
+    ) -> List[ExchangeRateDB]:
+        """
+        Inserta o actualiza todas las tasas en una sola transacción.
+        Cada dict debe tener las claves type, buy, sell, rate y diff.
+        """
+        if not rates:
+            return []
+
+        statement = self._upsert_statement(rates)
+        try:
+            results = list(session.scalars(
+                statement,
+                execution_options={"populate_existing": True}
+            ).all())
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+        return results
+
+    async def upsert_many_async(
+        self,
+        rates: List[Dict[str, Any]],
+        session: AsyncSession
+    ) -> List[ExchangeRateDB]:
+        if not rates:
+            return []
+
+        statement = self._upsert_statement(rates)
+        try:
+            results = list((await session.scalars(
+                statement,
+                execution_options={"populate_existing": True}
+            )).all())
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+        return results
+
     def get_all_rates(self, session: Session) -> List[ExchangeRateDB]:
         statement = select(ExchangeRateDB)
         results = session.exec(statement).all()
         return list(results)
-    
+
+    async def get_all_rates_async(self, session: AsyncSession) -> List[ExchangeRateDB]:
+        statement = select(ExchangeRateDB)
+        results = (await session.exec(statement)).all()
+        return list(results)
+
     def get_rate_by_type(self, type: str, session: Session) -> Optional[ExchangeRateDB]:
         statement = select(ExchangeRateDB).where(ExchangeRateDB.type == type)
         return session.exec(statement).first()
+
+    async def get_rate_by_type_async(
+        self,
+        type: str,
+        session: AsyncSession
+    ) -> Optional[ExchangeRateDB]:
+        statement = select(ExchangeRateDB).where(ExchangeRateDB.type == type)
+        return (await session.exec(statement)).first()
+
+    def _upsert_statement(self, rates: List[Dict[str, Any]]):
+        now = datetime.now(timezone.utc)
+        # SQLite no permite que un mismo INSERT actualice dos veces la misma fila
+        by_type = {
+            item["type"]: {
+                "type": item["type"],
+                "buy": Decimal(str(item["buy"])),
+                "sell": Decimal(str(item["sell"])),
+                "rate": Decimal(str(item["rate"])),
+                "diff": Decimal(str(item["diff"])),
+                "updated_at": now
+            }
+            for item in rates
+        }
+
+        statement = sqlite_insert(ExchangeRateDB).values(list(by_type.values()))
+        return statement.on_conflict_do_update(
+            index_elements=[ExchangeRateDB.type],
+            set_={
+                "buy": statement.excluded.buy,
+                "sell": statement.excluded.sell,
+                "rate": statement.excluded.rate,
+                "diff": statement.excluded.diff,
+                "updated_at": statement.excluded.updated_at
+            }
+        ).returning(ExchangeRateDB)
+
+    def _apply_values(
+        self,
+        db_rate: ExchangeRateDB,
+        buy: float,
+        sell: float,
+        rate: float,
+        diff: float
+    ) -> None:
+        db_rate.buy = Decimal(str(buy))
+        db_rate.sell = Decimal(str(sell))
+        db_rate.rate = Decimal(str(rate))
+        db_rate.diff = Decimal(str(diff))
+        db_rate.updated_at = datetime.now(timezone.utc)
+
+    def _new_rate(
+        self,
+        type: str,
+        buy: float,
+        sell: float,
+        rate: float,
+        diff: float
+    ) -> ExchangeRateDB:
+        return ExchangeRateDB(
+            type=type,
+            buy=Decimal(str(buy)),
+            sell=Decimal(str(sell)),
+            rate=Decimal(str(rate)),
+            diff=Decimal(str(diff)),
+            updated_at=datetime.now(timezone.utc)
+        )
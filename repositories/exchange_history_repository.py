@@ -0,0 +1,127 @@
+from sqlmodel import Session, select
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database.models import ExchangeRateHistoryDB
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+from typing import Optional, List, Dict, Any
+
+
+def to_utc(value: datetime) -> datetime:
+    # Todas las fechas del historial se comparan en UTC; sin zona se asume UTC
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+
+def encode_cursor(observed_at: datetime) -> str:
+    """Cursor opaco de keyset: microsegundos desde epoch (URL-safe, sin '+' ni ':')."""
+    return str((to_utc(observed_at) - _EPOCH) // timedelta(microseconds=1))
+
+
+def decode_cursor(cursor: str) -> datetime:
+    """Inverso de encode_cursor; ValueError si el cursor no es válido."""
+    if not cursor.isdigit():
+        raise ValueError(f"Cursor inválido: {cursor!r}")
+    return _EPOCH + timedelta(microseconds=int(cursor))
+
+
+class ExchangeHistoryRepository:
+    def append_many(
+        self,
+        observations: List[Dict[str, Any]],
+        session: Session
+    ) -> None:
+        """
+        Agrega observaciones (type, observed_at, buy, sell) en un solo INSERT.
+        Las observaciones ya registradas para la misma clave se ignoran.
+        """
+        if not observations:
+            return
+
+        try:
+            session.execute(self._append_statement(observations))
+            session.commit()
+        except Exception:
+            session.rollback()
+            raise
+
+    async def append_many_async(
+        self,
+        observations: List[Dict[str, Any]],
+        session: AsyncSession
+    ) -> None:
+        if not observations:
+            return
+
+        try:
+            await session.execute(self._append_statement(observations))
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+    def get_page(
+        self,
+        type: str,
+        session: Session,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[datetime] = None,
+        limit: int = 100
+    ) -> List[ExchangeRateHistoryDB]:
+        statement = self._page_statement(type, start, end, after, limit)
+        return list(session.exec(statement).all())
+
+    async def get_page_async(
+        self,
+        type: str,
+        session: AsyncSession,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        after: Optional[datetime] = None,
+        limit: int = 100
+    ) -> List[ExchangeRateHistoryDB]:
+        """
+        Paginación por keyset: `after` es el observed_at de la última fila de
+        la página anterior, así cada página es un seek en la clave primaria
+        en lugar de un OFFSET que recorre todas las filas previas.
+        """
+        statement = self._page_statement(type, start, end, after, limit)
+        return list((await session.exec(statement)).all())
+
+    def _append_statement(self, observations: List[Dict[str, Any]]):
+        values = [
+            {
+                "type": item["type"],
+                "observed_at": to_utc(item["observed_at"]),
+                "buy": Decimal(str(item["buy"])),
+                "sell": Decimal(str(item["sell"]))
+            }
+            for item in observations
+        ]
+        return sqlite_insert(ExchangeRateHistoryDB).values(values).on_conflict_do_nothing(
+            index_elements=[ExchangeRateHistoryDB.type, ExchangeRateHistoryDB.observed_at]
+        )
+
+    def _page_statement(
+        self,
+        type: str,
+        start: Optional[datetime],
+        end: Optional[datetime],
+        after: Optional[datetime],
+        limit: int
+    ):
+        statement = select(ExchangeRateHistoryDB).where(ExchangeRateHistoryDB.type == type)
+
+        if start is not None:
+            statement = statement.where(ExchangeRateHistoryDB.observed_at >= to_utc(start))
+        if end is not None:
+            statement = statement.where(ExchangeRateHistoryDB.observed_at < to_utc(end))
+        if after is not None:
+            statement = statement.where(ExchangeRateHistoryDB.observed_at > to_utc(after))
+
+        return statement.order_by(ExchangeRateHistoryDB.observed_at).limit(limit)
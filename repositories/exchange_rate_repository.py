@@ -1,23 +1,239 @@
-from typing import List
+import asyncio
+import os
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from pydantic import TypeAdapter, ValidationError
+
+from metrics.instruments import UPSTREAM_ERRORS, UPSTREAM_SOURCES, VALIDATION_SECONDS
 from models.exchange_rate import ExchangeRate
-from external.dolar_api_client import DolarApiClient
+from models.rate_table import RateTable, normalize_type
+from external.dolar_api_client import DolarApiClient, Validators
+
+
+class _LenientExchangeRate(ExchangeRate):
+    # Modo tolerante: campos faltantes toman el valor por defecto y los null
+    # se corrigen después del parseo. Sin validadores en Python por campo, la
+    # validación corre entera en pydantic-core
+    nombre: Optional[str] = ""
+    compra: Optional[float] = 0.0
+    venta: Optional[float] = 0.0
+    fechaActualizacion: Optional[str] = ""
+
+
+_LENIENT_DEFAULTS = {
+    name: field.default for name, field in _LenientExchangeRate.model_fields.items()
+}
+
+# Los TypeAdapter compilan el validador una sola vez; se reutilizan en cada fetch
+_STRICT_RATES_ADAPTER = TypeAdapter(List[ExchangeRate])
+_LENIENT_RATES_ADAPTER = TypeAdapter(List[_LenientExchangeRate])
+
+
+def _fill_nulls(rates: List[_LenientExchangeRate]) -> None:
+    # Un null explícito es raro: se recorre una vez en vez de validar cada campo
+    for rate in rates:
+        if rate.nombre is None or rate.compra is None or rate.venta is None or rate.fechaActualizacion is None:
+            for name, default in _LENIENT_DEFAULTS.items():
+                if getattr(rate, name) is None:
+                    setattr(rate, name, default)
+
+
+def parse_rate_table(raw: bytes, strict: bool = False) -> RateTable:
+    """
+    Valida el cuerpo crudo de la API en una sola pasada (pydantic-core) y
+    devuelve la tabla compacta; los modelos quedan armados para el borde de
+    la API, sin construirlos de nuevo.
+    """
+    # Los endpoints por casa (/dolares/blue) devuelven un objeto, no una lista
+    if raw.lstrip()[:1] == b"{":
+        raw = b"[" + raw + b"]"
+    try:
+        with VALIDATION_SECONDS.time():
+            if strict:
+                rates = _STRICT_RATES_ADAPTER.validate_json(raw, strict=True)
+            else:
+                rates = _LENIENT_RATES_ADAPTER.validate_json(raw)
+                _fill_nulls(rates)
+            return RateTable.from_rates(rates)
+    except ValidationError as exc:
+        UPSTREAM_ERRORS.labels("validation").inc()
+        raise HTTPException(
+            status_code=502,
+            detail=f'Respuesta inválida de la API externa: {exc.error_count()} errores de validación'
+        )
+
+
+def parse_rates_json(raw: bytes, strict: bool = False) -> List[ExchangeRate]:
+    return list(parse_rate_table(raw, strict=strict))
+
+
+@dataclass(frozen=True)
+class RateSource:
+    """Un endpoint de cotizaciones: cliente del proveedor + path relativo a su base_url."""
+    name: str
+    client: DolarApiClient
+    path: str = "/dolares"
+
+
+def parse_sources(spec: str, default_client: DolarApiClient) -> List[RateSource]:
+    """
+    Parsea EXCHANGE_SOURCES: `nombre=destino` separados por coma. Un destino
+    que empieza con "/" es un path del cliente por defecto; si no, es la URL
+    completa de otro proveedor compatible con el formato de dolarapi.
+    """
+    sources = []
+    for entry in spec.split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        name, sep, target = entry.partition("=")
+        name, target = name.strip(), target.strip()
+        if not sep or not name or not target:
+            raise ValueError(f"Fuente inválida en EXCHANGE_SOURCES: {entry!r}")
+        if target.startswith("/"):
+            sources.append(RateSource(name, default_client, target))
+        else:
+            sources.append(RateSource(name, DolarApiClient.from_env(base_url=target), ""))
+    return sources
+
+
+def rate_key(rate: ExchangeRate) -> str:
+    return normalize_type(rate.nombre)
 
 
 class ExchangeRateRepository:
-    def __init__(self, api_client: DolarApiClient):
+    def __init__(
+        self,
+        api_client: DolarApiClient,
+        strict: bool = False,
+        sources: Optional[List[RateSource]] = None,
+        deadline: Optional[float] = None
+    ):
         self.api_client = api_client
+        self.strict = strict
+        # La fuente principal (/dolares) va primero: ante el mismo tipo de
+        # cambio gana la fuente de mayor prioridad (orden de la lista)
+        self.sources = [RateSource("dolares", api_client)] + list(sources or [])
+        self.deadline = deadline
+        # Último resultado de cada fuente, reutilizado si no cambió (304)
+        self._source_rates: Dict[str, RateTable] = {}
+        # Validadores del GET condicional propios de este repositorio: el
+        # cliente se comparte con el CLI, el scheduler y otros repositorios
+        self._validators: Validators = {}
+        self.last_missed: List[str] = []
+    
+    @classmethod
+    def from_env(cls, api_client: DolarApiClient, strict: bool = False) -> "ExchangeRateRepository":
+        deadline = float(os.getenv("EXCHANGE_SOURCES_DEADLINE_SECONDS", "3"))
+        return cls(
+            api_client,
+            strict=strict,
+            sources=parse_sources(os.getenv("EXCHANGE_SOURCES", ""), api_client),
+            deadline=deadline if deadline > 0 else None
+        )
+    
+    @property
+    def multi_source(self) -> bool:
+        return len(self.sources) > 1
+    
+    async def get_all_rates(self) -> RateTable:
+        if not self.multi_source:
+            raw = await self.api_client.fetch_all_exchange_rates_raw(validators=self._validators)
+            return parse_rate_table(raw, strict=self.strict)
+        merged, _ = await self._fan_out(conditional=False)
+        return merged
     
-    async def get_all_rates(self) -> List[ExchangeRate]:
-        raw_data = await self.api_client.fetch_all_exchange_rates()
+    async def get_rates_if_changed(self) -> Optional[RateTable]:
+        """Devuelve None si la API externa no cambió desde el último fetch."""
+        if not self.multi_source:
+            raw = await self.api_client.fetch_exchange_rates_raw_if_changed(validators=self._validators)
+            if raw is None:
+                return None
+            return parse_rate_table(raw, strict=self.strict)
+        merged, changed = await self._fan_out(conditional=True)
+        return merged if changed else None
+    
+    async def aclose(self) -> None:
+        """Cierra los clientes de proveedores alternativos (el principal es compartido)."""
+        for client in {id(source.client): source.client for source in self.sources}.values():
+            if client is not self.api_client:
+                await client.close()
+    
+    async def _fan_out(self, conditional: bool) -> Tuple[RateTable, bool]:
+        """
+        Consulta todas las fuentes en paralelo bajo un único deadline y
+        combina por tipo de cambio. Una fuente que falla o no responde a
+        tiempo queda afuera del resultado (parcial); si no respondió
+        ninguna, se propaga el error de la de mayor prioridad.
+        """
+        tasks = {
+            asyncio.ensure_future(self._fetch_source(source, conditional)): source
+            for source in self.sources
+        }
+        done, pending = await asyncio.wait(tasks, timeout=self.deadline)
+        for task in pending:
+            task.cancel()
+        if pending:
+            # Se espera la cancelación para que cada fuente libere su estado
+            # (ej: la llamada de prueba del circuit breaker) antes de seguir
+            await asyncio.wait(pending)
+        
+        results: Dict[str, Optional[RateTable]] = {}
+        errors: List[Tuple[int, HTTPException]] = []
+        missed = []
+        for task, source in tasks.items():
+            if task in pending:
+                UPSTREAM_SOURCES.labels(source.name, "timeout").inc()
+                missed.append(source.name)
+                continue
+            error = task.exception()
+            if error is not None:
+                UPSTREAM_SOURCES.labels(source.name, "error").inc()
+                missed.append(source.name)
+                if not isinstance(error, HTTPException):
+                    error = HTTPException(status_code=502, detail=f'Error en la fuente {source.name}: {error}')
+                errors.append((self.sources.index(source), error))
+                continue
+            rates = task.result()
+            UPSTREAM_SOURCES.labels(source.name, "ok" if rates is not None else "unchanged").inc()
+            results[source.name] = rates
+        
+        if missed:
+            print(f"[SOURCES] Resultado parcial, sin respuesta de: {', '.join(missed)}")
+        self.last_missed = missed
         
-        exchange_rates = []
-        for item in raw_data:
-            exchange_rate = ExchangeRate(
-                nombre=item.get("nombre", ""),
-                compra=item.get("compra", 0.0),
-                venta=item.get("venta", 0.0),
-                fechaActualizacion=item.get("fechaActualizacion", "")
+        if not results:
+            if errors:
+                raise min(errors, key=lambda item: item[0])[1]
+            raise HTTPException(
+                status_code=504,
+                detail=f'Ninguna fuente respondió dentro del deadline ({self.deadline:g}s)'
             )
-            exchange_rates.append(exchange_rate)
         
-        return exchange_rates
+        # Cambió si alguna fuente trajo datos nuevos o el conjunto de fuentes
+        # que respondió no es el de la vez anterior
+        changed = any(rates is not None for rates in results.values())
+        if set(results) != set(self._source_rates):
+            changed = True
+        
+        current: Dict[str, RateTable] = {}
+        for source in self.sources:
+            if source.name not in results:
+                continue
+            table = results[source.name]
+            current[source.name] = table if table is not None else self._source_rates[source.name]
+        self._source_rates = current
+        
+        return RateTable.merge(list(current.values())), changed
+    
+    async def _fetch_source(self, source: RateSource, conditional: bool) -> Optional[RateTable]:
+        # Sin resultado previo de la fuente no alcanza con saber que no cambió
+        if conditional and source.name in self._source_rates:
+            raw = await source.client.fetch_raw_if_changed(source.path, self._validators)
+            if raw is None:
+                return None
+        else:
+            raw = await source.client.fetch_raw(source.path, self._validators)
+        return parse_rate_table(raw, strict=self.strict)
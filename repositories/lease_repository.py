@@ -0,0 +1,73 @@
+from sqlmodel import delete
+from sqlmodel.ext.asyncio.session import AsyncSession
+from sqlalchemy import case
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from database.models import SchedulerLeaseDB
+from repositories.exchange_history_repository import to_utc
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+
+class LeaseRepository:
+    async def try_acquire_async(
+        self,
+        name: str,
+        holder: str,
+        ttl_seconds: float,
+        session: AsyncSession,
+        now: Optional[datetime] = None
+    ) -> bool:
+        """
+        Toma o renueva el lease en un solo INSERT ... ON CONFLICT DO UPDATE.
+        El UPDATE sólo aplica si el lease ya es de `holder` o está vencido,
+        así que dos workers nunca lo obtienen a la vez.
+        """
+        now = to_utc(now or datetime.now(timezone.utc))
+        statement = self._acquire_statement(name, holder, now, now + timedelta(seconds=ttl_seconds))
+
+        try:
+            result = await session.execute(statement)
+            acquired = result.first() is not None
+            await session.commit()
+            return acquired
+        except Exception:
+            await session.rollback()
+            raise
+
+    async def release_async(self, name: str, holder: str, session: AsyncSession) -> None:
+        try:
+            await session.execute(
+                delete(SchedulerLeaseDB)
+                .where(SchedulerLeaseDB.name == name)
+                .where(SchedulerLeaseDB.holder == holder)
+            )
+            await session.commit()
+        except Exception:
+            await session.rollback()
+            raise
+
+    async def get_async(self, name: str, session: AsyncSession) -> Optional[SchedulerLeaseDB]:
+        return await session.get(SchedulerLeaseDB, name)
+
+    def _acquire_statement(self, name: str, holder: str, now: datetime, expires_at: datetime):
+        statement = sqlite_insert(SchedulerLeaseDB).values(
+            name=name,
+            holder=holder,
+            expires_at=expires_at,
+            acquired_at=now
+        )
+        excluded = statement.excluded
+        current = SchedulerLeaseDB.__table__.c
+        return statement.on_conflict_do_update(
+            index_elements=[SchedulerLeaseDB.name],
+            set_={
+                "holder": excluded.holder,
+                "expires_at": excluded.expires_at,
+                # Una renovación conserva la fecha en que se obtuvo el lease
+                "acquired_at": case(
+                    (current.holder == holder, current.acquired_at),
+                    else_=excluded.acquired_at
+                )
+            },
+            where=(current.holder == holder) | (current.expires_at <= now)
+        ).returning(current.holder)
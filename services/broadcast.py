@@ -0,0 +1,195 @@
+import asyncio
+import json
+from collections import deque
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Deque, Dict, Optional, Set
+
+
+@dataclass(frozen=True)
+class Message:
+    """
+    Mensaje ya serializado para todos los suscriptores: el frame SSE y el
+    texto del WebSocket se arman una vez al publicar, no por conexión.
+    """
+    event: str
+    id: Optional[str]
+    data: bytes
+    sse: bytes
+    ws: str
+
+    @classmethod
+    def build(cls, event: str, data: bytes, id: Optional[str] = None) -> "Message":
+        sse = f"event: {event}\n".encode()
+        if id is not None:
+            sse += f"id: {id}\n".encode()
+        sse += b"data: " + data + b"\n\n"
+
+        ws = b'{"event":' + json.dumps(event).encode()
+        if id is not None:
+            ws += b',"id":' + json.dumps(id).encode()
+        ws += b',"data":' + data + b"}"
+
+        return cls(event=event, id=id, data=data, sse=sse, ws=ws.decode())
+
+
+# El heartbeat es el mismo objeto para todos: no se serializa en cada tick
+HEARTBEAT = Message(
+    event="heartbeat",
+    id=None,
+    data=b"{}",
+    sse=b": heartbeat\n\n",
+    ws='{"event":"heartbeat"}'
+)
+
+
+class Subscription:
+    """
+    Cola acotada de un suscriptor. Si el consumidor no da abasto, el backlog
+    se descarta y se reemplaza por el estado completo más reciente: el
+    cliente se resincroniza con un solo mensaje en vez de recibir deltas viejos.
+    """
+
+    def __init__(self, hub: "BroadcastHub", max_pending: int):
+        self._hub = hub
+        self._max_pending = max_pending
+        self._pending: Deque[Message] = deque()
+        self._ready = asyncio.Event()
+        self.closed = False
+        self.dropped = 0
+
+    def push(self, message: Message) -> None:
+        if self.closed:
+            return
+        if message is HEARTBEAT and self._pending:
+            # Ya tiene algo que leer: el heartbeat no aporta
+            return
+        if len(self._pending) >= self._max_pending:
+            self.dropped += len(self._pending)
+            self._hub.dropped += len(self._pending)
+            self._hub.coalesced += 1
+            self._pending.clear()
+            # El estado ya incluye al delta que desbordó la cola
+            state = self._hub.state
+            self._pending.append(state if state is not None else message)
+        else:
+            self._pending.append(message)
+        self._ready.set()
+
+    def close(self) -> None:
+        self.closed = True
+        self._ready.set()
+
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def __aiter__(self) -> "Subscription":
+        return self
+
+    async def __anext__(self) -> Message:
+        while not self._pending:
+            if self.closed:
+                raise StopAsyncIteration
+            self._ready.clear()
+            await self._ready.wait()
+        return self._pending.popleft()
+
+
+class BroadcastHub:
+    """
+    Fan-out de actualizaciones a muchos suscriptores (SSE, WebSocket).
+
+    Cada mensaje se publica una vez y se encola por referencia en cada
+    suscriptor, sin await: un consumidor lento no frena a los demás. Una
+    sola tarea manda los heartbeats y llama a `tick` (ej: adoptar un
+    snapshot nuevo) mientras haya suscriptores.
+    """
+
+    def __init__(
+        self,
+        max_pending: int = 32,
+        heartbeat: float = 15.0,
+        tick: Optional[Callable[[], Awaitable[None]]] = None
+    ):
+        if max_pending < 1:
+            raise ValueError("max_pending debe ser >= 1")
+        if heartbeat <= 0:
+            raise ValueError("heartbeat debe ser > 0")
+
+        self.max_pending = max_pending
+        self.heartbeat = heartbeat
+        self.tick = tick
+        self.state: Optional[Message] = None
+        self._subscriptions: Set[Subscription] = set()
+        self._task: Optional[asyncio.Task] = None
+        self.published = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    @property
+    def subscribers(self) -> int:
+        return len(self._subscriptions)
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def start(self) -> None:
+        # La tarea queda ligada al loop en ejecución
+        if not self.is_running:
+            self._task = asyncio.get_running_loop().create_task(self._heartbeat_loop())
+
+    async def stop(self) -> None:
+        """Cierra las suscripciones (terminan los streams) y frena el heartbeat."""
+        for subscription in list(self._subscriptions):
+            subscription.close()
+        self._subscriptions.clear()
+
+        if self._task is not None:
+            task, self._task = self._task, None
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def subscribe(self) -> Subscription:
+        self.start()
+        subscription = Subscription(self, self.max_pending)
+        # Un suscriptor nuevo arranca con el estado completo
+        if self.state is not None:
+            subscription.push(self.state)
+        self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        subscription.close()
+        self._subscriptions.discard(subscription)
+
+    def publish(self, message: Message, state: Optional[Message] = None) -> None:
+        """Publica `message`; `state` reemplaza al estado completo para nuevos y rezagados."""
+        if state is not None:
+            self.state = state
+        self.published += 1
+        for subscription in self._subscriptions:
+            subscription.push(message)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "subscribers": self.subscribers,
+            "published": self.published,
+            "dropped": self.dropped,
+            "coalesced": self.coalesced
+        }
+
+    async def _heartbeat_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat)
+            if not self._subscriptions:
+                continue
+            if self.tick is not None:
+                try:
+                    await self.tick()
+                except Exception as e:
+                    print(f"[STREAM] Error en el tick del hub: {str(e)}")
+            for subscription in self._subscriptions:
+                subscription.push(HEARTBEAT)
@@ -1,61 +1,340 @@
 from models.exchange_rate import ExchangeRateResponse, ExchangeRateAverage
+from models.rate_table import RateTable
 from repositories.exchange_rate_repository import ExchangeRateRepository
-from repositories.exchange_db_repository import ExchangeDBRepository
+from repositories.exchange_db_repository import ExchangeDBRepository, to_exchange_rate
+from repositories.exchange_history_repository import ExchangeHistoryRepository
+from services.single_flight import SingleFlight
+from services.serialized_snapshot import SerializedSnapshot
+from services.write_behind import WriteBehindQueue
+from metrics.instruments import AVERAGE_SECONDS, DB_UPSERT_SECONDS, ROWS_WRITTEN, STALE_FALLBACKS
+from fastapi import HTTPException
 from sqlmodel import Session
-from typing import Optional
+from sqlmodel.ext.asyncio.session import AsyncSession
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+DBSession = Union[Session, AsyncSession]
+
+
+@dataclass
+class PersistStats:
+    inserted: int = 0
+    updated: int = 0
+    skipped: int = 0
+    
+    @property
+    def changed(self) -> int:
+        return self.inserted + self.updated
 
 
 class ExchangeRateService:    
     def __init__(
         self, 
         api_repository: ExchangeRateRepository,
-        db_repository: Optional[ExchangeDBRepository] = None
+        db_repository: Optional[ExchangeDBRepository] = None,
+        bulk_upsert: bool = True,
+        history_repository: Optional[ExchangeHistoryRepository] = None,
+        record_history: bool = True,
+        conditional_fetch: bool = True,
+        compress_responses: bool = True,
+        persist_queue: Optional[WriteBehindQueue[ExchangeRateResponse]] = None,
+        stale_fallback: bool = True,
+        fallback_session_factory: Optional[Callable[[], AsyncSession]] = None
     ):
         self.api_repository = api_repository
         self.db_repository = db_repository or ExchangeDBRepository()
+        self.bulk_upsert = bulk_upsert
+        self.history_repository = history_repository or ExchangeHistoryRepository()
+        self.record_history = record_history
+        self.conditional_fetch = conditional_fetch
+        self.compress_responses = compress_responses
+        # Con cola, persistir es encolar: la escritura la hace su worker
+        self.persist_queue = persist_queue
+        self.single_flight = SingleFlight()
+        # Último resultado, reutilizado cuando la API externa no cambió, y su
+        # tabla compacta (lo que usan promedio, persistencia e historial)
+        self._last_response: Optional[ExchangeRateResponse] = None
+        self._last_table: Optional[RateTable] = None
+        self._last_persisted = False
+        # Snapshot encolado en la cola write-behind y todavía sin escribir: se
+        # marca persistido recién cuando el batch se escribe bien
+        self._queued_response: Optional[ExchangeRateResponse] = None
+        self.unchanged_fetches = 0
+        # Última versión persistida por tipo, cargada una vez desde la base
+        self._persisted_rows: Optional[Dict[str, Tuple[float, ...]]] = None
+        self.last_persist_stats = PersistStats()
+        self._serialized: Optional[SerializedSnapshot] = None
+        # Si la API externa falla se responde con el último dato conocido:
+        # primero el de memoria y, en un proceso recién iniciado, la base
+        self.stale_fallback = stale_fallback
+        self.fallback_session_factory = fallback_session_factory
     
     async def get_all_rates_with_average(
         self, 
-        session: Optional[Session] = None,
+        session: Optional[DBSession] = None,
+        persist: bool = True
+    ) -> ExchangeRateResponse:
+        # Los llamadores concurrentes comparten un único fetch (y persistencia)
+        will_persist = persist and (session is not None or self.persist_queue is not None)
+        return await self.single_flight.do(
+            ("rates", will_persist),
+            lambda: self._fetch_rates_with_average(session, will_persist)
+        )
+    
+    async def get_serialized_snapshot(
+        self,
+        session: Optional[DBSession] = None,
         persist: bool = True
+    ) -> SerializedSnapshot:
+        response = await self.get_all_rates_with_average(session=session, persist=persist)
+        
+        # Una versión sin cambios devuelve el mismo objeto: se reutilizan los bytes
+        serialized = self._serialized
+        if serialized is None or serialized.response is not response:
+            serialized = SerializedSnapshot.from_response(response, compress=self.compress_responses)
+            self._serialized = serialized
+        return serialized
+    
+    def coalescing_stats(self) -> dict:
+        return self.single_flight.stats()
+    
+    async def _fetch_rates_with_average(
+        self,
+        session: Optional[DBSession],
+        persist: bool
     ) -> ExchangeRateResponse:
-        rates = await self.api_repository.get_all_rates()
+        previous = self._last_response
+        
+        try:
+            if self.conditional_fetch and previous is not None:
+                rates = await self.api_repository.get_rates_if_changed()
+            else:
+                rates = await self.api_repository.get_all_rates()
+        except HTTPException as exc:
+            if not self.stale_fallback:
+                raise
+            return await self._stale_response(exc)
         
-        if not rates:
-            average = ExchangeRateAverage(compra=0.0, venta=0.0)
+        if rates is None:
+            # Sin cambios en origen: no se valida, promedia ni persiste de nuevo
+            self.unchanged_fetches += 1
+            if not persist or self._last_persisted or self._queued_response is previous:
+                return previous
+            response, table = previous, self._last_table
         else:
-            total_compra = sum(rate.compra for rate in rates)
-            total_venta = sum(rate.venta for rate in rates)
-            count = len(rates)
-            
-            average = ExchangeRateAverage(
-                compra=round(total_compra / count, 2),
-                venta=round(total_venta / count, 2)
+            # Los modelos pydantic de la respuesta se arman una vez por versión
+            table = RateTable.from_rates(rates)
+            response = ExchangeRateResponse(
+                rates=list(table.models()),
+                average=self._compute_average(table)
             )
         
-        if persist and session is not None:
-            self._persist_rates(rates, average, session)
+        if persist and self.persist_queue is not None:
+            # Se registra antes de encolar: el worker puede escribirlo enseguida
+            self._last_response = response
+            self._last_table = table
+            self._last_persisted = False
+            self._queued_response = response
+            await self.persist_queue.put(response)
+            return response
         
-        return ExchangeRateResponse(rates=rates, average=average)
+        if persist and isinstance(session, AsyncSession):
+            await self._persist_rates_async(table, response.average, session)
+        elif persist and session is not None:
+            self._persist_rates(table, response.average, session)
+        
+        self._last_response = response
+        self._last_table = table
+        self._last_persisted = persist
+        return response
+    
+    async def _stale_response(self, error: HTTPException) -> ExchangeRateResponse:
+        # El dato viejo no se persiste ni reemplaza al último bueno
+        if self._last_response is not None:
+            STALE_FALLBACKS.labels("memory").inc()
+            print(f"[FALLBACK] API externa con error ({error.status_code}), se sirve el último snapshot")
+            return self._last_response.model_copy(update={"stale": True})
+        
+        if self.fallback_session_factory is not None:
+            try:
+                async with self.fallback_session_factory() as session:
+                    db_rates = await self.db_repository.get_all_rates_async(session)
+            except Exception as db_error:
+                print(f"[FALLBACK] No se pudieron leer las tasas persistidas: {db_error}")
+                raise error
+            
+            if db_rates:
+                STALE_FALLBACKS.labels("db").inc()
+                print(f"[FALLBACK] API externa con error ({error.status_code}), se sirven {len(db_rates)} tasas de la base")
+                rates = [to_exchange_rate(db_rate) for db_rate in db_rates]
+                return ExchangeRateResponse(rates=rates, average=self._compute_average(rates), stale=True)
+        
+        raise error
+    
+    async def persist_responses_async(
+        self,
+        responses: List[ExchangeRateResponse],
+        session: AsyncSession
+    ) -> None:
+        """Escribe un batch de snapshots encolados, en orden, con una sola sesión."""
+        for response in responses:
+            try:
+                await self._persist_rates_async(self._table_for(response), response.average, session)
+            except Exception:
+                # El próximo ciclo sin cambios vuelve a encolar el último snapshot
+                self._queued_response = None
+                raise
+            if response is self._last_response:
+                self._last_persisted = True
+                self._queued_response = None
+    
+    def _table_for(self, response: ExchangeRateResponse) -> RateTable:
+        if response is self._last_response and self._last_table is not None:
+            return self._last_table
+        return RateTable.from_rates(response.rates)
+    
+    def _compute_average(self, rates: Sequence) -> ExchangeRateAverage:
+        with AVERAGE_SECONDS.time():
+            return self._average(rates)
+    
+    def _average(self, rates: Sequence) -> ExchangeRateAverage:
+        compra, venta = RateTable.from_rates(rates).average()
+        return ExchangeRateAverage(compra=compra, venta=venta)
     
     def _persist_rates(
         self, 
-        rates: list, 
+        rates: Sequence, 
         average: ExchangeRateAverage, 
         session: Session
     ) -> None:
+        if self._persisted_rows is None:
+            self._load_persisted_rows(self.db_repository.get_all_rates(session))
+        
+        rows, stats = self._diff_rows(self._build_rows(rates, average))
+        
+        if rows:
+            with DB_UPSERT_SECONDS.time():
+                if self.bulk_upsert:
+                    self.db_repository.upsert_many(rows, session=session)
+                else:
+                    for row in rows:
+                        self.db_repository.update_or_create_rate(**row, session=session)
+            ROWS_WRITTEN.labels("exchange_rates").inc(len(rows))
+            
+            if self.record_history:
+                observations = self._build_observations(rates, changed_types={row["type"] for row in rows})
+                self.history_repository.append_many(observations, session=session)
+                ROWS_WRITTEN.labels("exchange_rate_history").inc(len(observations))
+        
+        self._remember_persisted_rows(rows, stats)
+    
+    async def _persist_rates_async(
+        self,
+        rates: Sequence,
+        average: ExchangeRateAverage,
+        session: AsyncSession
+    ) -> None:
+        if self._persisted_rows is None:
+            self._load_persisted_rows(await self.db_repository.get_all_rates_async(session))
+        
+        rows, stats = self._diff_rows(self._build_rows(rates, average))
+        
+        if rows:
+            with DB_UPSERT_SECONDS.time():
+                if self.bulk_upsert:
+                    await self.db_repository.upsert_many_async(rows, session=session)
+                else:
+                    for row in rows:
+                        await self.db_repository.update_or_create_rate_async(**row, session=session)
+            ROWS_WRITTEN.labels("exchange_rates").inc(len(rows))
+            
+            if self.record_history:
+                observations = self._build_observations(rates, changed_types={row["type"] for row in rows})
+                await self.history_repository.append_many_async(observations, session=session)
+                ROWS_WRITTEN.labels("exchange_rate_history").inc(len(observations))
+        
+        self._remember_persisted_rows(rows, stats)
+    
+    def _load_persisted_rows(self, db_rates: list) -> None:
+        self._persisted_rows = {
+            db_rate.type: self._fingerprint(db_rate.buy, db_rate.sell, db_rate.rate, db_rate.diff)
+            for db_rate in db_rates
+        }
+    
+    def _diff_rows(self, rows: list) -> Tuple[list, PersistStats]:
+        persisted = self._persisted_rows or {}
+        stats = PersistStats()
+        
+        changed = []
+        for row in rows:
+            previous = persisted.get(row["type"])
+            if previous is None:
+                stats.inserted += 1
+            elif previous == self._fingerprint(row["buy"], row["sell"], row["rate"], row["diff"]):
+                stats.skipped += 1
+                continue
+            else:
+                stats.updated += 1
+            changed.append(row)
+        
+        return changed, stats
+    
+    def _remember_persisted_rows(self, rows: list, stats: PersistStats) -> None:
+        # Sólo se actualiza después de escribir: si la escritura falla se reintenta
+        if self._persisted_rows is None:
+            self._persisted_rows = {}
+        for row in rows:
+            self._persisted_rows[row["type"]] = self._fingerprint(
+                row["buy"], row["sell"], row["rate"], row["diff"]
+            )
+        self.last_persist_stats = stats
+    
+    def _fingerprint(self, buy, sell, rate, diff) -> Tuple[float, ...]:
+        # Misma precisión que las columnas (2 decimales)
+        return tuple(round(float(value), 2) for value in (buy, sell, rate, diff))
+    
+    def _build_rows(self, rates: Sequence, average: ExchangeRateAverage) -> list:
+        table = RateTable.from_rates(rates)
         avg_price = (average.compra + average.venta) / 2
         
-        for rate in rates:
-            current_price = (rate.compra + rate.venta) / 2
+        rows = []
+        for type, buy, sell in zip(table.types, table.buy, table.sell):
+            current_price = (buy + sell) / 2
             normalized_rate = round(current_price / avg_price, 4) if avg_price > 0 else 0.0
             diff = round(current_price - avg_price, 2)
 
-            self.db_repository.update_or_create_rate(
-                type=rate.nombre.lower().replace(" ", "_"),
-                buy=rate.compra,
-                sell=rate.venta,
-                rate=normalized_rate,
-                diff=diff,
-                session=session
-            )
+            rows.append({
+                "type": type,
+                "buy": buy,
+                "sell": sell,
+                "rate": normalized_rate,
+                "diff": diff
+            })
+        
+        return rows
+    
+    def _build_observations(self, rates: Sequence, changed_types: Optional[set] = None) -> list:
+        # observed_at es la fecha de la cotización en origen: la misma cotización
+        # vista en varias sincronizaciones no duplica filas en el historial
+        table = RateTable.from_rates(rates)
+        synced_at = datetime.now(timezone.utc)
+        
+        observations = []
+        for type, buy, sell, updated in zip(table.types, table.buy, table.sell, table.updated):
+            if changed_types is not None and type not in changed_types:
+                continue
+            
+            try:
+                observed_at = datetime.fromisoformat(updated)
+            except ValueError:
+                observed_at = synced_at
+            
+            observations.append({
+                "type": type,
+                "observed_at": observed_at,
+                "buy": buy,
+                "sell": sell
+            })
+        
+        return observations
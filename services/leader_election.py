@@ -0,0 +1,117 @@
+import asyncio
+import os
+import socket
+import time
+import uuid
+from typing import AsyncContextManager, Callable, Optional
+
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from repositories.lease_repository import LeaseRepository
+
+
+def default_holder_id() -> str:
+    # Único por proceso: varios workers de uvicorn comparten host
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class LeaderElection:
+    """
+    Elección de líder entre workers con un lease en la base de datos.
+
+    - start() lanza un heartbeat que toma o renueva el lease cada
+      heartbeat_seconds; el lease dura lease_seconds.
+    - Si el líder muere deja de renovar y, al vencer el lease, otro worker
+      lo toma en su siguiente heartbeat.
+    - is_leader se evalúa contra un vencimiento local medido desde antes de
+      la consulta, así que nunca se cree líder más tiempo que el lease.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], AsyncContextManager[AsyncSession]],
+        name: str = "sync_exchange_rates",
+        holder: Optional[str] = None,
+        lease_seconds: float = 30.0,
+        heartbeat_seconds: float = 10.0,
+        repository: Optional[LeaseRepository] = None,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        if lease_seconds <= 0:
+            raise ValueError("lease_seconds debe ser > 0")
+        if not 0 < heartbeat_seconds < lease_seconds:
+            raise ValueError("heartbeat_seconds debe ser > 0 y menor que lease_seconds")
+
+        self.session_factory = session_factory
+        self.name = name
+        self.holder = holder or default_holder_id()
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.repository = repository or LeaseRepository()
+        self.clock = clock
+        self._leader_until: Optional[float] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+
+    @classmethod
+    def from_env(
+        cls,
+        session_factory: Callable[[], AsyncContextManager[AsyncSession]]
+    ) -> "LeaderElection":
+        return cls(
+            session_factory=session_factory,
+            lease_seconds=float(os.getenv("LEADER_LEASE_SECONDS", "30")),
+            heartbeat_seconds=float(os.getenv("LEADER_HEARTBEAT_SECONDS", "10"))
+        )
+
+    @property
+    def is_leader(self) -> bool:
+        return self._leader_until is not None and self.clock() < self._leader_until
+
+    async def try_acquire(self) -> bool:
+        started = self.clock()
+        was_leader = self.is_leader
+
+        try:
+            async with self.session_factory() as session:
+                acquired = await self.repository.try_acquire_async(
+                    self.name, self.holder, self.lease_seconds, session
+                )
+        except Exception as e:
+            # Sin renovar, el liderazgo local vence solo con el lease
+            print(f"[LEADER] Error renovando lease '{self.name}': {str(e)}")
+            return self.is_leader
+
+        self._leader_until = started + self.lease_seconds if acquired else None
+
+        if acquired and not was_leader:
+            print(f"[LEADER] {self.holder} es líder de '{self.name}'")
+        elif was_leader and not acquired:
+            print(f"[LEADER] {self.holder} perdió el liderazgo de '{self.name}'")
+        return acquired
+
+    def start(self) -> None:
+        if self._heartbeat_task is None or self._heartbeat_task.done():
+            self._heartbeat_task = asyncio.create_task(self._heartbeat())
+
+    async def stop(self) -> None:
+        task, self._heartbeat_task = self._heartbeat_task, None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+        if self.is_leader:
+            # Se libera el lease para que otro worker no espere a que venza
+            try:
+                async with self.session_factory() as session:
+                    await self.repository.release_async(self.name, self.holder, session)
+            except Exception as e:
+                print(f"[LEADER] Error liberando lease '{self.name}': {str(e)}")
+        self._leader_until = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            await self.try_acquire()
+            await asyncio.sleep(self.heartbeat_seconds)
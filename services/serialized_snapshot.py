@@ -0,0 +1,120 @@
+import gzip
+import hashlib
+import json
+from dataclasses import dataclass, field
+from typing import Dict, Optional, Tuple
+
+from metrics.instruments import SERIALIZATION_SECONDS
+from models.exchange_rate import ExchangeRateResponse
+from repositories.exchange_rate_repository import rate_key
+
+try:
+    import brotli
+except ImportError:  # brotli es opcional: sin él sólo se ofrece gzip
+    brotli = None
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+@dataclass(frozen=True)
+class SerializedSnapshot:
+    """
+    Respuesta ya serializada (y comprimida) de una versión del snapshot.
+    Se construye una vez por versión y se sirve tal cual en cada request.
+    """
+    response: ExchangeRateResponse
+    body: bytes
+    version: str
+    encoded: Dict[str, bytes] = field(default_factory=dict)
+    # Índice por tipo normalizado -> (cuerpo JSON de la tasa, ETag). Se arma
+    # junto con el snapshot, así que se reemplaza entero (atómico) en cada sync
+    index: Dict[str, Tuple[bytes, str]] = field(default_factory=dict)
+
+    @classmethod
+    def from_response(
+        cls,
+        response: ExchangeRateResponse,
+        compress: bool = True
+    ) -> "SerializedSnapshot":
+        # model_dump_json serializa en Rust (pydantic-core), sin pasar por jsonable_encoder
+        with SERIALIZATION_SECONDS.time():
+            body = response.model_dump_json().encode()
+            return cls._build(response, body, None, compress)
+
+    @classmethod
+    def from_body(
+        cls,
+        body: bytes,
+        version: Optional[str] = None,
+        compress: bool = True
+    ) -> "SerializedSnapshot":
+        """Reconstruye el snapshot a partir del cuerpo ya serializado (ej: de otro worker)."""
+        response = ExchangeRateResponse.model_validate_json(body)
+        return cls._build(response, body, version, compress)
+
+    @classmethod
+    def _build(
+        cls,
+        response: ExchangeRateResponse,
+        body: bytes,
+        version: Optional[str],
+        compress: bool
+    ) -> "SerializedSnapshot":
+        if version is None:
+            version = hashlib.sha256(body).hexdigest()[:32]
+
+        encoded = {}
+        if compress:
+            encoded["gzip"] = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+            if brotli is not None:
+                encoded["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+
+        index = {}
+        for rate in response.rates:
+            # Ante tipos repetidos queda el primero, igual que en el merge de fuentes
+            key = rate_key(rate)
+            if key not in index:
+                rate_body = rate.model_dump_json().encode()
+                index[key] = (rate_body, f'"{hashlib.sha256(rate_body).hexdigest()[:32]}"')
+
+        return cls(response=response, body=body, version=version, encoded=encoded, index=index)
+
+    def etag(self, encoding: Optional[str] = None) -> str:
+        # Cada codificación es una representación distinta: ETag fuerte propio
+        if encoding is None:
+            return f'"{self.version}"'
+        return f'"{self.version}-{encoding}"'
+
+    def etags(self) -> list:
+        return [self.etag()] + [self.etag(encoding) for encoding in self.encoded]
+
+    def lookup(self, type: str) -> Optional[Tuple[bytes, str]]:
+        """Cuerpo y ETag de un tipo de cambio normalizado, sin recorrer las tasas."""
+        return self.index.get(type)
+
+    def delta_since(self, previous: Optional["SerializedSnapshot"]) -> bytes:
+        """
+        JSON con las tasas que cambiaron respecto de `previous` (comparando el
+        ETag de cada tipo en el índice), las que desaparecieron y el promedio.
+        Se arma concatenando los cuerpos ya serializados del índice.
+        """
+        before = previous.index if previous is not None else {}
+        changed = [
+            body for type, (body, etag) in self.index.items()
+            if before.get(type, (None, None))[1] != etag
+        ]
+        removed = sorted(type for type in before if type not in self.index)
+        return (
+            b'{"version":' + json.dumps(self.version).encode()
+            + b',"average":' + self.response.average.model_dump_json().encode()
+            + b',"stale":' + (b"true" if self.response.stale else b"false")
+            + b',"changed":[' + b",".join(changed) + b"]"
+            + b',"removed":' + json.dumps(removed).encode()
+            + b"}"
+        )
+
+    def content(self, encoding: Optional[str] = None) -> bytes:
+        if encoding is None:
+            return self.body
+        return self.encoded[encoding]
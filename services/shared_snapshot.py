@@ -0,0 +1,169 @@
+import mmap
+import os
+import struct
+import time
+from typing import Optional
+
+from services.serialized_snapshot import SerializedSnapshot
+
+try:
+    import fcntl
+except ImportError:  # Windows: sin flock, se confía en que hay un solo líder
+    fcntl = None
+
+MAGIC = b"EXSNAP01"
+# magic, seq, published_at (epoch), length, version
+HEADER = struct.Struct("<8sQdQ32s")
+SEQ = struct.Struct("<Q")
+SEQ_OFFSET = 8
+DEFAULT_CAPACITY = 1024 * 1024
+READ_RETRIES = 100
+
+
+class SharedSnapshotFile:
+    """
+    Snapshot serializado compartido entre workers en un archivo mapeado en
+    memoria, con un header estilo seqlock.
+
+    - El escritor (el líder) pone seq impar, copia el cuerpo y los campos
+      del header y termina con seq par.
+    - Un lector lee seq, el header y el cuerpo y vuelve a leer seq: si
+      cambió o era impar, reintenta.
+    - Mientras seq no cambie, read() devuelve el mismo SerializedSnapshot
+      sin tocar el cuerpo: el archivo sólo se relee con una versión nueva.
+    """
+
+    def __init__(self, path: str, capacity: int = DEFAULT_CAPACITY):
+        if capacity <= 0:
+            raise ValueError("capacity debe ser > 0")
+
+        self.path = path
+        self.capacity = capacity
+        self._fd: Optional[int] = None
+        self._map: Optional[mmap.mmap] = None
+        self._seen_seq: Optional[int] = None
+        self._current: Optional[SerializedSnapshot] = None
+        self._published_at = 0.0
+
+    @property
+    def size(self) -> int:
+        return HEADER.size + self.capacity
+
+    def open(self) -> None:
+        if self._map is not None:
+            return
+
+        # Todos los workers abren (y si hace falta crean) el mismo archivo;
+        # el header en cero no tiene MAGIC y se lee como "sin snapshot"
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size < self.size:
+                os.ftruncate(fd, self.size)
+            self._map = mmap.mmap(fd, self.size, access=mmap.ACCESS_WRITE)
+        except Exception:
+            os.close(fd)
+            raise
+        self._fd = fd
+
+    def close(self) -> None:
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def publish(self, serialized: SerializedSnapshot) -> int:
+        body = serialized.body
+        if len(body) > self.capacity:
+            raise ValueError(
+                f"Snapshot de {len(body)} bytes excede la capacidad ({self.capacity})"
+            )
+
+        self.open()
+        assert self._map is not None and self._fd is not None
+
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            (seq,) = SEQ.unpack_from(self._map, SEQ_OFFSET)
+            writing = seq + 1 if seq % 2 == 0 else seq + 2
+            published_at = time.time()
+
+            SEQ.pack_into(self._map, SEQ_OFFSET, writing)
+            self._map[HEADER.size:HEADER.size + len(body)] = body
+            HEADER.pack_into(
+                self._map, 0,
+                MAGIC, writing, published_at, len(body), serialized.version.encode()
+            )
+            SEQ.pack_into(self._map, SEQ_OFFSET, writing + 1)
+        finally:
+            if fcntl is not None:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+        # El propio escritor no necesita releer lo que acaba de publicar
+        self._seen_seq = writing + 1
+        self._current = serialized
+        self._published_at = published_at
+        return writing + 1
+
+    def has_new_version(self) -> bool:
+        seq = self._stable_seq()
+        return seq is not None and seq != self._seen_seq
+
+    def read(self, max_age: Optional[float] = None) -> Optional[SerializedSnapshot]:
+        """
+        Devuelve el último snapshot publicado, o None si no hay ninguno
+        completo o si es más viejo que max_age segundos.
+        """
+        seq = self._stable_seq()
+        if seq is None:
+            return None
+
+        if seq != self._seen_seq:
+            if not self._load():
+                return None
+
+        if max_age is not None and time.time() - self._published_at > max_age:
+            return None
+        return self._current
+
+    def age(self, serialized: SerializedSnapshot) -> float:
+        """Segundos desde que se publicó `serialized`; 0 si no salió de este archivo."""
+        if serialized is not self._current:
+            return 0.0
+        return max(0.0, time.time() - self._published_at)
+
+    def _stable_seq(self) -> Optional[int]:
+        try:
+            self.open()
+        except OSError:
+            return None
+        assert self._map is not None
+
+        magic, seq, _, _, _ = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or seq % 2:
+            return None
+        return seq
+
+    def _load(self) -> bool:
+        assert self._map is not None
+
+        for _ in range(READ_RETRIES):
+            magic, seq, published_at, length, version = HEADER.unpack_from(self._map, 0)
+            if magic != MAGIC:
+                return False
+            if seq % 2 or length > self.capacity:
+                continue
+
+            # Copia única por versión: el escritor reutiliza el mismo buffer
+            body = self._map[HEADER.size:HEADER.size + length]
+
+            (check,) = SEQ.unpack_from(self._map, SEQ_OFFSET)
+            if check == seq:
+                self._current = SerializedSnapshot.from_body(body, version=version.decode())
+                self._seen_seq = seq
+                self._published_at = published_at
+                return True
+
+        return False
@@ -0,0 +1,126 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+@dataclass(frozen=True)
+class Snapshot(Generic[T]):
+    value: T
+    loaded_at: float
+    version: Optional[str] = None
+
+    def age(self, now: float) -> float:
+        return now - self.loaded_at
+
+
+class SnapshotCache(Generic[T]):
+    """
+    Cache en memoria de un único snapshot con stale-while-revalidate.
+
+    - Edad < ttl: se devuelve el snapshot sin tocar la red.
+    - ttl <= edad < max_staleness: se devuelve el snapshot viejo y se
+      dispara un refresh en segundo plano (uno solo a la vez).
+    - Edad >= max_staleness o sin snapshot: se espera una carga nueva.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[], Awaitable[T]],
+        ttl: float = 60.0,
+        max_staleness: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+        versioner: Optional[Callable[[T], str]] = None,
+        on_change: Optional[Callable[[Optional[Snapshot[T]], Snapshot[T]], None]] = None,
+        age_of: Optional[Callable[[T], float]] = None
+    ):
+        if ttl < 0:
+            raise ValueError("ttl debe ser >= 0")
+        if max_staleness < ttl:
+            raise ValueError("max_staleness debe ser >= ttl")
+
+        self.loader = loader
+        self.ttl = ttl
+        self.max_staleness = max_staleness
+        self.clock = clock
+        self.versioner = versioner
+        # Se llama con (anterior, nuevo) cuando cambia la versión del snapshot
+        self.on_change = on_change
+        # Edad que ya trae un valor al cargarse (ej: publicado antes por otro
+        # worker): el TTL y el max-age se cuentan desde su origen, no desde acá
+        self.age_of = age_of
+        self._snapshot: Optional[Snapshot[T]] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    @property
+    def snapshot(self) -> Optional[Snapshot[T]]:
+        return self._snapshot
+
+    async def get(self) -> T:
+        snapshot = await self.get_snapshot()
+        return snapshot.value
+
+    async def get_snapshot(self) -> Snapshot[T]:
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.misses += 1
+            return await self.refresh()
+
+        age = snapshot.age(self.clock())
+        if age < self.ttl:
+            self.hits += 1
+            return snapshot
+        if age < self.max_staleness:
+            self.stale_hits += 1
+            self.schedule_refresh()
+            return snapshot
+
+        self.misses += 1
+        return await self.refresh()
+
+    async def refresh(self) -> Snapshot[T]:
+        value = await self.loader()
+        return self.set(value)
+
+    def set(self, value: T) -> Snapshot[T]:
+        # La versión se calcula una vez por snapshot, no por request
+        version = self.versioner(value) if self.versioner is not None else None
+        age = max(0.0, self.age_of(value)) if self.age_of is not None else 0.0
+        snapshot = Snapshot(value=value, loaded_at=self.clock() - age, version=version)
+        previous, self._snapshot = self._snapshot, snapshot
+        if self.on_change is not None and (
+            previous is None or version is None or previous.version != version
+        ):
+            self.on_change(previous, snapshot)
+        return snapshot
+
+    def time_to_live(self, snapshot: Snapshot[T]) -> float:
+        return max(0.0, self.ttl - snapshot.age(self.clock()))
+
+    def stats(self) -> dict:
+        return {
+            "hit": self.hits,
+            "stale": self.stale_hits,
+            "miss": self.misses
+        }
+
+    def invalidate(self) -> None:
+        self._snapshot = None
+
+    def schedule_refresh(self) -> asyncio.Task:
+        """Dispara una carga en segundo plano, salvo que ya haya una en curso; devuelve su tarea."""
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._background_refresh())
+        return self._refresh_task
+
+    async def _background_refresh(self) -> None:
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Se sigue sirviendo el snapshot viejo hasta max_staleness
+            print(f"[CACHE] Error refrescando snapshot: {str(e)}")
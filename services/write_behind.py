@@ -0,0 +1,126 @@
+import asyncio
+from typing import Awaitable, Callable, Generic, List, Optional, TypeVar
+
+T = TypeVar("T")
+
+# Marca de fin: el worker vacía lo pendiente y termina
+_STOP = object()
+
+
+class WriteBehindQueue(Generic[T]):
+    """
+    Cola de escritura diferida (write-behind) con batching.
+
+    - put() encola y vuelve sin esperar la escritura; si la cola está llena
+      espera a que haya lugar (backpressure).
+    - Un único worker agrupa los items y llama a flush(batch) cuando junta
+      max_batch o pasan max_delay segundos desde el primero del batch.
+    - stop() escribe lo pendiente y detiene el worker.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List[T]], Awaitable[None]],
+        max_batch: int = 20,
+        max_delay: float = 1.0,
+        maxsize: int = 100
+    ):
+        if max_batch < 1:
+            raise ValueError("max_batch debe ser >= 1")
+        if max_delay < 0:
+            raise ValueError("max_delay debe ser >= 0")
+        if maxsize < 1:
+            raise ValueError("maxsize debe ser >= 1")
+
+        self.flush = flush
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.maxsize = maxsize
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self.enqueued = 0
+        self.flushed = 0
+        self.batches = 0
+        self.failed = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+
+    def pending(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self.is_running and self._loop is loop:
+            return
+        # La cola queda atada al loop que la usa (la app o cada test)
+        self._loop = loop
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._worker = asyncio.create_task(self._run())
+
+    async def put(self, item: T) -> None:
+        # Se arranca de forma perezosa si nadie llamó a start()
+        self.start()
+        assert self._queue is not None
+        await self._queue.put(item)
+        self.enqueued += 1
+
+    async def stop(self) -> None:
+        if not self.is_running or self._loop is not asyncio.get_running_loop():
+            self._worker = None
+            return
+        assert self._queue is not None and self._worker is not None
+        await self._queue.put(_STOP)
+        await self._worker
+        self._worker = None
+
+    def stats(self) -> dict:
+        return {
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "failed": self.failed,
+            "pending": self.pending()
+        }
+
+    async def _run(self) -> None:
+        queue = self._queue
+        assert queue is not None
+        loop = asyncio.get_running_loop()
+
+        while True:
+            item = await queue.get()
+            if item is _STOP:
+                return
+
+            batch = [item]
+            stopping = False
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[T]) -> None:
+        try:
+            await self.flush(batch)
+            self.flushed += len(batch)
+            self.batches += 1
+        except Exception as e:
+            # El worker sigue vivo: un batch fallido no frena los siguientes
+            self.failed += len(batch)
+            print(f"[WRITE-BEHIND] Error escribiendo batch de {len(batch)}: {str(e)}")
@@ -2,12 +2,29 @@
 Configuración de pytest y fixtures compartidos.
 """
 import pytest
+import pytest_asyncio
 import asyncio
-from sqlmodel import SQLModel, create_engine, Session
-from typing import Generator
+from sqlmodel import SQLModel, Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import AsyncGenerator, Generator
 
-# Motor de base de datos en memoria para tests
-TEST_DATABASE_URL = "sqlite:///:memory:"
+from database.connection import build_engine, build_async_engine
+from database.settings import TEST_PROFILE
+
+
+class FakeClock:
+    """Reloj controlable para cache, circuit breaker y TTLs: se avanza con `now`."""
+
+    def __init__(self, now: float = 0.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock() -> FakeClock:
+    return FakeClock()
 
 
 @pytest.fixture(scope="function")
@@ -16,10 +33,7 @@ def test_engine():
     Crea un engine de SQLite en memoria para cada test.
     Se limpia después de cada test.
     """
-    engine = create_engine(
-        TEST_DATABASE_URL,
-        connect_args={"check_same_thread": False}
-    )
+    engine = build_engine(TEST_PROFILE)
     SQLModel.metadata.create_all(engine)
     yield engine
     SQLModel.metadata.drop_all(engine)
@@ -35,6 +49,29 @@ def test_session(test_engine) -> Generator[Session, None, None]:
         yield session
 
 
+@pytest_asyncio.fixture(scope="function")
+async def test_async_engine():
+    """
+    Crea un engine async (aiosqlite) en memoria para cada test.
+    """
+    engine = build_async_engine(TEST_PROFILE)
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.create_all)
+    yield engine
+    async with engine.begin() as conn:
+        await conn.run_sync(SQLModel.metadata.drop_all)
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture(scope="function")
+async def test_async_session(test_async_engine) -> AsyncGenerator[AsyncSession, None]:
+    """
+    Proporciona una sesión async de base de datos para tests.
+    """
+    async with AsyncSession(test_async_engine, expire_on_commit=False) as session:
+        yield session
+
+
 @pytest.fixture(scope="session")
 def event_loop():
     """
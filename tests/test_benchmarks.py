@@ -0,0 +1,91 @@
+"""
+Tests de humo para la suite de benchmarks de carga.
+"""
+import json
+import pytest
+import httpx
+
+from benchmarks.fake_dolarapi import FakeDolarApi
+from benchmarks.load import LoadConfig, compare, percentile, run_load, save_result
+
+
+class TestFakeDolarApi:
+    """Tests para el dolarapi falso"""
+
+    @pytest.mark.asyncio
+    async def test_payload_size_and_conditional_get(self):
+        """Test: Devuelve `items` cotizaciones y 304 con el mismo ETag"""
+        # Arrange
+        fake = FakeDolarApi(items=50, latency=0)
+
+        # Act
+        async with httpx.AsyncClient(transport=fake.transport()) as client:
+            first = await client.get("http://fake/v1/dolares")
+            second = await client.get(
+                "http://fake/v1/dolares",
+                headers={"If-None-Match": first.headers["etag"]}
+            )
+
+        # Assert
+        assert len(first.json()) == 50
+        assert second.status_code == 304
+
+    @pytest.mark.asyncio
+    async def test_payload_changes_every_n_calls(self):
+        """Test: Con change_every el payload cambia cada N llamadas"""
+        # Arrange
+        fake = FakeDolarApi(latency=0, change_every=2)
+
+        # Act
+        async with httpx.AsyncClient(transport=fake.transport()) as client:
+            bodies = [(await client.get("http://fake/v1/dolares")).content for _ in range(4)]
+
+        # Assert
+        assert bodies[0] == bodies[1]
+        assert bodies[1] != bodies[2]
+
+
+class TestLoadBenchmark:
+    """Tests para benchmarks.load"""
+
+    def test_percentile_nearest_rank(self):
+        """Test: El percentil es un valor observado (nearest-rank)"""
+        values = [float(v) for v in range(1, 101)]
+        assert percentile(values, 50) == 50.0
+        assert percentile(values, 99) == 99.0
+        assert percentile([], 50) == 0.0
+
+    @pytest.mark.asyncio
+    async def test_cached_run_hits_upstream_once(self):
+        """Test: Con cache, la carga no vuelve a consultar la API ni a escribir"""
+        # Arrange
+        config = LoadConfig(requests=50, concurrency=5, warmup=5, latency=0)
+
+        # Act
+        result = await run_load(config)
+
+        # Assert
+        assert result.errors == 0
+        assert result.upstream_calls == 0
+        assert result.db_writes_per_request == 0
+        assert result.latency_ms["p50"] <= result.latency_ms["p99"]
+
+    @pytest.mark.asyncio
+    async def test_uncached_run_writes_changes(self, tmp_path):
+        """Test: Sin cache y con datos que cambian se miden escrituras por request"""
+        # Arrange
+        config = LoadConfig(
+            requests=30, concurrency=3, warmup=0, latency=0,
+            cache_ttl=0, change_every=1, backend="file"
+        )
+
+        # Act
+        result = await run_load(config)
+        path = save_result(result, str(tmp_path))
+
+        # Assert
+        assert result.upstream_calls > 0
+        assert result.db_rows_written > 0
+        with open(path, encoding="utf-8") as file:
+            assert json.load(file)["config"]["backend"] == "file"
+        assert compare(result, path)["requests_per_second"] == 1.0
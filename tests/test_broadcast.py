@@ -0,0 +1,144 @@
+"""
+Tests para el hub de broadcast de los streams (SSE y WebSocket).
+"""
+import asyncio
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from services.broadcast import HEARTBEAT, BroadcastHub, Message
+
+
+class TestMessage:
+    """Tests para Message"""
+
+    def test_frames_are_built_once(self):
+        """Test: El frame SSE y el texto WebSocket se arman al construir"""
+        # Act
+        message = Message.build("delta", b'{"changed":[]}', id="v2")
+
+        # Assert
+        assert message.sse == b'event: delta\nid: v2\ndata: {"changed":[]}\n\n'
+        assert json.loads(message.ws) == {"event": "delta", "id": "v2", "data": {"changed": []}}
+
+
+class TestBroadcastHub:
+    """Tests para BroadcastHub"""
+
+    @pytest.mark.asyncio
+    async def test_fan_out_shares_the_same_message(self):
+        """Test: Todos los suscriptores reciben el mismo objeto, sin copiarlo"""
+        # Arrange
+        hub = BroadcastHub()
+        subscriptions = [hub.subscribe() for _ in range(1000)]
+        message = Message.build("delta", b"{}", id="v1")
+
+        # Act
+        hub.publish(message)
+        received = [await subscription.__anext__() for subscription in subscriptions]
+        await hub.stop()
+
+        # Assert
+        assert all(item is message for item in received)
+        assert hub.stats()["published"] == 1
+
+    @pytest.mark.asyncio
+    async def test_new_subscriber_starts_with_state(self):
+        """Test: Un suscriptor nuevo recibe primero el estado completo"""
+        # Arrange
+        hub = BroadcastHub()
+        state = Message.build("snapshot", b'{"rates":[]}', id="v1")
+        hub.publish(state, state=state)
+
+        # Act
+        subscription = hub.subscribe()
+        first = await subscription.__anext__()
+        await hub.stop()
+
+        # Assert
+        assert first is state
+
+    @pytest.mark.asyncio
+    async def test_slow_consumer_is_coalesced_to_state(self):
+        """Test: Si la cola se llena el backlog se reemplaza por el estado más reciente"""
+        # Arrange
+        hub = BroadcastHub(max_pending=2)
+        slow = hub.subscribe()
+        fast = hub.subscribe()
+
+        # Act
+        for version in range(1, 4):
+            state = Message.build("snapshot", b"{}", id=f"v{version}")
+            delta = Message.build("delta", b"{}", id=f"v{version}")
+            hub.publish(delta, state=state)
+            await fast.__anext__()
+
+        # Assert
+        assert slow.pending() == 1
+        resync = await slow.__anext__()
+        assert (resync.event, resync.id) == ("snapshot", "v3")
+        assert slow.dropped == 2
+        assert hub.stats()["coalesced"] == 1
+        await hub.stop()
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_and_tick(self):
+        """Test: Con suscriptores el hub llama al tick y manda heartbeats"""
+        # Arrange
+        tick = AsyncMock()
+        hub = BroadcastHub(heartbeat=0.01, tick=tick)
+        subscription = hub.subscribe()
+
+        # Act
+        message = await asyncio.wait_for(subscription.__anext__(), timeout=1)
+        await hub.stop()
+
+        # Assert
+        assert message is HEARTBEAT
+        tick.assert_awaited()
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_skipped_when_messages_pending(self):
+        """Test: Un suscriptor con mensajes pendientes no acumula heartbeats"""
+        # Arrange
+        hub = BroadcastHub()
+        subscription = hub.subscribe()
+        hub.publish(Message.build("delta", b"{}"))
+
+        # Act
+        subscription.push(HEARTBEAT)
+
+        # Assert
+        assert subscription.pending() == 1
+        await hub.stop()
+
+    @pytest.mark.asyncio
+    async def test_tick_errors_do_not_stop_the_hub(self):
+        """Test: Un error en el tick se informa y el hub sigue con los heartbeats"""
+        # Arrange
+        hub = BroadcastHub(heartbeat=0.01, tick=AsyncMock(side_effect=RuntimeError("caído")))
+        subscription = hub.subscribe()
+
+        # Act
+        with patch("builtins.print") as mock_print:
+            message = await asyncio.wait_for(subscription.__anext__(), timeout=1)
+        await hub.stop()
+
+        # Assert
+        assert message is HEARTBEAT
+        assert any("[STREAM]" in str(call) for call in mock_print.call_args_list)
+
+    @pytest.mark.asyncio
+    async def test_stop_ends_subscriptions(self):
+        """Test: stop() cierra las suscripciones y termina la iteración"""
+        # Arrange
+        hub = BroadcastHub()
+        subscription = hub.subscribe()
+
+        # Act
+        await hub.stop()
+
+        # Assert
+        assert [message async for message in subscription] == []
+        assert hub.subscribers == 0
+        assert not hub.is_running
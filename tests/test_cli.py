@@ -18,7 +18,7 @@ class TestCLI:
     async def test_sync_rates_async_success(self, sample_exchange_data):
         """Test: sync_rates_async ejecuta correctamente"""
         # Arrange
-        with patch("cli.DolarApiClient") as mock_api_client_class, \
+        with patch("cli.dolar_api_client") as mock_api_client, \
              patch("cli.ExchangeRateRepository") as mock_api_repo_class, \
              patch("cli.ExchangeRateService") as mock_service_class, \
              patch("cli.Session") as mock_session_class:
@@ -32,6 +32,7 @@ class TestCLI:
             }
             mock_service.get_all_rates_with_average = AsyncMock(return_value=mock_result)
             mock_service_class.return_value = mock_service
+            mock_api_repo_class.from_env.return_value.aclose = AsyncMock()
             
             # Mock de la sesión
             mock_session = MagicMock()
@@ -48,6 +49,9 @@ class TestCLI:
                 session=mock_session,
                 persist=True
             )
+            # El pool compartido se abre y se cierra alrededor de la sincronización
+            mock_api_client.__aenter__.assert_awaited_once()
+            mock_api_client.__aexit__.assert_awaited_once()
     
     def test_cli_sync_rates_command(self):
         """Test: Comando sync-rates del CLI"""
@@ -136,3 +140,35 @@ class TestCLI:
             # Assert
             assert result.exit_code == 1
             assert "Error" in result.stdout
+    
+    def test_cli_bench_prints_table(self):
+        """Test: bench corre HTTP y ciclos de sync y muestra la tabla"""
+        # Act
+        result = runner.invoke(app, [
+            "bench", "--mode", "both",
+            "--requests", "20", "--cycles", "4",
+            "--concurrency", "2", "--latency", "0"
+        ])
+        
+        # Assert
+        assert result.exit_code == 0
+        assert "http memory" in result.stdout
+        assert "sync memory" in result.stdout
+        assert "p95" in result.stdout
+    
+    def test_cli_bench_rejects_unknown_mode(self):
+        """Test: Un modo desconocido termina con error"""
+        # Act
+        result = runner.invoke(app, ["bench", "--mode", "todo"])
+        
+        # Assert
+        assert result.exit_code == 1
+        assert "Error" in result.stdout
+    
+    def test_cli_bench_url_requires_http_mode(self):
+        """Test: --url sólo aplica al modo http"""
+        # Act
+        result = runner.invoke(app, ["bench", "--mode", "sync", "--url", "http://localhost:8000"])
+        
+        # Assert
+        assert result.exit_code == 1
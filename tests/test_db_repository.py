@@ -3,6 +3,7 @@ Tests para el repositorio de base de datos.
 """
 import pytest
 from decimal import Decimal
+from unittest.mock import patch
 from sqlmodel import select
 
 from database.models import ExchangeRateDB
@@ -145,3 +146,160 @@ class TestExchangeDBRepository:
         blue_rate = repository.get_rate_by_type("blue", test_session)
         assert blue_rate is not None
         assert float(blue_rate.buy) == 1104.0  # 1100 + 4
+    
+    def test_upsert_many_inserts_new_records(self, test_session):
+        """Test: upsert_many crea todos los registros en una sola llamada"""
+        # Arrange
+        repository = ExchangeDBRepository()
+        rows = [
+            {"type": "blue", "buy": 1100.0, "sell": 1120.0, "rate": 1.05, "diff": 25.5},
+            {"type": "oficial", "buy": 950.0, "sell": 990.0, "rate": 0.95, "diff": -20.0}
+        ]
+        
+        # Act
+        result = repository.upsert_many(rows, session=test_session)
+        
+        # Assert
+        assert len(result) == 2
+        assert all(rate.id is not None for rate in result)
+        by_type = {rate.type: rate for rate in result}
+        assert float(by_type["blue"].buy) == 1100.0
+        assert float(by_type["oficial"].diff) == -20.0
+        assert len(repository.get_all_rates(test_session)) == 2
+    
+    def test_upsert_many_updates_existing_records(self, test_session):
+        """Test: upsert_many actualiza registros existentes sin duplicar"""
+        # Arrange
+        repository = ExchangeDBRepository()
+        existing = repository.update_or_create_rate("blue", 1100.0, 1120.0, 1.05, 25.5, test_session)
+        existing_id = existing.id
+        
+        # Act
+        result = repository.upsert_many(
+            [
+                {"type": "blue", "buy": 1150.0, "sell": 1170.0, "rate": 1.08, "diff": 30.0},
+                {"type": "bolsa", "buy": 1050.0, "sell": 1070.0, "rate": 1.0, "diff": 0.0}
+            ],
+            session=test_session
+        )
+        
+        # Assert
+        by_type = {rate.type: rate for rate in result}
+        assert by_type["blue"].id == existing_id
+        assert float(by_type["blue"].buy) == 1150.0
+        assert float(by_type["blue"].sell) == 1170.0
+        
+        statement = select(ExchangeRateDB).where(ExchangeRateDB.type == "blue")
+        all_blue = test_session.exec(statement).all()
+        assert len(all_blue) == 1
+        assert float(all_blue[0].buy) == 1150.0
+    
+    def test_upsert_many_single_commit(self, test_session):
+        """Test: upsert_many hace un único commit por lote"""
+        # Arrange
+        repository = ExchangeDBRepository()
+        rows = [
+            {"type": f"tipo_{i}", "buy": 100.0 + i, "sell": 110.0 + i, "rate": 1.0, "diff": 0.0}
+            for i in range(10)
+        ]
+        
+        with patch.object(test_session, "commit", wraps=test_session.commit) as mock_commit, \
+             patch.object(test_session, "refresh", wraps=test_session.refresh) as mock_refresh:
+            
+            # Act
+            repository.upsert_many(rows, session=test_session)
+            
+            # Assert
+            mock_commit.assert_called_once()
+            mock_refresh.assert_not_called()
+    
+    def test_upsert_many_duplicate_types_last_wins(self, test_session):
+        """Test: Tipos repetidos en el mismo lote se resuelven con el último valor"""
+        # Arrange
+        repository = ExchangeDBRepository()
+        
+        # Act
+        result = repository.upsert_many(
+            [
+                {"type": "blue", "buy": 1100.0, "sell": 1120.0, "rate": 1.0, "diff": 0.0},
+                {"type": "blue", "buy": 1200.0, "sell": 1220.0, "rate": 1.0, "diff": 0.0}
+            ],
+            session=test_session
+        )
+        
+        # Assert
+        assert len(result) == 1
+        assert float(result[0].buy) == 1200.0
+    
+    def test_upsert_many_empty_list(self, test_session):
+        """Test: Lista vacía no ejecuta nada"""
+        # Arrange
+        repository = ExchangeDBRepository()
+        
+        # Act
+        result = repository.upsert_many([], session=test_session)
+        
+        # Assert
+        assert result == []
+
+
+class TestExchangeDBRepositoryAsync:
+    """Tests para las variantes async de ExchangeDBRepository"""
+    
+    @pytest.mark.asyncio
+    async def test_update_or_create_rate_async(self, test_async_session):
+        """Test: Crear y actualizar un registro con AsyncSession"""
+        # Arrange
+        repository = ExchangeDBRepository()
+        
+        # Act
+        created = await repository.update_or_create_rate_async(
+            "blue", 1100.0, 1120.0, 1.05, 25.5, test_async_session
+        )
+        updated = await repository.update_or_create_rate_async(
+            "blue", 1150.0, 1170.0, 1.08, 30.0, test_async_session
+        )
+        
+        # Assert
+        assert updated.id == created.id
+        assert float(updated.buy) == 1150.0
+        all_rates = await repository.get_all_rates_async(test_async_session)
+        assert len(all_rates) == 1
+    
+    @pytest.mark.asyncio
+    async def test_upsert_many_async(self, test_async_session):
+        """Test: upsert_many_async inserta y actualiza en un lote"""
+        # Arrange
+        repository = ExchangeDBRepository()
+        await repository.upsert_many_async(
+            [{"type": "blue", "buy": 1100.0, "sell": 1120.0, "rate": 1.05, "diff": 25.5}],
+            session=test_async_session
+        )
+        
+        # Act
+        result = await repository.upsert_many_async(
+            [
+                {"type": "blue", "buy": 1150.0, "sell": 1170.0, "rate": 1.08, "diff": 30.0},
+                {"type": "oficial", "buy": 950.0, "sell": 990.0, "rate": 0.95, "diff": -20.0}
+            ],
+            session=test_async_session
+        )
+        
+        # Assert
+        assert len(result) == 2
+        blue = await repository.get_rate_by_type_async("blue", test_async_session)
+        assert blue is not None
+        assert float(blue.buy) == 1150.0
+        assert len(await repository.get_all_rates_async(test_async_session)) == 2
+    
+    @pytest.mark.asyncio
+    async def test_get_rate_by_type_async_not_exists(self, test_async_session):
+        """Test: Tipo inexistente devuelve None"""
+        # Arrange
+        repository = ExchangeDBRepository()
+        
+        # Act
+        rate = await repository.get_rate_by_type_async("nonexistent", test_async_session)
+        
+        # Assert
+        assert rate is None
@@ -0,0 +1,135 @@
+"""
+Tests para los perfiles del engine de SQLite.
+"""
+import pytest
+from sqlalchemy import text
+
+from database.connection import build_engine, build_async_engine
+from database.settings import (
+    EngineProfile,
+    PRODUCTION_PROFILE,
+    TEST_PROFILE,
+    load_engine_profile
+)
+
+
+class TestEngineProfile:
+    """Tests para EngineProfile y load_engine_profile"""
+
+    def test_default_profile_is_production(self):
+        """Test: Sin DB_PROFILE se usa el preset de producción"""
+        # Act
+        profile = load_engine_profile(env={})
+
+        # Assert
+        assert profile == PRODUCTION_PROFILE
+        assert profile.echo is False
+        assert profile.journal_mode == "WAL"
+
+    def test_env_overrides(self):
+        """Test: Las variables de entorno pisan los valores del preset"""
+        # Act
+        profile = load_engine_profile(env={
+            "DB_PROFILE": "test",
+            "DATABASE_URL": "sqlite:///./otra.db",
+            "DB_ECHO": "true",
+            "DB_SYNCHRONOUS": "full",
+            "DB_CACHE_SIZE": "-1000",
+            "DB_POOL_SIZE": "3"
+        })
+
+        # Assert
+        assert profile.name == "test"
+        assert profile.database_url == "sqlite:///./otra.db"
+        assert profile.echo is True
+        assert profile.pragmas()["synchronous"] == "FULL"
+        assert profile.cache_size == -1000
+        assert profile.pool_size == 3
+
+    def test_unknown_profile(self):
+        """Test: DB_PROFILE desconocido es un error"""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            load_engine_profile(env={"DB_PROFILE": "staging"})
+
+    def test_invalid_pragma_value(self):
+        """Test: Valores de PRAGMA fuera de la lista se rechazan"""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            EngineProfile(name="x", database_url="sqlite://", journal_mode="WAL; DROP TABLE x")
+
+    def test_async_url(self):
+        """Test: La URL async usa el driver aiosqlite"""
+        # Assert
+        assert PRODUCTION_PROFILE.async_database_url == "sqlite+aiosqlite:///./exchange.db"
+
+
+class TestEnginePragmas:
+    """Tests para la aplicación de PRAGMAs por conexión"""
+
+    def test_pragmas_applied_on_file_database(self, tmp_path):
+        """Test: El engine aplica WAL, synchronous, mmap, cache y busy_timeout"""
+        # Arrange
+        profile = EngineProfile(
+            name="custom",
+            database_url=f"sqlite:///{tmp_path / 'test.db'}",
+            journal_mode="WAL",
+            synchronous="NORMAL",
+            mmap_size=1048576,
+            cache_size=-4000,
+            busy_timeout_ms=1234
+        )
+        engine = build_engine(profile)
+
+        # Act
+        with engine.connect() as conn:
+            values = {
+                name: conn.execute(text(f"PRAGMA {name}")).scalar()
+                for name in ("journal_mode", "synchronous", "mmap_size", "cache_size", "busy_timeout")
+            }
+        engine.dispose()
+
+        # Assert
+        assert values == {
+            "journal_mode": "wal",
+            "synchronous": 1,
+            "mmap_size": 1048576,
+            "cache_size": -4000,
+            "busy_timeout": 1234
+        }
+
+    @pytest.mark.asyncio
+    async def test_pragmas_applied_on_async_engine(self):
+        """Test: El engine async aplica los mismos PRAGMAs"""
+        # Arrange
+        engine = build_async_engine(TEST_PROFILE)
+
+        # Act
+        async with engine.connect() as conn:
+            synchronous = (await conn.execute(text("PRAGMA synchronous"))).scalar()
+        await engine.dispose()
+
+        # Assert
+        assert synchronous == 0
+
+    @pytest.mark.asyncio
+    async def test_test_profile_engines_share_database(self):
+        """Test: Con el perfil test el engine sync y el async ven la misma base en memoria"""
+        # Arrange
+        engine = build_engine(TEST_PROFILE)
+        async_engine = build_async_engine(TEST_PROFILE)
+        with engine.begin() as conn:
+            conn.execute(text("CREATE TABLE shared_probe (id INTEGER)"))
+            conn.execute(text("INSERT INTO shared_probe VALUES (1)"))
+
+        # Act
+        async with async_engine.connect() as conn:
+            value = (await conn.execute(text("SELECT id FROM shared_probe"))).scalar()
+        with engine.begin() as conn:
+            conn.execute(text("DROP TABLE shared_probe"))
+        await async_engine.dispose()
+        engine.dispose()
+
+        # Assert
+        assert TEST_PROFILE.is_memory
+        assert value == 1
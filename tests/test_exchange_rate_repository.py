@@ -0,0 +1,324 @@
+"""
+Tests para ExchangeRateRepository y la validación del payload crudo.
+"""
+import asyncio
+import json
+import time
+import httpx
+import pytest
+from unittest.mock import AsyncMock, Mock, patch
+from fastapi import HTTPException
+
+from external.dolar_api_client import DolarApiClient
+from external.resilience import CLOSED, HALF_OPEN, CircuitBreaker
+from models.exchange_rate import ExchangeRate
+from repositories.exchange_rate_repository import (
+    ExchangeRateRepository,
+    RateSource,
+    parse_rates_json,
+    parse_sources
+)
+
+
+class TestParseRatesJson:
+    """Tests para parse_rates_json"""
+
+    def test_parses_raw_bytes(self, sample_exchange_data):
+        """Test: Valida los bytes crudos en una sola pasada"""
+        # Act
+        rates = parse_rates_json(json.dumps(sample_exchange_data).encode())
+
+        # Assert
+        assert len(rates) == 3
+        assert rates[0].nombre == "Oficial"
+        assert rates[0].compra == 950.0
+
+    def test_lenient_defaults_for_missing_and_null(self):
+        """Test: En modo tolerante los campos faltantes o null toman su default"""
+        # Arrange
+        raw = b'[{"nombre": "Blue", "compra": null, "casa": "blue"}]'
+
+        # Act
+        rates = parse_rates_json(raw)
+
+        # Assert
+        assert rates[0].nombre == "Blue"
+        assert rates[0].compra == 0.0
+        assert rates[0].venta == 0.0
+        assert rates[0].fechaActualizacion == ""
+        assert rates[0].model_dump() == ExchangeRate(
+            nombre="Blue", compra=0.0, venta=0.0, fechaActualizacion=""
+        ).model_dump()
+
+    def test_strict_rejects_coercion(self):
+        """Test: En modo estricto un número como string es un error (502)"""
+        # Arrange
+        raw = b'[{"nombre": "Blue", "compra": "1100", "venta": 1120, "fechaActualizacion": ""}]'
+
+        # Act & Assert
+        with pytest.raises(HTTPException) as exc_info:
+            parse_rates_json(raw, strict=True)
+
+        assert exc_info.value.status_code == 502
+
+    def test_single_object_payload(self):
+        """Test: Un endpoint por casa (objeto, no lista) se parsea como una tasa"""
+        rates = parse_rates_json(b' {"nombre": "Blue", "compra": 1, "venta": 2, "fechaActualizacion": ""}')
+        assert [rate.nombre for rate in rates] == ["Blue"]
+
+    def test_invalid_json_raises_502(self):
+        """Test: Un cuerpo que no es JSON se reporta como respuesta inválida"""
+        with pytest.raises(HTTPException) as exc_info:
+            parse_rates_json(b"<html>")
+
+        assert exc_info.value.status_code == 502
+
+
+class TestExchangeRateRepository:
+    """Tests para ExchangeRateRepository"""
+
+    @pytest.mark.asyncio
+    async def test_get_all_rates_uses_raw_body(self, sample_exchange_data):
+        """Test: El repositorio pide el cuerpo crudo y no la lista de dicts"""
+        # Arrange
+        mock_client = Mock(spec=DolarApiClient)
+        mock_client.fetch_all_exchange_rates_raw = AsyncMock(
+            return_value=json.dumps(sample_exchange_data).encode()
+        )
+        repository = ExchangeRateRepository(mock_client)
+
+        # Act
+        rates = await repository.get_all_rates()
+
+        # Assert
+        assert [rate.nombre for rate in rates] == ["Oficial", "Blue", "Bolsa"]
+        mock_client.fetch_all_exchange_rates_raw.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_get_rates_if_changed_returns_none_when_unchanged(self):
+        """Test: Si la API no cambió no se parsea nada"""
+        # Arrange
+        mock_client = Mock(spec=DolarApiClient)
+        mock_client.fetch_exchange_rates_raw_if_changed = AsyncMock(return_value=None)
+        repository = ExchangeRateRepository(mock_client)
+
+        # Act
+        result = await repository.get_rates_if_changed()
+
+        # Assert
+        assert result is None
+
+
+def rate(nombre: str, compra: float) -> dict:
+    return {"nombre": nombre, "compra": compra, "venta": compra + 20, "fechaActualizacion": "2025-01-01T00:00:00Z"}
+
+
+class StandInProvider:
+    """Proveedor local en memoria: responde por path, con latencia y ETag opcionales."""
+
+    def __init__(self, routes: dict, latency: float = 0.0, status: int = 200):
+        self.routes = routes
+        self.latency = latency
+        self.status = status
+        self.calls = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.status != 200:
+            return httpx.Response(self.status)
+        body = self.routes.get(request.url.path)
+        if body is None:
+            return httpx.Response(404)
+        etag = f'"{len(json.dumps(body))}"'
+        if request.headers.get("if-none-match") == etag:
+            return httpx.Response(304, headers={"ETag": etag})
+        return httpx.Response(200, json=body, headers={"ETag": etag})
+
+    def client(self, base_url: str) -> DolarApiClient:
+        client = DolarApiClient(base_url=base_url, retry_attempts=1)
+        client._client = httpx.AsyncClient(transport=httpx.MockTransport(self.handle))
+        return client
+
+
+class TestMultiSourceRepository:
+    """Tests para el fan-out a varias fuentes con deadline"""
+
+    @pytest.mark.asyncio
+    async def test_merges_sources_by_type_with_priority(self):
+        """Test: Se combinan las fuentes por tipo; ante duplicados gana la de mayor prioridad"""
+        # Arrange
+        dolarapi = StandInProvider({
+            "/v1/dolares": [rate("Oficial", 950), rate("Blue", 1100)],
+            "/v1/cotizaciones": [rate("Euro", 1200)]
+        })
+        alternative = StandInProvider({"/v2/latest": [rate("Blue", 1999), rate("Cripto", 1150)]})
+        primary = dolarapi.client("http://dolarapi.test/v1")
+        repository = ExchangeRateRepository(
+            primary,
+            sources=[
+                RateSource("cotizaciones", primary, "/cotizaciones"),
+                RateSource("alternativa", alternative.client("http://alt.test/v2/latest"), "")
+            ],
+            deadline=1.0
+        )
+
+        # Act
+        rates = await repository.get_all_rates()
+        await repository.aclose()
+        await primary.close()
+
+        # Assert
+        assert {item.nombre: item.compra for item in rates} == {
+            "Oficial": 950, "Blue": 1100, "Euro": 1200, "Cripto": 1150
+        }
+        assert repository.last_missed == []
+
+    @pytest.mark.asyncio
+    async def test_slow_source_is_dropped_at_deadline(self):
+        """Test: Una fuente que no responde dentro del deadline queda afuera (resultado parcial)"""
+        # Arrange
+        fast = StandInProvider({"/dolares": [rate("Blue", 1100)]})
+        slow = StandInProvider({"/dolares": [rate("Cripto", 1150)]}, latency=1.0)
+        repository = ExchangeRateRepository(
+            fast.client("http://fast.test"),
+            sources=[RateSource("lenta", slow.client("http://slow.test"))],
+            deadline=0.05
+        )
+
+        # Act
+        started = time.perf_counter()
+        with patch("builtins.print"):
+            rates = await repository.get_all_rates()
+        elapsed = time.perf_counter() - started
+
+        # Assert
+        assert [item.nombre for item in rates] == ["Blue"]
+        assert repository.last_missed == ["lenta"]
+        assert elapsed < 0.5
+
+    @pytest.mark.asyncio
+    async def test_cancelled_probe_releases_circuit_breaker(self, clock):
+        """Test: Si el deadline cancela la llamada de prueba, el breaker no queda trabado en half_open"""
+        # Arrange: breaker abierto y vencido (half_open), fuente principal lenta
+        primary_provider = StandInProvider({"/dolares": [rate("Blue", 1100)]}, latency=1.0)
+        alternative = StandInProvider({"/dolares": [rate("Cripto", 1150)]})
+        primary = primary_provider.client("http://primary.test")
+        primary.circuit_breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        primary.circuit_breaker.record_failure()
+        clock.now = 10
+        repository = ExchangeRateRepository(
+            primary,
+            sources=[RateSource("alternativa", alternative.client("http://alt.test"))],
+            deadline=0.05
+        )
+
+        # Act: la prueba se cancela por el deadline
+        with patch("builtins.print"):
+            await repository.get_all_rates()
+
+        # Assert
+        assert repository.last_missed == ["dolares"]
+        assert primary.circuit_breaker.state == HALF_OPEN
+
+        # Act: el origen se recupera y la siguiente prueba pasa
+        primary_provider.latency = 0.0
+        rates = await repository.get_all_rates()
+
+        # Assert
+        assert repository.last_missed == []
+        assert primary.circuit_breaker.state == CLOSED
+        assert {item.nombre for item in rates} == {"Blue", "Cripto"}
+
+    @pytest.mark.asyncio
+    async def test_failing_source_returns_partial_result(self):
+        """Test: Si falla la fuente principal se devuelven las demás"""
+        # Arrange
+        broken = StandInProvider({}, status=404)
+        alternative = StandInProvider({"/dolares": [rate("Blue", 1100)]})
+        repository = ExchangeRateRepository(
+            broken.client("http://broken.test"),
+            sources=[RateSource("alternativa", alternative.client("http://alt.test"))],
+            deadline=1.0
+        )
+
+        # Act
+        with patch("builtins.print"):
+            rates = await repository.get_all_rates()
+
+        # Assert
+        assert [item.nombre for item in rates] == ["Blue"]
+        assert repository.last_missed == ["dolares"]
+
+    @pytest.mark.asyncio
+    async def test_no_source_raises_primary_error(self):
+        """Test: Si no responde ninguna fuente se propaga el error de la principal"""
+        # Arrange
+        repository = ExchangeRateRepository(
+            StandInProvider({}, status=404).client("http://a.test"),
+            sources=[RateSource("lenta", StandInProvider({}, latency=1.0).client("http://b.test"))],
+            deadline=0.05
+        )
+
+        # Act / Assert
+        with patch("builtins.print"), pytest.raises(HTTPException) as exc_info:
+            await repository.get_all_rates()
+        assert exc_info.value.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_conditional_fetch_reuses_unchanged_sources(self):
+        """Test: Sin cambios en ninguna fuente devuelve None; si cambia una se reutilizan las demás"""
+        # Arrange
+        first = StandInProvider({"/dolares": [rate("Blue", 1100)]})
+        second = StandInProvider({"/dolares": [rate("Cripto", 1150)]})
+        repository = ExchangeRateRepository(
+            first.client("http://first.test"),
+            sources=[RateSource("segunda", second.client("http://second.test"))],
+            deadline=1.0
+        )
+        await repository.get_all_rates()
+
+        # Act
+        unchanged = await repository.get_rates_if_changed()
+        second.routes["/dolares"] = [rate("Cripto", 1175.5)]
+        changed = await repository.get_rates_if_changed()
+
+        # Assert
+        assert unchanged is None
+        assert {item.nombre: item.compra for item in changed} == {"Blue": 1100, "Cripto": 1175.5}
+
+    @pytest.mark.asyncio
+    async def test_validators_are_per_repository(self):
+        """Test: El fetch de otro consumidor del mismo cliente no le hace perder el cambio a este"""
+        # Arrange: la app y el scheduler comparten el cliente
+        provider = StandInProvider({"/dolares": [rate("Blue", 1100)]})
+        client = provider.client("http://dolarapi.test")
+        app_repository = ExchangeRateRepository(client)
+        job_repository = ExchangeRateRepository(client)
+        await app_repository.get_all_rates()
+
+        # Act: el origen cambia y el otro consumidor lo ve primero
+        provider.routes["/dolares"] = [rate("Blue", 1175.5)]
+        await job_repository.get_rates_if_changed()
+        changed = await app_repository.get_rates_if_changed()
+        unchanged = await app_repository.get_rates_if_changed()
+
+        # Assert
+        assert [item.compra for item in changed] == [1175.5]
+        assert unchanged is None
+
+    def test_parse_sources(self):
+        """Test: Un path usa el cliente por defecto y una URL crea un cliente propio"""
+        # Arrange
+        default_client = DolarApiClient(base_url="https://dolarapi.com/v1")
+
+        # Act
+        sources = parse_sources("cotizaciones=/cotizaciones, uy=https://uy.dolarapi.com/v1/cotizaciones", default_client)
+
+        # Assert
+        assert sources[0] == RateSource("cotizaciones", default_client, "/cotizaciones")
+        assert sources[1].client.base_url == "https://uy.dolarapi.com/v1/cotizaciones"
+        assert sources[1].path == ""
+        with pytest.raises(ValueError):
+            parse_sources("sin-destino", default_client)
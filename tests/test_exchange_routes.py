@@ -0,0 +1,447 @@
+"""
+Tests para el endpoint GET /api/exchange.
+"""
+import asyncio
+import gzip
+import json
+import pytest
+import httpx
+from unittest.mock import AsyncMock, Mock
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from api import exchange_routes
+from api.http_cache import etag_matches
+from api.responses import select_encoding
+from models.exchange_rate import ExchangeRate, ExchangeRateAverage, ExchangeRateResponse
+from repositories.exchange_db_repository import ExchangeDBRepository
+from services.broadcast import BroadcastHub
+from services.snapshot_cache import SnapshotCache
+from services.serialized_snapshot import SerializedSnapshot
+from services.exchange_rate_service import ExchangeRateService
+from repositories.exchange_rate_repository import ExchangeRateRepository
+
+
+@pytest.fixture
+def sample_response(sample_exchange_data):
+    return ExchangeRateResponse(
+        rates=[ExchangeRate(**data) for data in sample_exchange_data],
+        average=ExchangeRateAverage(compra=1033.33, venta=1060.0)
+    )
+
+
+@pytest.fixture
+def loader(sample_response):
+    return AsyncMock(return_value=SerializedSnapshot.from_response(sample_response))
+
+
+@pytest.fixture
+def client(monkeypatch, loader, clock):
+    cache = SnapshotCache(
+        loader=loader,
+        ttl=60,
+        max_staleness=600,
+        clock=clock,
+        versioner=exchange_routes.snapshot_version
+    )
+    monkeypatch.setattr(exchange_routes, "snapshot_cache", cache)
+
+    app = FastAPI()
+    app.include_router(exchange_routes.route)
+    transport = httpx.ASGITransport(app=app)
+    return httpx.AsyncClient(transport=transport, base_url="http://test")
+
+
+class TestGetExchangeRates:
+    """Tests para GET /api/exchange"""
+
+    @pytest.mark.asyncio
+    async def test_returns_snapshot_with_etag_and_cache_control(self, client, loader):
+        """Test: La respuesta incluye ETag y Cache-Control derivado del TTL"""
+        # Act
+        async with client:
+            response = await client.get("/api/exchange/")
+
+        # Assert
+        assert response.status_code == 200
+        assert len(response.json()["rates"]) == 3
+        assert response.headers["etag"].startswith('"')
+        assert response.headers["cache-control"] == "public, max-age=60"
+        loader.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_if_none_match_returns_304(self, client):
+        """Test: If-None-Match con el ETag actual devuelve 304 sin cuerpo"""
+        # Act
+        async with client:
+            first = await client.get("/api/exchange/")
+            second = await client.get(
+                "/api/exchange/",
+                headers={"If-None-Match": first.headers["etag"]}
+            )
+
+        # Assert
+        assert second.status_code == 304
+        assert second.content == b""
+        assert second.headers["etag"] == first.headers["etag"]
+
+    @pytest.mark.asyncio
+    async def test_etag_is_stable_and_changes_with_data(self, client, loader, clock, sample_response):
+        """Test: El ETag es estable para los mismos datos y cambia con una versión nueva"""
+        # Arrange
+        changed = sample_response.model_copy(
+            update={"average": ExchangeRateAverage(compra=1.0, venta=2.0)}
+        )
+
+        async with client:
+            first = await client.get("/api/exchange/")
+
+            # Act
+            loader.return_value = SerializedSnapshot.from_response(changed)
+            clock.now = 700
+            second = await client.get("/api/exchange/")
+            stale = await client.get(
+                "/api/exchange/",
+                headers={"If-None-Match": first.headers["etag"]}
+            )
+
+        # Assert
+        assert first.headers["etag"] != second.headers["etag"]
+        assert stale.status_code == 200
+
+    @pytest.mark.asyncio
+    async def test_max_age_decreases_with_snapshot_age(self, client, clock):
+        """Test: max-age es el TTL restante del snapshot"""
+        # Act
+        async with client:
+            await client.get("/api/exchange/")
+            clock.now = 45
+            response = await client.get("/api/exchange/")
+
+        # Assert
+        assert response.headers["cache-control"] == "public, max-age=15"
+
+
+    @pytest.mark.asyncio
+    async def test_gzip_variant_is_served_precompressed(self, client, sample_response):
+        """Test: Con Accept-Encoding gzip se envían los bytes ya comprimidos"""
+        # Act
+        async with client:
+            response = await client.get(
+                "/api/exchange/",
+                headers={"Accept-Encoding": "gzip"}
+            )
+
+        # Assert
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["vary"] == "Accept-Encoding"
+        assert response.headers["etag"].endswith('-gzip"')
+        assert response.content == sample_response.model_dump_json().encode()
+
+    @pytest.mark.asyncio
+    async def test_identity_body_matches_model(self, client, sample_response):
+        """Test: Sin compresión el cuerpo es el JSON del modelo"""
+        # Act
+        async with client:
+            response = await client.get(
+                "/api/exchange/",
+                headers={"Accept-Encoding": "identity"}
+            )
+
+        # Assert
+        assert "content-encoding" not in response.headers
+        assert response.headers["content-type"] == "application/json"
+        assert ExchangeRateResponse.model_validate_json(response.content) == sample_response
+
+
+class TestGetExchangeRateByType:
+    """Tests para GET /api/exchange/{type}"""
+
+    @pytest.mark.asyncio
+    async def test_served_from_index(self, client, loader):
+        """Test: Con snapshot en memoria se responde desde el índice por tipo"""
+        # Act
+        async with client:
+            await client.get("/api/exchange/")
+            response = await client.get("/api/exchange/Blue")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["nombre"] == "Blue"
+        assert response.json()["compra"] == 1100.0
+        assert response.headers["cache-control"] == "public, max-age=60"
+        loader.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_if_none_match_returns_304(self, client):
+        """Test: El ETag por tipo habilita el 304"""
+        # Act
+        async with client:
+            await client.get("/api/exchange/")
+            first = await client.get("/api/exchange/blue")
+            second = await client.get(
+                "/api/exchange/blue",
+                headers={"If-None-Match": first.headers["etag"]}
+            )
+
+        # Assert
+        assert second.status_code == 304
+        assert second.content == b""
+
+    @pytest.mark.asyncio
+    async def test_unknown_type_returns_404(self, client):
+        """Test: Un tipo inexistente devuelve 404"""
+        # Act
+        async with client:
+            await client.get("/api/exchange/")
+            response = await client.get("/api/exchange/inexistente")
+
+        # Assert
+        assert response.status_code == 404
+
+    @pytest.mark.asyncio
+    async def test_index_follows_new_version(self, client, sample_response):
+        """Test: Un sync nuevo reemplaza el índice completo"""
+        # Arrange
+        changed = sample_response.model_copy(update={"rates": [
+            rate.model_copy(update={"compra": 1500.0}) if rate.nombre == "Blue" else rate
+            for rate in sample_response.rates
+        ]})
+
+        async with client:
+            await client.get("/api/exchange/")
+
+            # Act
+            exchange_routes.snapshot_cache.set(SerializedSnapshot.from_response(changed))
+            response = await client.get("/api/exchange/blue")
+
+        # Assert
+        assert response.json()["compra"] == 1500.0
+
+    @pytest.mark.asyncio
+    async def test_cold_start_reads_database_and_loads_snapshot(self, monkeypatch, client, loader, test_async_engine):
+        """Test: Sin snapshot en memoria se responde desde la base y el snapshot se carga en segundo plano"""
+        # Arrange
+        async with AsyncSession(test_async_engine) as session:
+            await ExchangeDBRepository().upsert_many_async(
+                [{"type": "blue", "buy": 1100.0, "sell": 1120.0, "rate": 1.0, "diff": 0.0}],
+                session=session
+            )
+        monkeypatch.setattr(exchange_routes, "async_session_maker", lambda: AsyncSession(test_async_engine))
+
+        # Act
+        async with client:
+            response = await client.get("/api/exchange/blue")
+            await asyncio.sleep(0)
+            indexed = await client.get("/api/exchange/blue")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.json()["compra"] == 1100.0
+        assert response.headers["cache-control"] == "no-cache"
+        assert indexed.json()["nombre"] == "Blue"
+        assert indexed.headers["cache-control"] == "public, max-age=60"
+        loader.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_cold_start_database_miss_asks_upstream(self, monkeypatch, client, loader, test_async_engine):
+        """Test: Un tipo que la base no tiene se busca en el snapshot antes de responder 404"""
+        # Arrange: base vacía
+        monkeypatch.setattr(exchange_routes, "async_session_maker", lambda: AsyncSession(test_async_engine))
+
+        # Act
+        async with client:
+            found = await client.get("/api/exchange/bolsa")
+            missing = await client.get("/api/exchange/cripto")
+
+        # Assert
+        assert found.status_code == 200
+        assert found.json()["nombre"] == "Bolsa"
+        assert missing.status_code == 404
+        loader.assert_awaited_once()
+
+
+@pytest.fixture
+def stream_app(monkeypatch, loader, clock):
+    hub = BroadcastHub(heartbeat=60)
+    cache = SnapshotCache(
+        loader=loader,
+        ttl=60,
+        max_staleness=600,
+        clock=clock,
+        versioner=exchange_routes.snapshot_version,
+        on_change=exchange_routes.publish_snapshot
+    )
+    monkeypatch.setattr(exchange_routes, "hub", hub)
+    monkeypatch.setattr(exchange_routes, "snapshot_cache", cache)
+
+    app = FastAPI()
+    app.include_router(exchange_routes.route)
+    return app
+
+
+def parse_sse(body: bytes) -> list:
+    events = []
+    for frame in body.decode().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines() if not line.startswith(":"))
+        if fields:
+            events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+class TestExchangeRateStreams:
+    """Tests para GET /api/exchange/stream y el WebSocket /api/exchange/ws"""
+
+    @pytest.mark.asyncio
+    async def test_sse_sends_snapshot_then_delta(self, stream_app, sample_response):
+        """Test: El stream arranca con el snapshot y publica sólo las tasas que cambiaron"""
+        # Arrange
+        changed = sample_response.model_copy(update={"rates": [
+            rate.model_copy(update={"venta": 1500.0}) if rate.nombre == "Blue" else rate
+            for rate in sample_response.rates
+        ]})
+        transport = httpx.ASGITransport(app=stream_app)
+        client = httpx.AsyncClient(transport=transport, base_url="http://test")
+
+        async with client:
+            request = asyncio.create_task(client.get("/api/exchange/stream"))
+            while exchange_routes.hub.subscribers == 0:
+                await asyncio.sleep(0.001)
+
+            # Act
+            exchange_routes.snapshot_cache.set(SerializedSnapshot.from_response(changed))
+            await exchange_routes.hub.stop()
+            response = await request
+
+        # Assert
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = parse_sse(response.content)
+        assert [event for event, _ in events] == ["snapshot", "delta"]
+        assert len(events[0][1]["rates"]) == 3
+        delta = events[1][1]
+        assert [rate["nombre"] for rate in delta["changed"]] == ["Blue"]
+        assert delta["changed"][0]["venta"] == 1500.0
+        assert delta["removed"] == []
+
+    def test_websocket_receives_snapshot(self, stream_app):
+        """Test: El WebSocket recibe el snapshot completo al conectarse"""
+        # Act
+        with TestClient(stream_app) as client:
+            with client.websocket_connect("/api/exchange/ws") as websocket:
+                message = websocket.receive_json()
+
+        # Assert
+        assert message["event"] == "snapshot"
+        assert len(message["data"]["rates"]) == 3
+        assert message["id"]
+
+
+class TestSerializedSnapshot:
+    """Tests para SerializedSnapshot"""
+
+    def test_serializes_once_with_gzip(self, sample_response):
+        """Test: Cuerpo, versión y variante gzip se calculan al construir"""
+        # Act
+        serialized = SerializedSnapshot.from_response(sample_response)
+
+        # Assert
+        assert serialized.body == sample_response.model_dump_json().encode()
+        assert gzip.decompress(serialized.content("gzip")) == serialized.body
+        assert serialized.etag() == f'"{serialized.version}"'
+
+    def test_index_by_normalized_type(self, sample_response):
+        """Test: El índice usa el tipo normalizado y guarda el JSON de cada tasa"""
+        # Act
+        serialized = SerializedSnapshot.from_response(sample_response)
+        body, etag = serialized.lookup("blue")
+
+        # Assert
+        assert set(serialized.index) == {"oficial", "blue", "bolsa"}
+        assert ExchangeRate.model_validate_json(body).nombre == "Blue"
+        assert etag.startswith('"')
+        assert serialized.lookup("Blue") is None
+
+    def test_delta_since_previous_version(self, sample_response):
+        """Test: El delta incluye sólo las tasas con ETag distinto y las que desaparecieron"""
+        # Arrange
+        previous = SerializedSnapshot.from_response(sample_response)
+        current = SerializedSnapshot.from_response(sample_response.model_copy(update={
+            "rates": [sample_response.rates[0].model_copy(update={"compra": 1.0}), sample_response.rates[1]]
+        }))
+
+        # Act
+        delta = json.loads(current.delta_since(previous))
+
+        # Assert
+        assert delta["version"] == current.version
+        assert [rate["nombre"] for rate in delta["changed"]] == ["Oficial"]
+        assert delta["removed"] == ["bolsa"]
+        assert delta["stale"] is False
+        assert len(json.loads(current.delta_since(None))["changed"]) == 2
+
+    def test_version_is_deterministic(self, sample_response):
+        """Test: Los mismos datos producen la misma versión y los mismos bytes gzip"""
+        # Act
+        first = SerializedSnapshot.from_response(sample_response)
+        second = SerializedSnapshot.from_response(sample_response.model_copy())
+
+        # Assert
+        assert first.version == second.version
+        assert first.content("gzip") == second.content("gzip")
+
+    @pytest.mark.asyncio
+    async def test_service_reuses_bytes_for_unchanged_version(self, sample_exchange_data):
+        """Test: El servicio serializa una sola vez por versión"""
+        # Arrange
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(return_value=[
+            ExchangeRate(**data) for data in sample_exchange_data
+        ])
+        mock_api_repo.get_rates_if_changed = AsyncMock(return_value=None)
+        service = ExchangeRateService(api_repository=mock_api_repo)
+
+        # Act
+        first = await service.get_serialized_snapshot(persist=False)
+        second = await service.get_serialized_snapshot(persist=False)
+
+        # Assert
+        assert second is first
+
+
+class TestSelectEncoding:
+    """Tests para la negociación de Accept-Encoding"""
+
+    def test_prefers_brotli_when_available(self):
+        """Test: Con br y gzip disponibles se prefiere br"""
+        assert select_encoding("gzip, br", {"gzip": b"", "br": b""}) == "br"
+
+    def test_respects_quality(self):
+        """Test: q=0 excluye una codificación"""
+        assert select_encoding("br;q=0, gzip", {"gzip": b"", "br": b""}) == "gzip"
+
+    def test_identity_when_nothing_matches(self):
+        """Test: Sin coincidencias se envía sin comprimir"""
+        assert select_encoding("deflate", {"gzip": b""}) is None
+        assert select_encoding(None, {"gzip": b""}) is None
+
+
+class TestEtagMatches:
+    """Tests para la comparación de If-None-Match"""
+
+    def test_exact_match(self):
+        """Test: Mismo ETag coincide"""
+        assert etag_matches('"abc"', '"abc"')
+
+    def test_weak_and_list(self):
+        """Test: Lista con validador débil coincide"""
+        assert etag_matches('"x", W/"abc"', '"abc"')
+
+    def test_wildcard(self):
+        """Test: "*" coincide con cualquier ETag"""
+        assert etag_matches("*", '"abc"')
+
+    def test_no_match(self):
+        """Test: ETag distinto o ausente no coincide"""
+        assert not etag_matches('"xyz"', '"abc"')
+        assert not etag_matches(None, '"abc"')
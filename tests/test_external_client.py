@@ -1,6 +1,8 @@
 """
 Tests para el cliente de API externa.
 """
+import asyncio
+import json
 import pytest
 from unittest.mock import AsyncMock, Mock, patch
 import httpx
@@ -23,6 +25,9 @@ class TestDolarApiClient:
             # response.json() es un método SÍNCRONO regular
             mock_response = Mock()
             mock_response.json = Mock(return_value=sample_exchange_data)
+            mock_response.content = json.dumps(sample_exchange_data).encode()
+            mock_response.headers = {}
+            mock_response.status_code = 200
             mock_response.raise_for_status = Mock()
             
             mock_client = AsyncMock()
@@ -107,6 +112,9 @@ class TestDolarApiClient:
         with patch("external.dolar_api_client.httpx.AsyncClient") as mock_client_class:
             mock_response = Mock()
             mock_response.json = Mock(return_value=[])
+            mock_response.content = json.dumps([]).encode()
+            mock_response.headers = {}
+            mock_response.status_code = 200
             mock_response.raise_for_status = Mock()
             
             mock_client = AsyncMock()
@@ -121,3 +129,277 @@ class TestDolarApiClient:
             
             # Assert
             mock_client.get.assert_called_once_with(f"{custom_url}/dolares")
+    
+    @pytest.mark.asyncio
+    async def test_connection_pool_is_reused_between_calls(self):
+        """Test: Varias llamadas reutilizan el mismo httpx.AsyncClient"""
+        # Arrange
+        client = DolarApiClient()
+        
+        with patch("external.dolar_api_client.httpx.AsyncClient") as mock_client_class:
+            mock_response = Mock()
+            mock_response.json = Mock(return_value=[])
+            mock_response.content = json.dumps([]).encode()
+            mock_response.headers = {}
+            mock_response.status_code = 200
+            mock_response.raise_for_status = Mock()
+            
+            mock_client = AsyncMock()
+            mock_client.get = AsyncMock(return_value=mock_response)
+            mock_client_class.return_value = mock_client
+            
+            # Act
+            await client.fetch_all_exchange_rates()
+            await client.fetch_all_exchange_rates()
+            await client.fetch_all_exchange_rates()
+            
+            # Assert
+            mock_client_class.assert_called_once()
+            assert mock_client.get.call_count == 3
+    
+    @pytest.mark.asyncio
+    async def test_open_and_close_lifecycle(self):
+        """Test: El context manager abre y cierra el pool"""
+        # Arrange
+        client = DolarApiClient(connect_timeout=1.0, read_timeout=2.0, max_connections=5)
+        
+        with patch("external.dolar_api_client.httpx.AsyncClient") as mock_client_class:
+            mock_client = AsyncMock()
+            mock_client_class.return_value = mock_client
+            
+            # Act
+            async with client:
+                assert client.is_open
+            
+            # Assert
+            assert not client.is_open
+            mock_client.aclose.assert_awaited_once()
+            call_kwargs = mock_client_class.call_args[1]
+            assert call_kwargs["timeout"].connect == 1.0
+            assert call_kwargs["timeout"].read == 2.0
+            assert call_kwargs["limits"].max_connections == 5
+    
+    def test_http2_falls_back_without_h2(self):
+        """Test: Sin el paquete h2 se usa HTTP/1.1"""
+        # Arrange
+        with patch("external.dolar_api_client.importlib.util.find_spec", return_value=None), \
+             patch("builtins.print"):
+            
+            # Act
+            client = DolarApiClient(http2=True)
+        
+        # Assert
+        assert client.http2 is False
+    
+    def test_from_env(self, monkeypatch):
+        """Test: Configuración desde variables de entorno"""
+        # Arrange
+        monkeypatch.setenv("DOLAR_API_BASE_URL", "https://custom-api.com/v2")
+        monkeypatch.setenv("DOLAR_API_READ_TIMEOUT", "3")
+        monkeypatch.setenv("DOLAR_API_MAX_KEEPALIVE_CONNECTIONS", "4")
+        
+        # Act
+        client = DolarApiClient.from_env()
+        
+        # Assert
+        assert client.base_url == "https://custom-api.com/v2"
+        assert client.timeout.read == 3.0
+        assert client.limits.max_keepalive_connections == 4
+    
+    @pytest.mark.asyncio
+    async def test_conditional_fetch_sends_validators_and_handles_304(self, sample_exchange_data):
+        """Test: El GET condicional envía ETag/Last-Modified y 304 devuelve None"""
+        # Arrange
+        client = DolarApiClient()
+        
+        with patch("external.dolar_api_client.httpx.AsyncClient") as mock_client_class:
+            full_response = Mock()
+            full_response.json = Mock(return_value=sample_exchange_data)
+            full_response.content = json.dumps(sample_exchange_data).encode()
+            full_response.headers = {"etag": '"v1"', "last-modified": "Thu, 13 Nov 2025 10:00:00 GMT"}
+            full_response.status_code = 200
+            full_response.raise_for_status = Mock()
+            
+            not_modified = Mock()
+            not_modified.status_code = 304
+            not_modified.json = Mock()
+            
+            mock_client = AsyncMock()
+            mock_client.get = AsyncMock(side_effect=[full_response, not_modified])
+            mock_client_class.return_value = mock_client
+            
+            # Act
+            first = await client.fetch_all_exchange_rates()
+            second = await client.fetch_exchange_rates_if_changed()
+            
+            # Assert
+            assert len(first) == 3
+            assert second is None
+            not_modified.json.assert_not_called()
+            headers = mock_client.get.call_args_list[1][1]["headers"]
+            assert headers["If-None-Match"] == '"v1"'
+            assert headers["If-Modified-Since"] == "Thu, 13 Nov 2025 10:00:00 GMT"
+    
+    @pytest.mark.asyncio
+    async def test_conditional_fetch_same_body_is_unchanged(self, sample_exchange_data):
+        """Test: Mismo cuerpo sin validadores se detecta por hash y no se parsea"""
+        # Arrange
+        client = DolarApiClient()
+        
+        with patch("external.dolar_api_client.httpx.AsyncClient") as mock_client_class:
+            mock_response = Mock()
+            mock_response.json = Mock(return_value=sample_exchange_data)
+            mock_response.content = json.dumps(sample_exchange_data).encode()
+            mock_response.headers = {}
+            mock_response.status_code = 200
+            mock_response.raise_for_status = Mock()
+            
+            mock_client = AsyncMock()
+            mock_client.get = AsyncMock(return_value=mock_response)
+            mock_client_class.return_value = mock_client
+            
+            # Act
+            first = await client.fetch_exchange_rates_if_changed()
+            second = await client.fetch_exchange_rates_if_changed()
+            
+            # Assert
+            assert first == sample_exchange_data
+            assert second is None
+            assert mock_client.get.call_args_list[1][1]["headers"] == {}
+
+
+def resilient_client(handler, **kwargs) -> DolarApiClient:
+    # Transporte en memoria y backoff nulo para que los reintentos no esperen
+    client = DolarApiClient(base_url="http://upstream.test", retry_base_delay=0, **kwargs)
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+class TestDolarApiClientResilience:
+    """Tests para reintentos, circuit breaker, hedging y presupuesto total"""
+
+    @pytest.mark.asyncio
+    async def test_transient_errors_are_retried(self, sample_exchange_data):
+        """Test: Un 503 y un error de conexión se reintentan hasta obtener respuesta"""
+        # Arrange
+        outcomes = iter(["503", "connect", "ok"])
+
+        def handler(request):
+            outcome = next(outcomes)
+            if outcome == "connect":
+                raise httpx.ConnectError("refused", request=request)
+            if outcome == "503":
+                return httpx.Response(503)
+            return httpx.Response(200, json=sample_exchange_data)
+
+        client = resilient_client(handler, retry_attempts=3)
+
+        # Act
+        result = await client.fetch_all_exchange_rates()
+        await client.close()
+
+        # Assert
+        assert len(result) == 3
+        assert client.circuit_breaker.state == "closed"
+
+    @pytest.mark.asyncio
+    async def test_client_errors_are_not_retried(self):
+        """Test: Un 404 no se reintenta ni cuenta como falla del origen"""
+        # Arrange
+        calls = []
+        client = resilient_client(lambda request: calls.append(request) or httpx.Response(404))
+
+        # Act
+        with pytest.raises(HTTPException) as exc_info:
+            await client.fetch_all_exchange_rates()
+        await client.close()
+
+        # Assert
+        assert exc_info.value.status_code == 404
+        assert len(calls) == 1
+        assert client.circuit_breaker.stats()["failures"] == 0
+
+    @pytest.mark.asyncio
+    async def test_open_circuit_fails_fast(self):
+        """Test: Con el circuito abierto no se llama al origen y se responde 503"""
+        # Arrange
+        calls = []
+        client = resilient_client(
+            lambda request: calls.append(request) or httpx.Response(500),
+            retry_attempts=1,
+            breaker_threshold=2
+        )
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await client.fetch_all_exchange_rates()
+
+        # Act
+        with pytest.raises(HTTPException) as exc_info:
+            await client.fetch_all_exchange_rates()
+        await client.close()
+
+        # Assert
+        assert exc_info.value.status_code == 503
+        assert "Retry-After" in exc_info.value.headers
+        assert len(calls) == 2
+
+    @pytest.mark.asyncio
+    async def test_slow_upstream_is_hedged(self, sample_exchange_data):
+        """Test: Si el primer GET tarda más que hedge_after, gana la copia"""
+        # Arrange
+        delays = iter([1.0, 0.0])
+
+        async def handler(request):
+            await asyncio.sleep(next(delays))
+            return httpx.Response(200, json=sample_exchange_data)
+
+        client = resilient_client(handler, hedge_after=0.01)
+
+        # Act
+        result = await asyncio.wait_for(client.fetch_all_exchange_rates(), timeout=0.5)
+        await client.close()
+
+        # Assert
+        assert len(result) == 3
+
+    @pytest.mark.asyncio
+    async def test_hedge_error_does_not_beat_slower_success(self, sample_exchange_data):
+        """Test: Un 503 inmediato de la copia no le gana al 200 más lento del primer GET"""
+        # Arrange
+        responses = iter([(0.2, 200), (0.0, 503)])
+
+        async def handler(request):
+            delay, status = next(responses)
+            await asyncio.sleep(delay)
+            if status != 200:
+                return httpx.Response(status)
+            return httpx.Response(200, json=sample_exchange_data)
+
+        client = resilient_client(handler, hedge_after=0.05, retry_attempts=1)
+
+        # Act
+        result = await asyncio.wait_for(client.fetch_all_exchange_rates(), timeout=1.0)
+        await client.close()
+
+        # Assert
+        assert len(result) == 3
+
+    @pytest.mark.asyncio
+    async def test_total_timeout_returns_504(self):
+        """Test: Si se agota el presupuesto total se responde 504"""
+        # Arrange
+
+        async def handler(request):
+            await asyncio.sleep(1)
+            return httpx.Response(200, json=[])
+
+        client = resilient_client(handler, total_timeout=0.02)
+
+        # Act
+        with pytest.raises(HTTPException) as exc_info:
+            await client.fetch_all_exchange_rates()
+        await client.close()
+
+        # Assert
+        assert exc_info.value.status_code == 504
+        assert client.circuit_breaker.stats()["failures"] == 1
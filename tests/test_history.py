@@ -0,0 +1,212 @@
+"""
+Tests para el historial de cotizaciones y su endpoint paginado.
+"""
+import pytest
+import httpx
+from datetime import datetime, timedelta, timezone
+from fastapi import FastAPI
+from sqlalchemy import text
+
+from api import exchange_routes
+from database.connection import get_async_session
+from repositories.exchange_history_repository import ExchangeHistoryRepository
+
+
+BASE_TIME = datetime(2025, 11, 13, 10, 0, tzinfo=timezone.utc)
+
+
+def make_observations(type: str, count: int) -> list:
+    return [
+        {
+            "type": type,
+            "observed_at": BASE_TIME + timedelta(minutes=i),
+            "buy": 1100.0 + i,
+            "sell": 1120.0 + i
+        }
+        for i in range(count)
+    ]
+
+
+class TestExchangeHistoryRepository:
+    """Tests para ExchangeHistoryRepository"""
+
+    def test_append_many_and_get_page(self, test_session):
+        """Test: Agregar observaciones y leerlas ordenadas por fecha"""
+        # Arrange
+        repository = ExchangeHistoryRepository()
+        repository.append_many(make_observations("blue", 5), session=test_session)
+        repository.append_many(make_observations("oficial", 3), session=test_session)
+
+        # Act
+        page = repository.get_page("blue", session=test_session, limit=10)
+
+        # Assert
+        assert len(page) == 5
+        assert [float(row.buy) for row in page] == [1100.0, 1101.0, 1102.0, 1103.0, 1104.0]
+
+    def test_append_many_ignores_duplicates(self, test_session):
+        """Test: La misma observación dos veces no duplica filas"""
+        # Arrange
+        repository = ExchangeHistoryRepository()
+
+        # Act
+        repository.append_many(make_observations("blue", 3), session=test_session)
+        repository.append_many(make_observations("blue", 4), session=test_session)
+
+        # Assert
+        assert len(repository.get_page("blue", session=test_session, limit=10)) == 4
+
+    def test_get_page_time_range_and_keyset(self, test_session):
+        """Test: Filtrar por rango y continuar desde la última fila vista"""
+        # Arrange
+        repository = ExchangeHistoryRepository()
+        repository.append_many(make_observations("blue", 10), session=test_session)
+
+        # Act
+        page = repository.get_page(
+            "blue",
+            session=test_session,
+            start=BASE_TIME + timedelta(minutes=2),
+            end=BASE_TIME + timedelta(minutes=8),
+            after=BASE_TIME + timedelta(minutes=4),
+            limit=10
+        )
+
+        # Assert
+        assert [float(row.buy) for row in page] == [1105.0, 1106.0, 1107.0]
+
+    def test_range_query_uses_primary_key(self, test_session):
+        """Test: La consulta por rango usa la clave (type, observed_at)"""
+        # Arrange
+        repository = ExchangeHistoryRepository()
+        statement = repository._page_statement(
+            "blue", BASE_TIME, BASE_TIME + timedelta(days=1), None, 100
+        )
+        compiled = statement.compile(
+            dialect=test_session.get_bind().dialect,
+            compile_kwargs={"literal_binds": True}
+        )
+
+        # Act
+        plan = test_session.exec(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+
+        # Assert
+        detail = " ".join(str(row[-1]) for row in plan)
+        assert "SEARCH" in detail
+        assert "PRIMARY KEY" in detail
+        assert "TEMP B-TREE" not in detail
+
+    @pytest.mark.asyncio
+    async def test_append_many_async(self, test_async_session):
+        """Test: Variante async de append y lectura"""
+        # Arrange
+        repository = ExchangeHistoryRepository()
+
+        # Act
+        await repository.append_many_async(make_observations("blue", 3), session=test_async_session)
+        page = await repository.get_page_async("blue", session=test_async_session, limit=2)
+
+        # Assert
+        assert len(page) == 2
+
+
+class TestHistoryEndpoint:
+    """Tests para GET /api/exchange/history"""
+
+    @pytest.fixture
+    def app(self, test_async_session):
+        app = FastAPI()
+        app.include_router(exchange_routes.route)
+
+        async def override_session():
+            yield test_async_session
+
+        app.dependency_overrides[get_async_session] = override_session
+        return app
+
+    @pytest.mark.asyncio
+    async def test_history_keyset_pagination(self, app, test_async_session):
+        """Test: Recorrer el historial página por página con nextCursor"""
+        # Arrange
+        await ExchangeHistoryRepository().append_many_async(
+            make_observations("blue", 5),
+            session=test_async_session
+        )
+        transport = httpx.ASGITransport(app=app)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Act
+            first = await client.get("/api/exchange/history", params={"type": "blue", "limit": 2})
+            second = await client.get(
+                "/api/exchange/history",
+                params={"type": "blue", "limit": 2, "cursor": first.json()["nextCursor"]}
+            )
+            last = await client.get(
+                "/api/exchange/history",
+                params={"type": "blue", "limit": 2, "cursor": second.json()["nextCursor"]}
+            )
+
+        # Assert
+        assert first.status_code == 200
+        assert [item["compra"] for item in first.json()["items"]] == [1100.0, 1101.0]
+        assert [item["compra"] for item in second.json()["items"]] == [1102.0, 1103.0]
+        assert [item["compra"] for item in last.json()["items"]] == [1104.0]
+        assert last.json()["nextCursor"] is None
+
+    @pytest.mark.asyncio
+    async def test_history_cursor_is_url_safe(self, app, test_async_session):
+        """Test: nextCursor se puede pegar tal cual en la URL, sin codificar"""
+        # Arrange
+        await ExchangeHistoryRepository().append_many_async(
+            make_observations("blue", 3),
+            session=test_async_session
+        )
+        transport = httpx.ASGITransport(app=app)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Act
+            first = await client.get("/api/exchange/history?type=blue&limit=1")
+            cursor = first.json()["nextCursor"]
+            second = await client.get(f"/api/exchange/history?type=blue&limit=1&cursor={cursor}")
+
+        # Assert
+        assert cursor.isalnum()
+        assert second.status_code == 200
+        assert [item["compra"] for item in second.json()["items"]] == [1101.0]
+
+    @pytest.mark.asyncio
+    async def test_history_time_range(self, app, test_async_session):
+        """Test: Filtrar con from/to"""
+        # Arrange
+        await ExchangeHistoryRepository().append_many_async(
+            make_observations("blue", 5),
+            session=test_async_session
+        )
+        transport = httpx.ASGITransport(app=app)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Act
+            response = await client.get("/api/exchange/history", params={
+                "type": "blue",
+                "from": (BASE_TIME + timedelta(minutes=1)).isoformat(),
+                "to": (BASE_TIME + timedelta(minutes=3)).isoformat()
+            })
+
+        # Assert
+        assert [item["compra"] for item in response.json()["items"]] == [1101.0, 1102.0]
+
+    @pytest.mark.asyncio
+    async def test_history_invalid_cursor(self, app):
+        """Test: Cursor inválido devuelve 400"""
+        # Arrange
+        transport = httpx.ASGITransport(app=app)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            # Act
+            response = await client.get(
+                "/api/exchange/history",
+                params={"type": "blue", "cursor": "no-es-una-fecha"}
+            )
+
+        # Assert
+        assert response.status_code == 400
@@ -1,6 +1,7 @@
 """
 Tests de integración end-to-end.
 """
+import json
 import pytest
 from sqlmodel import Session, select
 from unittest.mock import AsyncMock, Mock, patch
@@ -23,6 +24,9 @@ class TestIntegration:
             # Mock de la respuesta HTTP (json() es síncrono)
             mock_response = Mock()
             mock_response.json = Mock(return_value=sample_exchange_data)
+            mock_response.content = json.dumps(sample_exchange_data).encode()
+            mock_response.headers = {}
+            mock_response.status_code = 200
             mock_response.raise_for_status = Mock()
             
             mock_client = AsyncMock()
@@ -72,6 +76,9 @@ class TestIntegration:
         with patch("external.dolar_api_client.httpx.AsyncClient") as mock_client_class:
             mock_response = Mock()
             mock_response.json = Mock(return_value=sample_exchange_data)
+            mock_response.content = json.dumps(sample_exchange_data).encode()
+            mock_response.headers = {}
+            mock_response.status_code = 200
             mock_response.raise_for_status = Mock()
             
             mock_client = AsyncMock()
@@ -112,6 +119,9 @@ class TestIntegration:
         with patch("external.dolar_api_client.httpx.AsyncClient") as mock_client_class:
             mock_response = Mock()
             mock_response.json = Mock(return_value=sample_exchange_data)
+            mock_response.content = json.dumps(sample_exchange_data).encode()
+            mock_response.headers = {}
+            mock_response.status_code = 200
             mock_response.raise_for_status = Mock()
             
             mock_client = AsyncMock()
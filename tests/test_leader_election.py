@@ -0,0 +1,173 @@
+"""
+Tests para el lease de liderazgo entre workers.
+"""
+import pytest
+import asyncio
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, AsyncMock, patch
+from sqlalchemy.ext.asyncio import async_sessionmaker
+from sqlmodel.ext.asyncio.session import AsyncSession
+
+from repositories.lease_repository import LeaseRepository
+from services.leader_election import LeaderElection
+from jobs.scheduler import refresh_snapshot_job
+
+
+@pytest.fixture
+def session_factory(test_async_engine):
+    return async_sessionmaker(test_async_engine, class_=AsyncSession, expire_on_commit=False)
+
+
+class TestLeaseRepository:
+    """Tests para LeaseRepository"""
+
+    @pytest.mark.asyncio
+    async def test_only_one_holder_at_a_time(self, test_async_session):
+        """Test: Mientras el lease está vigente ningún otro worker lo obtiene"""
+        # Arrange
+        repository = LeaseRepository()
+
+        # Act
+        first = await repository.try_acquire_async("sync", "worker-a", 30, test_async_session)
+        second = await repository.try_acquire_async("sync", "worker-b", 30, test_async_session)
+        renewed = await repository.try_acquire_async("sync", "worker-a", 30, test_async_session)
+
+        # Assert
+        assert first is True
+        assert second is False
+        assert renewed is True
+        lease = await repository.get_async("sync", test_async_session)
+        assert lease.holder == "worker-a"
+
+    @pytest.mark.asyncio
+    async def test_expired_lease_is_taken_over(self, test_async_session):
+        """Test: Un lease vencido lo toma otro worker"""
+        # Arrange
+        repository = LeaseRepository()
+        now = datetime(2025, 11, 13, 12, 0, tzinfo=timezone.utc)
+        await repository.try_acquire_async("sync", "worker-a", 30, test_async_session, now=now)
+
+        # Act
+        taken = await repository.try_acquire_async(
+            "sync", "worker-b", 30, test_async_session, now=now + timedelta(seconds=31)
+        )
+
+        # Assert
+        assert taken is True
+        lease = await repository.get_async("sync", test_async_session)
+        assert lease.holder == "worker-b"
+
+    @pytest.mark.asyncio
+    async def test_renewal_keeps_acquired_at(self, test_async_session):
+        """Test: Renovar extiende expires_at sin cambiar acquired_at"""
+        # Arrange
+        repository = LeaseRepository()
+        now = datetime(2025, 11, 13, 12, 0, tzinfo=timezone.utc)
+        await repository.try_acquire_async("sync", "worker-a", 30, test_async_session, now=now)
+
+        # Act
+        await repository.try_acquire_async(
+            "sync", "worker-a", 30, test_async_session, now=now + timedelta(seconds=10)
+        )
+
+        # Assert
+        test_async_session.expire_all()
+        lease = await repository.get_async("sync", test_async_session)
+        assert lease.acquired_at.replace(tzinfo=timezone.utc) == now
+        assert lease.expires_at.replace(tzinfo=timezone.utc) == now + timedelta(seconds=40)
+
+    @pytest.mark.asyncio
+    async def test_release_only_by_holder(self, test_async_session):
+        """Test: Sólo el dueño libera el lease"""
+        # Arrange
+        repository = LeaseRepository()
+        await repository.try_acquire_async("sync", "worker-a", 30, test_async_session)
+
+        # Act
+        await repository.release_async("sync", "worker-b", test_async_session)
+        still_held = await repository.try_acquire_async("sync", "worker-b", 30, test_async_session)
+        await repository.release_async("sync", "worker-a", test_async_session)
+        released = await repository.try_acquire_async("sync", "worker-b", 30, test_async_session)
+
+        # Assert
+        assert still_held is False
+        assert released is True
+
+
+class TestLeaderElection:
+    """Tests para LeaderElection"""
+
+    @pytest.mark.asyncio
+    async def test_single_leader_and_handover_on_stop(self, session_factory):
+        """Test: Un solo líder; al detenerse libera el lease para otro worker"""
+        # Arrange
+        leader = LeaderElection(session_factory, holder="worker-a")
+        follower = LeaderElection(session_factory, holder="worker-b")
+
+        with patch("builtins.print"):
+            # Act
+            assert await leader.try_acquire() is True
+            assert await follower.try_acquire() is False
+            await leader.stop()
+            taken = await follower.try_acquire()
+
+        # Assert
+        assert not leader.is_leader
+        assert taken is True
+        assert follower.is_leader
+
+    @pytest.mark.asyncio
+    async def test_dead_leader_is_replaced_after_expiry(self, session_factory):
+        """Test: Si el líder deja de renovar otro toma el lease al vencer"""
+        # Arrange
+        leader = LeaderElection(session_factory, holder="worker-a", lease_seconds=0.05, heartbeat_seconds=0.01)
+        follower = LeaderElection(session_factory, holder="worker-b", lease_seconds=0.05, heartbeat_seconds=0.01)
+
+        with patch("builtins.print"):
+            await leader.try_acquire()
+
+            # Act
+            await asyncio.sleep(0.06)
+            taken = await follower.try_acquire()
+
+        # Assert
+        assert not leader.is_leader
+        assert taken is True
+
+    @pytest.mark.asyncio
+    async def test_heartbeat_keeps_leadership(self, session_factory):
+        """Test: El heartbeat renueva el lease antes de que venza"""
+        # Arrange
+        leader = LeaderElection(session_factory, holder="worker-a", lease_seconds=0.1, heartbeat_seconds=0.02)
+        follower = LeaderElection(session_factory, holder="worker-b", lease_seconds=0.1, heartbeat_seconds=0.02)
+
+        with patch("builtins.print"):
+            # Act
+            leader.start()
+            await asyncio.sleep(0.25)
+            taken = await follower.try_acquire()
+            still_leader = leader.is_leader
+            await leader.stop()
+
+        # Assert
+        assert still_leader is True
+        assert taken is False
+
+    def test_heartbeat_must_be_shorter_than_lease(self):
+        """Test: heartbeat >= lease es inválido"""
+        with pytest.raises(ValueError):
+            LeaderElection(MagicMock(), lease_seconds=10, heartbeat_seconds=10)
+
+    @pytest.mark.asyncio
+    async def test_follower_skips_sync_job(self):
+        """Test: Un worker que no es líder no refresca el snapshot"""
+        # Arrange
+        refresh = AsyncMock()
+        election = LeaderElection(MagicMock(), holder="worker-b")
+
+        # Act
+        with patch("builtins.print"):
+            await refresh_snapshot_job(refresh, election)
+
+        # Assert
+        refresh.assert_not_called()
@@ -0,0 +1,163 @@
+"""
+Tests para las métricas y el endpoint GET /metrics.
+"""
+import pytest
+import httpx
+from fastapi import FastAPI, HTTPException
+
+from api import metrics_routes
+from external.dolar_api_client import DolarApiClient
+from metrics.instruments import (
+    AVERAGE_SECONDS,
+    SERIALIZATION_SECONDS,
+    UPSTREAM_ERRORS,
+    UPSTREAM_FETCH_SECONDS,
+    VALIDATION_SECONDS
+)
+from metrics.registry import Counter, Histogram, MetricsRegistry
+from repositories.exchange_rate_repository import ExchangeRateRepository
+from services.exchange_rate_service import ExchangeRateService
+
+
+def mock_client(handler) -> DolarApiClient:
+    # Transporte en memoria: nada sale a la red
+    client = DolarApiClient(base_url="http://upstream.test")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return client
+
+
+class TestMetricsRegistry:
+    """Tests para Counter, Histogram y el formato de texto de Prometheus"""
+
+    def test_histogram_buckets_are_cumulative(self):
+        """Test: Los buckets son acumulativos y le incluye el límite"""
+        # Arrange
+        histogram = Histogram("stage_seconds", "Etapa", buckets=(0.1, 1.0))
+
+        # Act
+        for value in (0.05, 0.1, 0.5, 3.0):
+            histogram.observe(value)
+        samples = list(histogram.samples())
+
+        # Assert
+        assert samples == [
+            ("stage_seconds_bucket", ("0.1",), 2),
+            ("stage_seconds_bucket", ("1",), 3),
+            ("stage_seconds_bucket", ("+Inf",), 4),
+            ("stage_seconds_sum", (), 3.65),
+            ("stage_seconds_count", (), 4)
+        ]
+
+    def test_render_prometheus_text(self):
+        """Test: render() produce HELP, TYPE y muestras con labels"""
+        # Arrange
+        registry = MetricsRegistry()
+        counter = registry.counter("rows_written", "Filas escritas", labelnames=("table",))
+        histogram = registry.histogram("fetch_seconds", "Latencia", buckets=(0.5,))
+        counter.labels("exchange_rates").inc(3)
+        histogram.observe(0.25)
+
+        # Act
+        text = registry.render()
+
+        # Assert
+        assert text == (
+            "# HELP rows_written Filas escritas\n"
+            "# TYPE rows_written counter\n"
+            'rows_written_total{table="exchange_rates"} 3\n'
+            "# HELP fetch_seconds Latencia\n"
+            "# TYPE fetch_seconds histogram\n"
+            'fetch_seconds_bucket{le="0.5"} 1\n'
+            'fetch_seconds_bucket{le="+Inf"} 1\n'
+            "fetch_seconds_sum 0.25\n"
+            "fetch_seconds_count 1\n"
+        )
+
+    def test_counter_rejects_negative_and_wrong_labels(self):
+        """Test: Un counter no decrece y valida la cantidad de labels"""
+        counter = Counter("errors", "Errores", labelnames=("kind",))
+        with pytest.raises(ValueError):
+            counter.labels("http").inc(-1)
+        with pytest.raises(ValueError):
+            counter.inc()
+
+    def test_duplicate_metric_name_is_rejected(self):
+        """Test: No se registran dos métricas con el mismo nombre"""
+        registry = MetricsRegistry()
+        registry.counter("errors", "Errores")
+        with pytest.raises(ValueError):
+            registry.counter("errors", "Errores")
+
+
+class TestSyncPathMetrics:
+    """Tests para la instrumentación de cada etapa del sync"""
+
+    @pytest.mark.asyncio
+    async def test_each_stage_is_observed(self, sample_exchange_data):
+        """Test: fetch, validación, promedio y serialización registran su latencia"""
+        # Arrange
+        client = mock_client(lambda request: httpx.Response(200, json=sample_exchange_data))
+        service = ExchangeRateService(api_repository=ExchangeRateRepository(client))
+        before = {
+            histogram.name: histogram.count
+            for histogram in (UPSTREAM_FETCH_SECONDS, VALIDATION_SECONDS, AVERAGE_SECONDS, SERIALIZATION_SECONDS)
+        }
+
+        # Act
+        await service.get_serialized_snapshot(persist=False)
+        await client.close()
+
+        # Assert
+        for histogram in (UPSTREAM_FETCH_SECONDS, VALIDATION_SECONDS, AVERAGE_SECONDS, SERIALIZATION_SECONDS):
+            assert histogram.count == before[histogram.name] + 1
+
+    @pytest.mark.asyncio
+    async def test_upstream_errors_are_counted_by_kind(self):
+        """Test: Errores HTTP y de validación se cuentan por separado"""
+        # Arrange
+        responses = iter([httpx.Response(404), httpx.Response(200, content=b"<html>")])
+        client = mock_client(lambda request: next(responses))
+        repository = ExchangeRateRepository(client)
+        http_before = UPSTREAM_ERRORS.value("http")
+        validation_before = UPSTREAM_ERRORS.value("validation")
+
+        # Act
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await repository.get_all_rates()
+        await client.close()
+
+        # Assert
+        assert UPSTREAM_ERRORS.value("http") == http_before + 1
+        assert UPSTREAM_ERRORS.value("validation") == validation_before + 1
+
+
+class TestMetricsEndpoint:
+    """Tests para GET /metrics"""
+
+    @pytest.mark.asyncio
+    async def test_metrics_endpoint_exposes_text_format(self):
+        """Test: /metrics responde en formato de texto de Prometheus"""
+        # Arrange
+        import api.exchange_routes  # registra los contadores del cache y del single-flight
+        app = FastAPI()
+        app.include_router(metrics_routes.route)
+        transport = httpx.ASGITransport(app=app)
+
+        # Act
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            response = await client.get("/metrics")
+
+        # Assert
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        for name in (
+            "exchange_upstream_fetch_seconds_bucket",
+            "exchange_payload_validation_seconds_count",
+            "exchange_average_computation_seconds_sum",
+            "exchange_db_upsert_seconds_count",
+            "exchange_response_serialization_seconds_count",
+            "exchange_cache_requests_total",
+            "exchange_sync_calls_total"
+        ):
+            assert name in response.text
@@ -0,0 +1,145 @@
+"""
+Tests para el header Server-Timing y el profiling por request.
+"""
+import os
+import pstats
+import pytest
+import httpx
+from fastapi import FastAPI
+
+from api import exchange_routes
+from api.middleware import ProfilingMiddleware, ServerTimingMiddleware
+from external.dolar_api_client import DolarApiClient
+from metrics.timing import format_server_timing, record_phase
+from repositories.exchange_rate_repository import ExchangeRateRepository
+from services.exchange_rate_service import ExchangeRateService
+from services.snapshot_cache import SnapshotCache
+
+
+@pytest.fixture
+def app(monkeypatch, sample_exchange_data):
+    # API externa en memoria y un servicio propio por test
+    client = DolarApiClient(base_url="http://upstream.test")
+    client._client = httpx.AsyncClient(transport=httpx.MockTransport(
+        lambda request: httpx.Response(200, json=sample_exchange_data)
+    ))
+    service = ExchangeRateService(api_repository=ExchangeRateRepository(client))
+
+    async def loader():
+        return await service.get_serialized_snapshot(persist=False)
+
+    monkeypatch.setattr(exchange_routes, "shared_snapshot", None)
+    monkeypatch.setattr(exchange_routes, "snapshot_cache", SnapshotCache(
+        loader=loader,
+        versioner=exchange_routes.snapshot_version
+    ))
+
+    app = FastAPI()
+    app.include_router(exchange_routes.route)
+    return app
+
+
+async def get(app, path: str = "/api/exchange/", **kwargs) -> httpx.Response:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        return await client.get(path, **kwargs)
+
+
+def parse_server_timing(value: str) -> dict:
+    phases = {}
+    for item in value.split(","):
+        name, _, duration = item.strip().partition(";dur=")
+        phases[name] = float(duration)
+    return phases
+
+
+class TestServerTiming:
+    """Tests para ServerTimingMiddleware"""
+
+    @pytest.mark.asyncio
+    async def test_header_breaks_down_sync_phases(self, app):
+        """Test: La primera carga reporta cada fase del sync y el total"""
+        # Arrange
+        app.add_middleware(ServerTimingMiddleware)
+
+        # Act
+        response = await get(app)
+
+        # Assert
+        phases = parse_server_timing(response.headers["server-timing"])
+        for name in ("service", "upstream", "validation", "average", "serialization", "total"):
+            assert name in phases
+        assert phases["total"] >= phases["service"] >= phases["upstream"]
+
+    @pytest.mark.asyncio
+    async def test_cached_request_only_reports_service(self, app):
+        """Test: Con el snapshot en cache no hay fases de upstream"""
+        # Arrange
+        app.add_middleware(ServerTimingMiddleware)
+        await get(app)
+
+        # Act
+        response = await get(app)
+
+        # Assert
+        phases = parse_server_timing(response.headers["server-timing"])
+        assert set(phases) == {"service", "total"}
+
+    @pytest.mark.asyncio
+    async def test_disabled_middleware_adds_no_header(self, app):
+        """Test: Deshabilitado no agrega el header"""
+        # Arrange
+        app.add_middleware(ServerTimingMiddleware, enabled=False)
+
+        # Act
+        response = await get(app)
+
+        # Assert
+        assert "server-timing" not in response.headers
+
+    def test_record_phase_outside_request_is_ignored(self):
+        """Test: Fuera de un request las fases no se registran"""
+        record_phase("db", 1.0)
+
+    def test_format_server_timing(self):
+        """Test: Las duraciones se informan en milisegundos"""
+        assert format_server_timing({"db": 0.0015, "total": 0.01}) == "db;dur=1.50, total;dur=10.00"
+
+
+class TestProfilingMiddleware:
+    """Tests para ProfilingMiddleware"""
+
+    @pytest.mark.asyncio
+    async def test_header_mode_dumps_pstats(self, app, tmp_path, capsys):
+        """Test: Con X-Profile: 1 se guarda un volcado pstats del request"""
+        # Arrange
+        app.add_middleware(ProfilingMiddleware, mode="header", output_dir=str(tmp_path))
+
+        # Act
+        response = await get(app, headers={"X-Profile": "1"})
+
+        # Assert
+        files = os.listdir(tmp_path)
+        assert len(files) == 1
+        assert response.headers["x-profile-file"] == files[0]
+        stats = pstats.Stats(str(tmp_path / files[0]))
+        functions = {name for _, _, name in stats.stats}
+        assert "get_all_rates_with_average" in functions
+
+    @pytest.mark.asyncio
+    async def test_header_mode_skips_requests_without_header(self, app, tmp_path):
+        """Test: Sin el header no se perfila"""
+        # Arrange
+        app.add_middleware(ProfilingMiddleware, mode="header", output_dir=str(tmp_path))
+
+        # Act
+        response = await get(app)
+
+        # Assert
+        assert "x-profile-file" not in response.headers
+        assert not os.path.exists(tmp_path) or os.listdir(tmp_path) == []
+
+    def test_rejects_unknown_mode(self):
+        """Test: Un modo desconocido es un error de configuración"""
+        with pytest.raises(ValueError):
+            ProfilingMiddleware(app=None, mode="sometimes")
@@ -0,0 +1,116 @@
+"""
+Tests para RateTable, la representación compacta de las cotizaciones.
+"""
+import json
+import pytest
+from unittest.mock import Mock
+
+from models.exchange_rate import ExchangeRate
+from models.rate_table import RateTable
+from repositories.exchange_rate_repository import ExchangeRateRepository, parse_rate_table
+from services.exchange_rate_service import ExchangeRateService
+
+
+class TestRateTable:
+    """Tests para RateTable"""
+
+    def test_columns_from_models(self, sample_exchange_data):
+        """Test: Las columnas guardan nombres, tipos normalizados y precios en arrays"""
+        # Arrange
+        rates = [ExchangeRate(**data) for data in sample_exchange_data]
+
+        # Act
+        table = RateTable.from_rates(rates)
+
+        # Assert
+        assert table.names == ("Oficial", "Blue", "Bolsa")
+        assert table.types == ("oficial", "blue", "bolsa")
+        assert list(table.buy) == [950.0, 1100.0, 1050.0]
+        assert table.buy.typecode == "d"
+        assert table.models() == tuple(rates)
+        assert table.models()[0] is rates[0]
+
+    def test_models_are_built_once(self):
+        """Test: Los ExchangeRate se construyen una sola vez por tabla"""
+        # Arrange
+        table = RateTable(["Blue"], [1100.0], [1120.0], ["2025-01-01T00:00:00Z"])
+
+        # Act
+        first = table.models()
+        second = list(table)
+
+        # Assert
+        assert second[0] is first[0]
+        assert first[0] == ExchangeRate(
+            nombre="Blue", compra=1100.0, venta=1120.0, fechaActualizacion="2025-01-01T00:00:00Z"
+        )
+
+    def test_names_and_types_are_interned(self):
+        """Test: Nombres iguales de tablas distintas comparten el mismo objeto str"""
+        # Arrange
+        name = "".join(["Contado con ", "liqui"])
+
+        # Act
+        first = RateTable([name], [1.0], [2.0], [""])
+        second = RateTable(["Contado con liqui"], [1.0], [2.0], [""])
+
+        # Assert
+        assert first.names[0] is second.names[0]
+        assert first.types[0] is second.types[0] == "contado_con_liqui"
+
+    def test_average_matches_service(self, sample_exchange_data):
+        """Test: El promedio sobre columnas coincide con el del servicio"""
+        # Arrange
+        table = RateTable.from_rates([ExchangeRate(**data) for data in sample_exchange_data])
+        service = ExchangeRateService(api_repository=Mock(spec=ExchangeRateRepository))
+
+        # Act
+        average = service._average(table)
+
+        # Assert
+        assert table.average() == (1033.33, 1060.0)
+        assert (average.compra, average.venta) == table.average()
+        assert RateTable([], [], [], []).average() == (0.0, 0.0)
+
+    def test_merge_keeps_first_by_type(self):
+        """Test: merge combina por tipo y ante duplicados queda la primera tabla"""
+        # Arrange
+        primary = RateTable(["Blue"], [1100.0], [1120.0], [""])
+        secondary = RateTable(["Blue", "Cripto"], [1999.0, 1150.0], [2000.0, 1170.0], ["", ""])
+
+        # Act
+        merged = RateTable.merge([primary, secondary])
+
+        # Assert
+        assert merged.names == ("Blue", "Cripto")
+        assert list(merged.buy) == [1100.0, 1150.0]
+        assert RateTable.merge([primary]) is primary
+
+    def test_columns_must_have_same_length(self):
+        """Test: Columnas de distinto largo se rechazan"""
+        with pytest.raises(ValueError):
+            RateTable(["Blue"], [1.0, 2.0], [1.0], [""])
+
+
+class TestParseRateTable:
+    """Tests para parse_rate_table"""
+
+    def test_parses_into_table_with_models(self, sample_exchange_data):
+        """Test: El parseo devuelve la tabla con los modelos ya armados"""
+        # Act
+        table = parse_rate_table(json.dumps(sample_exchange_data).encode())
+
+        # Assert
+        assert isinstance(table, RateTable)
+        assert table.types == ("oficial", "blue", "bolsa")
+        assert table.models()[1].compra == 1100.0
+
+    def test_nulls_take_defaults_in_columns(self):
+        """Test: Un null explícito toma el default también en las columnas"""
+        # Act
+        table = parse_rate_table(b'[{"nombre": "Blue", "compra": null, "venta": 5}]')
+
+        # Assert
+        assert list(table.buy) == [0.0]
+        assert table.updated == ("",)
+        assert table.models()[0].compra == 0.0
@@ -0,0 +1,187 @@
+"""
+Tests para los reintentos, el circuit breaker y el hedging de la API externa.
+"""
+import asyncio
+import pytest
+
+from external.resilience import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, RetryPolicy, hedged
+
+
+class TestRetryPolicy:
+    """Tests para RetryPolicy"""
+
+    def test_delay_grows_exponentially_up_to_max(self):
+        """Test: El techo del backoff se duplica por reintento y se acota en max_delay"""
+        # Arrange: el "azar" devuelve siempre el techo
+        policy = RetryPolicy(attempts=5, base_delay=0.1, max_delay=0.3, rng=lambda low, high: high)
+
+        # Act
+        delays = [policy.delay(retry) for retry in (1, 2, 3, 4)]
+
+        # Assert
+        assert delays == [0.1, 0.2, 0.3, 0.3]
+
+    def test_delay_is_jittered_within_range(self):
+        """Test: El jitter queda entre 0 y el techo"""
+        policy = RetryPolicy(base_delay=0.1, max_delay=1.0)
+        for _ in range(50):
+            assert 0.0 <= policy.delay(2) <= 0.2
+
+    def test_at_least_one_attempt(self):
+        """Test: attempts menor a 1 equivale a un solo intento"""
+        assert RetryPolicy(attempts=0).attempts == 1
+
+
+class TestCircuitBreaker:
+    """Tests para CircuitBreaker"""
+
+    def test_opens_after_threshold_and_rejects(self, clock):
+        """Test: N fallas seguidas abren el circuito y las llamadas se rechazan"""
+        # Arrange
+        breaker = CircuitBreaker(failure_threshold=3, reset_timeout=30, clock=clock)
+
+        # Act
+        for _ in range(3):
+            assert breaker.allow()
+            breaker.record_failure()
+
+        # Assert
+        assert breaker.state == OPEN
+        assert not breaker.allow()
+        assert breaker.stats()["opened"] == 1
+        assert breaker.stats()["rejected"] == 1
+
+    def test_success_resets_failure_count(self, clock):
+        """Test: Un éxito entre fallas reinicia la cuenta"""
+        breaker = CircuitBreaker(failure_threshold=2, clock=clock)
+        breaker.record_failure()
+        breaker.record_success()
+        breaker.record_failure()
+        assert breaker.state == CLOSED
+
+    def test_half_open_allows_single_probe(self, clock):
+        """Test: Pasado el reset_timeout se permite una sola llamada de prueba"""
+        # Arrange
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=30, clock=clock)
+        breaker.record_failure()
+
+        # Act
+        clock.now = 30
+
+        # Assert
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+        assert not breaker.allow()
+
+    def test_probe_result_closes_or_reopens(self, clock):
+        """Test: La prueba exitosa cierra el circuito; la fallida lo reabre"""
+        # Arrange
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        breaker.allow()
+
+        # Act: la prueba falla
+        breaker.record_failure()
+
+        # Assert
+        assert breaker.state == OPEN
+        assert breaker.retry_after() == 10
+
+        # Act: la siguiente prueba sale bien
+        clock.now = 20
+        assert breaker.allow()
+        breaker.record_success()
+
+        # Assert
+        assert breaker.state == CLOSED
+
+    def test_release_frees_probe_without_verdict(self, clock):
+        """Test: Liberar la prueba (ej: cancelada) deja pasar a la siguiente sin cambiar de estado"""
+        # Arrange
+        breaker = CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+        breaker.record_failure()
+        clock.now = 10
+        assert breaker.allow()
+
+        # Act
+        breaker.release()
+
+        # Assert
+        assert breaker.state == HALF_OPEN
+        assert breaker.allow()
+
+
+class TestHedged:
+    """Tests para hedged()"""
+
+    @pytest.mark.asyncio
+    async def test_fast_call_is_not_hedged(self):
+        """Test: Si la primera llamada termina antes del umbral no hay copia"""
+        calls = 0
+        hedges = []
+
+        async def call():
+            nonlocal calls
+            calls += 1
+            return "ok"
+
+        assert await hedged(call, 0.05, on_hedge=lambda: hedges.append(1)) == "ok"
+        assert calls == 1
+        assert hedges == []
+
+    @pytest.mark.asyncio
+    async def test_slow_call_is_hedged_and_fastest_wins(self):
+        """Test: Una llamada lenta dispara una copia y gana la primera en terminar"""
+        # Arrange
+        delays = iter([1.0, 0.0])
+        cancelled = []
+
+        async def call():
+            delay = next(delays)
+            try:
+                await asyncio.sleep(delay)
+            except asyncio.CancelledError:
+                cancelled.append(delay)
+                raise
+            return delay
+
+        # Act
+        result = await hedged(call, 0.01)
+        await asyncio.sleep(0)
+
+        # Assert
+        assert result == 0.0
+        assert cancelled == [1.0]
+
+    @pytest.mark.asyncio
+    async def test_error_is_raised_when_both_fail(self):
+        """Test: Si las dos copias fallan se propaga el error"""
+        async def call():
+            await asyncio.sleep(0.02)
+            raise RuntimeError("caído")
+
+        with pytest.raises(RuntimeError):
+            await hedged(call, 0.01)
+
+    @pytest.mark.asyncio
+    async def test_caller_cancelled_before_hedge_cancels_primary(self):
+        """Test: Si vence el timeout del que llama antes del umbral, la llamada en curso se cancela"""
+        # Arrange
+        cancelled = []
+
+        async def call():
+            try:
+                await asyncio.sleep(1.0)
+            except asyncio.CancelledError:
+                cancelled.append(True)
+                raise
+            return "tarde"
+
+        # Act
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(hedged(call, 0.3), 0.05)
+        await asyncio.sleep(0)
+
+        # Assert
+        assert cancelled == [True]
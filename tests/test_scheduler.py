@@ -18,7 +18,7 @@ class TestScheduler:
         with patch("jobs.scheduler.DolarApiClient") as mock_api_client_class, \
              patch("jobs.scheduler.ExchangeRateRepository") as mock_api_repo_class, \
              patch("jobs.scheduler.ExchangeRateService") as mock_service_class, \
-             patch("jobs.scheduler.Session") as mock_session_class, \
+             patch("jobs.scheduler.async_session_maker") as mock_session_maker, \
              patch("builtins.print") as mock_print:
             
             # Mock del servicio
@@ -30,12 +30,13 @@ class TestScheduler:
             }
             mock_service.get_all_rates_with_average = AsyncMock(return_value=mock_result)
             mock_service_class.return_value = mock_service
+            mock_api_repo_class.from_env.return_value.aclose = AsyncMock()
             
-            # Mock de la sesión
+            # Mock de la sesión async
             mock_session = MagicMock()
-            mock_session.__enter__ = MagicMock(return_value=mock_session)
-            mock_session.__exit__ = MagicMock(return_value=None)
-            mock_session_class.return_value = mock_session
+            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
+            mock_session.__aexit__ = AsyncMock(return_value=None)
+            mock_session_maker.return_value = mock_session
             
             # Act
             await sync_exchange_rates_job()
@@ -58,7 +59,7 @@ class TestScheduler:
         with patch("jobs.scheduler.DolarApiClient") as mock_api_client_class, \
              patch("jobs.scheduler.ExchangeRateRepository") as mock_api_repo_class, \
              patch("jobs.scheduler.ExchangeRateService") as mock_service_class, \
-             patch("jobs.scheduler.Session") as mock_session_class, \
+             patch("jobs.scheduler.async_session_maker") as mock_session_maker, \
              patch("builtins.print") as mock_print:
             
             # Mock del servicio que lanza error
@@ -67,12 +68,13 @@ class TestScheduler:
                 side_effect=Exception("API Error")
             )
             mock_service_class.return_value = mock_service
+            mock_api_repo_class.from_env.return_value.aclose = AsyncMock()
             
-            # Mock de la sesión
+            # Mock de la sesión async
             mock_session = MagicMock()
-            mock_session.__enter__ = MagicMock(return_value=mock_session)
-            mock_session.__exit__ = MagicMock(return_value=None)
-            mock_session_class.return_value = mock_session
+            mock_session.__aenter__ = AsyncMock(return_value=mock_session)
+            mock_session.__aexit__ = AsyncMock(return_value=None)
+            mock_session_maker.return_value = mock_session
             
             # Act & Assert
             with pytest.raises(Exception) as exc_info:
@@ -120,3 +122,83 @@ class TestScheduler:
             call_kwargs = mock_scheduler.add_job.call_args[1]
             assert call_kwargs['id'] == 'sync_exchange_rates'
             assert 'IntervalTrigger' in str(type(call_kwargs['trigger']))
+    
+    def test_run_sync_job_uses_app_loop(self):
+        """Test: Con el loop de la app el job se ejecuta en ese loop"""
+        # Arrange
+        loop = MagicMock()
+        with patch("jobs.scheduler.asyncio.run_coroutine_threadsafe") as mock_threadsafe, \
+             patch("jobs.scheduler.asyncio.run") as mock_asyncio_run, \
+             patch("jobs.scheduler.sync_exchange_rates_job") as mock_job:
+            
+            # Act
+            run_sync_job(loop=loop)
+            
+            # Assert
+            mock_threadsafe.assert_called_once()
+            assert mock_threadsafe.call_args[0][1] is loop
+            mock_threadsafe.return_value.result.assert_called_once()
+            mock_asyncio_run.assert_not_called()
+
+
+class TestAsyncScheduler:
+    """Tests para el modo AsyncIOScheduler (en el loop de la app)"""
+    
+    @pytest.mark.asyncio
+    async def test_start_async_scheduler_configures_job(self):
+        """Test: El job usa intervalo, jitter, misfire grace y una sola instancia"""
+        # Arrange
+        from jobs.scheduler import start_async_scheduler, refresh_snapshot_job
+        refresh = AsyncMock()
+        
+        # Act
+        with patch("builtins.print"):
+            scheduler = start_async_scheduler(
+                refresh,
+                interval_seconds=600,
+                jitter_seconds=15,
+                misfire_grace_seconds=120
+            )
+        
+        try:
+            job = scheduler.get_job('sync_exchange_rates')
+            
+            # Assert
+            assert job.func is refresh_snapshot_job
+            assert job.args == (refresh, None)
+            assert job.max_instances == 1
+            assert job.coalesce is True
+            assert job.misfire_grace_time == 120
+            assert job.trigger.interval.total_seconds() == 600
+            assert job.trigger.jitter == 15
+        finally:
+            scheduler.shutdown(wait=False)
+    
+    @pytest.mark.asyncio
+    async def test_refresh_snapshot_job_refreshes_snapshot(self):
+        """Test: El job refresca el snapshot en memoria del proceso"""
+        # Arrange
+        from jobs.scheduler import refresh_snapshot_job
+        refresh = AsyncMock(return_value=MagicMock(version="abc"))
+        
+        # Act
+        with patch("builtins.print") as mock_print:
+            await refresh_snapshot_job(refresh)
+        
+        # Assert
+        refresh.assert_awaited_once()
+        assert any("abc" in str(call) for call in mock_print.call_args_list)
+    
+    @pytest.mark.asyncio
+    async def test_refresh_snapshot_job_propagates_errors(self):
+        """Test: Un error del refresh se loguea y se propaga al scheduler"""
+        # Arrange
+        from jobs.scheduler import refresh_snapshot_job
+        refresh = AsyncMock(side_effect=Exception("API caída"))
+        
+        # Act & Assert
+        with patch("builtins.print") as mock_print:
+            with pytest.raises(Exception, match="API caída"):
+                await refresh_snapshot_job(refresh)
+        
+        assert any("Error refrescando snapshot" in str(call) for call in mock_print.call_args_list)
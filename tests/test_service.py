@@ -3,11 +3,14 @@ Tests para el servicio de tasas de cambio.
 """
 import pytest
 from unittest.mock import Mock, AsyncMock, patch
+from fastapi import HTTPException
 from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
 
 from services.exchange_rate_service import ExchangeRateService
 from repositories.exchange_rate_repository import ExchangeRateRepository
 from repositories.exchange_db_repository import ExchangeDBRepository
+from repositories.exchange_history_repository import ExchangeHistoryRepository
 from models.exchange_rate import ExchangeRate, ExchangeRateAverage
 
 
@@ -103,6 +106,10 @@ class TestExchangeRateService:
             ExchangeRate(**data) for data in sample_exchange_data
         ])
         
+        mock_api_repo.get_rates_if_changed = AsyncMock(return_value=[
+            ExchangeRate(**data) for data in sample_exchange_data
+        ])
+        
         db_repo = ExchangeDBRepository()
         service = ExchangeRateService(
             api_repository=mock_api_repo,
@@ -128,6 +135,7 @@ class TestExchangeRateService:
         ])
         
         mock_db_repo = Mock(spec=ExchangeDBRepository)
+        mock_db_repo.get_all_rates.return_value = []
         service = ExchangeRateService(
             api_repository=mock_api_repo,
             db_repository=mock_db_repo
@@ -142,3 +150,288 @@ class TestExchangeRateService:
         # Assert: No debe llamar al DB repository
         mock_db_repo.update_or_create_rate.assert_not_called()
         assert len(result.rates) == 3
+    
+    @pytest.mark.asyncio
+    async def test_persist_uses_bulk_upsert_by_default(self, sample_exchange_data):
+        """Test: Por defecto se persiste con upsert_many en un solo lote"""
+        # Arrange
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(return_value=[
+            ExchangeRate(**data) for data in sample_exchange_data
+        ])
+        
+        mock_db_repo = Mock(spec=ExchangeDBRepository)
+        mock_db_repo.get_all_rates.return_value = []
+        service = ExchangeRateService(
+            api_repository=mock_api_repo,
+            db_repository=mock_db_repo
+        )
+        mock_session = Mock(spec=Session)
+        
+        # Act
+        await service.get_all_rates_with_average(session=mock_session, persist=True)
+        
+        # Assert
+        mock_db_repo.upsert_many.assert_called_once()
+        rows = mock_db_repo.upsert_many.call_args[0][0]
+        assert [row["type"] for row in rows] == ["oficial", "blue", "bolsa"]
+        mock_db_repo.update_or_create_rate.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_persist_row_by_row_when_bulk_disabled(self, sample_exchange_data):
+        """Test: Con bulk_upsert=False se usa update_or_create_rate por fila"""
+        # Arrange
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(return_value=[
+            ExchangeRate(**data) for data in sample_exchange_data
+        ])
+        
+        mock_db_repo = Mock(spec=ExchangeDBRepository)
+        mock_db_repo.get_all_rates.return_value = []
+        service = ExchangeRateService(
+            api_repository=mock_api_repo,
+            db_repository=mock_db_repo,
+            bulk_upsert=False
+        )
+        mock_session = Mock(spec=Session)
+        
+        # Act
+        await service.get_all_rates_with_average(session=mock_session, persist=True)
+        
+        # Assert
+        assert mock_db_repo.update_or_create_rate.call_count == 3
+        mock_db_repo.upsert_many.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_persist_with_async_session(self, test_async_session, sample_exchange_data):
+        """Test: Con AsyncSession se persiste sin bloquear el event loop"""
+        # Arrange
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(return_value=[
+            ExchangeRate(**data) for data in sample_exchange_data
+        ])
+        
+        db_repo = ExchangeDBRepository()
+        service = ExchangeRateService(
+            api_repository=mock_api_repo,
+            db_repository=db_repo
+        )
+        
+        # Act
+        await service.get_all_rates_with_average(session=test_async_session, persist=True)
+        
+        # Assert
+        saved_rates = await db_repo.get_all_rates_async(test_async_session)
+        assert len(saved_rates) == 3
+        blue_rate = await db_repo.get_rate_by_type_async("blue", test_async_session)
+        assert blue_rate is not None
+        assert float(blue_rate.rate) > 1.0
+    
+    @pytest.mark.asyncio
+    async def test_persist_appends_history(self, test_session, sample_exchange_data):
+        """Test: Cada sincronización agrega la cotización al historial sin duplicar"""
+        # Arrange
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(return_value=[
+            ExchangeRate(**data) for data in sample_exchange_data
+        ])
+        
+        mock_api_repo.get_rates_if_changed = AsyncMock(return_value=[
+            ExchangeRate(**data) for data in sample_exchange_data
+        ])
+        
+        history_repo = ExchangeHistoryRepository()
+        service = ExchangeRateService(
+            api_repository=mock_api_repo,
+            history_repository=history_repo
+        )
+        
+        # Act
+        await service.get_all_rates_with_average(session=test_session, persist=True)
+        await service.get_all_rates_with_average(session=test_session, persist=True)
+        
+        # Assert
+        blue_history = history_repo.get_page("blue", session=test_session)
+        assert len(blue_history) == 1
+        assert float(blue_history[0].buy) == 1100.0
+    
+    @pytest.mark.asyncio
+    async def test_unchanged_upstream_skips_average_and_persistence(self, sample_exchange_data):
+        """Test: Si la API externa no cambió se reutiliza el resultado anterior"""
+        # Arrange
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(return_value=[
+            ExchangeRate(**data) for data in sample_exchange_data
+        ])
+        mock_api_repo.get_rates_if_changed = AsyncMock(return_value=None)
+        
+        mock_db_repo = Mock(spec=ExchangeDBRepository)
+        mock_db_repo.get_all_rates.return_value = []
+        service = ExchangeRateService(
+            api_repository=mock_api_repo,
+            db_repository=mock_db_repo
+        )
+        mock_session = Mock(spec=Session)
+        
+        # Act
+        first = await service.get_all_rates_with_average(session=mock_session, persist=True)
+        second = await service.get_all_rates_with_average(session=mock_session, persist=True)
+        
+        # Assert
+        assert second is first
+        assert service.unchanged_fetches == 1
+        mock_api_repo.get_all_rates.assert_awaited_once()
+        mock_api_repo.get_rates_if_changed.assert_awaited_once()
+        mock_db_repo.upsert_many.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_unchanged_upstream_still_persists_if_never_persisted(self, sample_exchange_data):
+        """Test: Sin cambios pero nunca persistido, se persiste el resultado anterior"""
+        # Arrange
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(return_value=[
+            ExchangeRate(**data) for data in sample_exchange_data
+        ])
+        mock_api_repo.get_rates_if_changed = AsyncMock(return_value=None)
+        
+        mock_db_repo = Mock(spec=ExchangeDBRepository)
+        mock_db_repo.get_all_rates.return_value = []
+        service = ExchangeRateService(
+            api_repository=mock_api_repo,
+            db_repository=mock_db_repo
+        )
+        
+        # Act
+        await service.get_all_rates_with_average(persist=False)
+        await service.get_all_rates_with_average(session=Mock(spec=Session), persist=True)
+        
+        # Assert
+        mock_db_repo.upsert_many.assert_called_once()
+    
+    @pytest.mark.asyncio
+    async def test_change_detection_skips_unchanged_rows(self, test_session, sample_exchange_data):
+        """Test: Sólo se escriben los tipos que cambiaron respecto a lo persistido"""
+        # Arrange
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(return_value=[
+            ExchangeRate(**data) for data in sample_exchange_data
+        ])
+        
+        db_repo = ExchangeDBRepository()
+        service = ExchangeRateService(
+            api_repository=mock_api_repo,
+            db_repository=db_repo,
+            conditional_fetch=False
+        )
+        
+        # Act
+        await service.get_all_rates_with_average(session=test_session, persist=True)
+        first_stats = service.last_persist_stats
+        with patch.object(db_repo, "upsert_many", wraps=db_repo.upsert_many) as mock_upsert:
+            await service.get_all_rates_with_average(session=test_session, persist=True)
+        
+        # Assert
+        assert (first_stats.inserted, first_stats.updated, first_stats.skipped) == (3, 0, 0)
+        assert service.last_persist_stats.skipped == 3
+        assert service.last_persist_stats.changed == 0
+        mock_upsert.assert_not_called()
+    
+    @pytest.mark.asyncio
+    async def test_change_detection_loads_snapshot_from_db_once(self, test_session, sample_exchange_data):
+        """Test: Un servicio nuevo carga lo persistido una sola vez y compara contra eso"""
+        # Arrange
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(return_value=[
+            ExchangeRate(**data) for data in sample_exchange_data
+        ])
+        db_repo = ExchangeDBRepository()
+        await ExchangeRateService(
+            api_repository=mock_api_repo,
+            db_repository=db_repo
+        ).get_all_rates_with_average(session=test_session, persist=True)
+        
+        changed_data = [dict(data) for data in sample_exchange_data]
+        changed_data[1]["compra"] = 1200.0
+        mock_api_repo.get_all_rates = AsyncMock(return_value=[
+            ExchangeRate(**data) for data in changed_data
+        ])
+        service = ExchangeRateService(
+            api_repository=mock_api_repo,
+            db_repository=db_repo,
+            conditional_fetch=False
+        )
+        
+        # Act
+        with patch.object(db_repo, "get_all_rates", wraps=db_repo.get_all_rates) as mock_get_all:
+            await service.get_all_rates_with_average(session=test_session, persist=True)
+            await service.get_all_rates_with_average(session=test_session, persist=True)
+        
+        # Assert
+        mock_get_all.assert_called_once()
+        assert service.last_persist_stats.inserted == 0
+        blue_rate = db_repo.get_rate_by_type("blue", test_session)
+        assert float(blue_rate.buy) == 1200.0
+
+
+class TestStaleFallback:
+    """Tests para el fallback al último dato conocido cuando falla la API externa"""
+    
+    @pytest.mark.asyncio
+    async def test_falls_back_to_last_response_in_memory(self, sample_exchange_data):
+        """Test: Si la API falla se sirve el último snapshot marcado como stale"""
+        # Arrange
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(side_effect=[
+            [ExchangeRate(**data) for data in sample_exchange_data],
+            HTTPException(status_code=503, detail="caído")
+        ])
+        service = ExchangeRateService(api_repository=mock_api_repo, conditional_fetch=False)
+        fresh = await service.get_all_rates_with_average(persist=False)
+        
+        # Act
+        with patch("builtins.print"):
+            stale = await service.get_all_rates_with_average(persist=False)
+        
+        # Assert
+        assert stale.stale is True
+        assert stale.rates == fresh.rates
+        assert fresh.stale is False
+        assert service._last_response is fresh
+    
+    @pytest.mark.asyncio
+    async def test_falls_back_to_persisted_rows(self, test_async_engine, test_async_session, sample_exchange_data):
+        """Test: Sin snapshot en memoria se leen las tasas persistidas"""
+        # Arrange
+        db_repo = ExchangeDBRepository()
+        await db_repo.upsert_many_async(
+            [{"type": "blue", "buy": 1100.0, "sell": 1120.0, "rate": 1.0, "diff": 0.0}],
+            session=test_async_session
+        )
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(side_effect=HTTPException(status_code=500, detail="caído"))
+        service = ExchangeRateService(
+            api_repository=mock_api_repo,
+            db_repository=db_repo,
+            fallback_session_factory=lambda: AsyncSession(test_async_engine)
+        )
+        
+        # Act
+        with patch("builtins.print"):
+            result = await service.get_all_rates_with_average(persist=False)
+        
+        # Assert
+        assert result.stale is True
+        assert [(rate.nombre, rate.compra) for rate in result.rates] == [("blue", 1100.0)]
+        assert result.average.venta == 1120.0
+    
+    @pytest.mark.asyncio
+    async def test_error_propagates_without_fallback_data(self):
+        """Test: Sin dato previo ni base el error de la API se propaga"""
+        # Arrange
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(side_effect=HTTPException(status_code=500, detail="caído"))
+        service = ExchangeRateService(api_repository=mock_api_repo)
+        
+        # Act / Assert
+        with pytest.raises(HTTPException):
+            await service.get_all_rates_with_average(persist=False)
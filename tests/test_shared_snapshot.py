@@ -0,0 +1,229 @@
+"""
+Tests para el snapshot compartido entre workers (archivo mapeado en memoria).
+"""
+import gzip
+import pytest
+import httpx
+from unittest.mock import AsyncMock, patch
+from fastapi import FastAPI
+
+from api import exchange_routes
+from models.exchange_rate import ExchangeRate, ExchangeRateAverage, ExchangeRateResponse
+from services import shared_snapshot as shared_snapshot_module
+from services.shared_snapshot import SEQ, SEQ_OFFSET, SharedSnapshotFile
+from services.serialized_snapshot import SerializedSnapshot
+from services.snapshot_cache import SnapshotCache
+
+
+@pytest.fixture
+def serialized(sample_exchange_data):
+    return SerializedSnapshot.from_response(ExchangeRateResponse(
+        rates=[ExchangeRate(**data) for data in sample_exchange_data],
+        average=ExchangeRateAverage(compra=1033.33, venta=1060.0)
+    ))
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "snapshot.bin")
+
+
+@pytest.fixture
+def writer(path):
+    shared = SharedSnapshotFile(path, capacity=4096)
+    yield shared
+    shared.close()
+
+
+@pytest.fixture
+def reader(path):
+    shared = SharedSnapshotFile(path, capacity=4096)
+    yield shared
+    shared.close()
+
+
+class TestSharedSnapshotFile:
+    """Tests para SharedSnapshotFile"""
+
+    def test_empty_file_has_no_snapshot(self, reader):
+        """Test: Sin publicaciones no hay snapshot"""
+        assert reader.read() is None
+        assert not reader.has_new_version()
+
+    def test_reader_sees_published_snapshot(self, writer, reader, serialized):
+        """Test: Otro proceso lee el mismo cuerpo y versión que publicó el líder"""
+        # Act
+        writer.publish(serialized)
+        result = reader.read()
+
+        # Assert
+        assert result.body == serialized.body
+        assert result.version == serialized.version
+        assert result.response == serialized.response
+        assert gzip.decompress(result.content("gzip")) == serialized.body
+
+    def test_body_is_reread_only_on_new_version(self, writer, reader, serialized):
+        """Test: Con el mismo seq se devuelve el mismo objeto sin releer"""
+        # Arrange
+        writer.publish(serialized)
+        first = reader.read()
+
+        # Act
+        second = reader.read()
+        changed = SerializedSnapshot.from_response(serialized.response.model_copy(
+            update={"average": ExchangeRateAverage(compra=1.0, venta=2.0)}
+        ))
+        writer.publish(changed)
+        has_new = reader.has_new_version()
+        third = reader.read()
+
+        # Assert
+        assert second is first
+        assert has_new is True
+        assert third.version == changed.version
+        assert not reader.has_new_version()
+
+    def test_write_in_progress_is_not_read(self, writer, reader, serialized):
+        """Test: Con seq impar (escritura a medias) el lector no toma el snapshot"""
+        # Arrange
+        writer.publish(serialized)
+        (seq,) = SEQ.unpack_from(writer._map, SEQ_OFFSET)
+
+        # Act
+        SEQ.pack_into(writer._map, SEQ_OFFSET, seq + 1)
+
+        # Assert
+        assert reader.read() is None
+        assert not reader.has_new_version()
+
+    def test_old_snapshot_is_ignored_with_max_age(self, writer, reader, serialized, monkeypatch):
+        """Test: Un snapshot más viejo que max_age no se usa"""
+        # Arrange
+        writer.publish(serialized)
+        now = shared_snapshot_module.time.time()
+
+        # Act
+        monkeypatch.setattr(shared_snapshot_module.time, "time", lambda: now + 700)
+
+        # Assert
+        assert reader.read(max_age=600) is None
+        assert reader.read() is not None
+
+    def test_rejects_snapshot_larger_than_capacity(self, path, serialized):
+        """Test: Un cuerpo más grande que la capacidad no se publica"""
+        shared = SharedSnapshotFile(path, capacity=16)
+        with pytest.raises(ValueError):
+            shared.publish(serialized)
+        shared.close()
+
+
+class TestSharedSnapshotRoute:
+    """Tests para GET /api/exchange con snapshot compartido"""
+
+    @pytest.mark.asyncio
+    async def test_follower_serves_leader_snapshot(self, monkeypatch, writer, reader, serialized):
+        """Test: Un worker sirve lo publicado por el líder sin consultar la API"""
+        # Arrange
+        fetch = AsyncMock()
+        monkeypatch.setattr(exchange_routes, "fetch_snapshot", fetch)
+        monkeypatch.setattr(exchange_routes, "shared_snapshot", reader)
+        monkeypatch.setattr(exchange_routes, "snapshot_cache", SnapshotCache(
+            loader=exchange_routes.load_snapshot,
+            versioner=exchange_routes.snapshot_version
+        ))
+        writer.publish(serialized)
+
+        app = FastAPI()
+        app.include_router(exchange_routes.route)
+
+        # Act
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/exchange/", headers={"Accept-Encoding": "identity"})
+
+        # Assert
+        assert response.content == serialized.body
+        assert response.headers["etag"] == serialized.etag()
+        fetch.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_worker_publishes_what_it_loads_from_api(self, monkeypatch, writer, reader, serialized):
+        """Test: Si el archivo quedó viejo, el worker que va a la API publica el resultado para los demás"""
+        # Arrange: lo publicado por el líder ya pasó el max_staleness
+        writer.publish(serialized)
+        now = shared_snapshot_module.time.time()
+        monkeypatch.setattr(shared_snapshot_module.time, "time", lambda: now + 700)
+        fetch = AsyncMock(return_value=serialized)
+        monkeypatch.setattr(exchange_routes, "fetch_snapshot", fetch)
+        monkeypatch.setattr(exchange_routes, "shared_snapshot", writer)
+
+        # Act
+        loaded = await exchange_routes.load_snapshot()
+
+        # Assert: el otro worker lo ve fresco y no necesita la API
+        assert loaded is serialized
+        fetch.assert_awaited_once()
+        assert reader.read(max_age=600).body == serialized.body
+
+    @pytest.mark.asyncio
+    async def test_sync_updates_local_cache_when_publish_fails(self, monkeypatch, path, serialized):
+        """Test: Un snapshot que no entra en el archivo igual actualiza el cache del líder"""
+        # Arrange
+        small = SharedSnapshotFile(path, capacity=16)
+        cache = SnapshotCache(loader=AsyncMock(), versioner=exchange_routes.snapshot_version)
+        monkeypatch.setattr(exchange_routes, "fetch_snapshot", AsyncMock(return_value=serialized))
+        monkeypatch.setattr(exchange_routes, "shared_snapshot", small)
+        monkeypatch.setattr(exchange_routes, "snapshot_cache", cache)
+
+        # Act
+        with patch("builtins.print"):
+            snapshot = await exchange_routes.sync_snapshot()
+        small.close()
+
+        # Assert
+        assert cache.snapshot is snapshot
+        assert snapshot.value is serialized
+
+    @pytest.mark.asyncio
+    async def test_file_older_than_ttl_fetches_upstream(self, monkeypatch, writer, reader, serialized):
+        """Test: Un archivo más viejo que el TTL no se adopta: se consulta la API y se republica"""
+        # Arrange
+        writer.publish(serialized)
+        now = shared_snapshot_module.time.time()
+        monkeypatch.setattr(shared_snapshot_module.time, "time", lambda: now + 120)
+        fetch = AsyncMock(return_value=serialized)
+        monkeypatch.setattr(exchange_routes, "fetch_snapshot", fetch)
+        monkeypatch.setattr(exchange_routes, "shared_snapshot", reader)
+        monkeypatch.setattr(exchange_routes, "CACHE_TTL_SECONDS", 60)
+
+        # Act
+        loaded = await exchange_routes.load_snapshot()
+
+        # Assert
+        assert loaded is serialized
+        fetch.assert_awaited_once()
+        assert writer.read(max_age=60) is not None
+
+    @pytest.mark.asyncio
+    async def test_adopted_snapshot_keeps_its_publication_age(self, monkeypatch, writer, reader, serialized):
+        """Test: El TTL y el max-age de lo adoptado se cuentan desde que se publicó"""
+        # Arrange
+        writer.publish(serialized)
+        now = shared_snapshot_module.time.time()
+        monkeypatch.setattr(shared_snapshot_module.time, "time", lambda: now + 45)
+        fetch = AsyncMock()
+        monkeypatch.setattr(exchange_routes, "fetch_snapshot", fetch)
+        monkeypatch.setattr(exchange_routes, "shared_snapshot", reader)
+        monkeypatch.setattr(exchange_routes, "snapshot_cache", SnapshotCache(
+            loader=exchange_routes.load_snapshot,
+            ttl=60,
+            versioner=exchange_routes.snapshot_version,
+            age_of=exchange_routes.snapshot_age
+        ))
+
+        # Act
+        snapshot = await exchange_routes.current_snapshot()
+
+        # Assert
+        assert snapshot.value.body == serialized.body
+        assert 14 <= exchange_routes.snapshot_cache.time_to_live(snapshot) <= 15
+        fetch.assert_not_called()
@@ -0,0 +1,133 @@
+"""
+Tests para el coalescing de llamadas concurrentes (single-flight).
+"""
+import pytest
+import asyncio
+from unittest.mock import Mock, AsyncMock
+
+from services.single_flight import SingleFlight
+from services.exchange_rate_service import ExchangeRateService
+from repositories.exchange_rate_repository import ExchangeRateRepository
+from models.exchange_rate import ExchangeRate
+
+
+class TestSingleFlight:
+    """Tests para SingleFlight"""
+
+    @pytest.mark.asyncio
+    async def test_concurrent_calls_share_one_execution(self):
+        """Test: Llamadas concurrentes esperan una sola ejecución"""
+        # Arrange
+        single_flight = SingleFlight()
+        release = asyncio.Event()
+        executions = 0
+
+        async def fetch():
+            nonlocal executions
+            executions += 1
+            await release.wait()
+            return "resultado"
+
+        # Act
+        tasks = [asyncio.create_task(single_flight.do("rates", fetch)) for _ in range(10)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        # Assert
+        assert results == ["resultado"] * 10
+        assert executions == 1
+        assert single_flight.stats() == {
+            "calls": 10,
+            "executions": 1,
+            "coalesced": 9,
+            "in_flight": 0
+        }
+
+    @pytest.mark.asyncio
+    async def test_sequential_calls_are_not_coalesced(self):
+        """Test: Llamadas no solapadas se ejecutan cada una"""
+        # Arrange
+        single_flight = SingleFlight()
+        fetch = AsyncMock(return_value="resultado")
+
+        # Act
+        await single_flight.do("rates", fetch)
+        await single_flight.do("rates", fetch)
+
+        # Assert
+        assert fetch.await_count == 2
+        assert single_flight.coalesced == 0
+
+    @pytest.mark.asyncio
+    async def test_error_is_shared_by_all_callers(self):
+        """Test: Un error se propaga a todos los llamadores agrupados"""
+        # Arrange
+        single_flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            raise RuntimeError("API caída")
+
+        # Act
+        tasks = [asyncio.create_task(single_flight.do("rates", fetch)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        # Assert
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert not single_flight.in_flight("rates")
+
+    @pytest.mark.asyncio
+    async def test_cancelled_caller_does_not_cancel_others(self):
+        """Test: Cancelar un llamador no cancela la ejecución compartida"""
+        # Arrange
+        single_flight = SingleFlight()
+        release = asyncio.Event()
+
+        async def fetch():
+            await release.wait()
+            return "resultado"
+
+        first = asyncio.create_task(single_flight.do("rates", fetch))
+        second = asyncio.create_task(single_flight.do("rates", fetch))
+        await asyncio.sleep(0)
+
+        # Act
+        first.cancel()
+        release.set()
+        result = await second
+
+        # Assert
+        assert result == "resultado"
+        assert first.cancelled()
+
+    @pytest.mark.asyncio
+    async def test_service_coalesces_concurrent_fetches(self, sample_exchange_data):
+        """Test: El servicio hace un solo fetch para llamadas concurrentes"""
+        # Arrange
+        release = asyncio.Event()
+
+        async def get_all_rates():
+            await release.wait()
+            return [ExchangeRate(**data) for data in sample_exchange_data]
+
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(side_effect=get_all_rates)
+        service = ExchangeRateService(api_repository=mock_api_repo)
+
+        # Act
+        tasks = [
+            asyncio.create_task(service.get_all_rates_with_average(persist=False))
+            for _ in range(50)
+        ]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*tasks)
+
+        # Assert
+        assert mock_api_repo.get_all_rates.await_count == 1
+        assert all(result is results[0] for result in results)
+        assert service.coalescing_stats()["coalesced"] == 49
@@ -0,0 +1,180 @@
+"""
+Tests para el cache de snapshots con stale-while-revalidate.
+"""
+import pytest
+import asyncio
+from unittest.mock import AsyncMock
+
+from services.snapshot_cache import SnapshotCache
+
+
+class TestSnapshotCache:
+    """Tests para SnapshotCache"""
+
+    @pytest.mark.asyncio
+    async def test_first_get_loads_snapshot(self, clock):
+        """Test: Sin snapshot se espera la carga"""
+        # Arrange
+        loader = AsyncMock(return_value="v1")
+        cache = SnapshotCache(loader=loader, ttl=10, max_staleness=60, clock=clock)
+
+        # Act
+        result = await cache.get()
+
+        # Assert
+        assert result == "v1"
+        loader.assert_awaited_once()
+
+    @pytest.mark.asyncio
+    async def test_fresh_snapshot_does_not_reload(self, clock):
+        """Test: Dentro del TTL no se vuelve a llamar al loader"""
+        # Arrange
+        loader = AsyncMock(return_value="v1")
+        cache = SnapshotCache(loader=loader, ttl=10, max_staleness=60, clock=clock)
+        await cache.get()
+
+        # Act
+        clock.now = 9
+        result = await cache.get()
+
+        # Assert
+        assert result == "v1"
+        assert loader.await_count == 1
+
+    @pytest.mark.asyncio
+    async def test_stats_count_hits_stale_and_misses(self, clock):
+        """Test: stats() cuenta lecturas frescas, vencidas y cargas"""
+        # Arrange
+        loader = AsyncMock(return_value="v1")
+        cache = SnapshotCache(loader=loader, ttl=10, max_staleness=60, clock=clock)
+
+        # Act
+        await cache.get()
+        await cache.get()
+        clock.now = 20
+        await cache.get()
+        clock.now = 200
+        await cache.get()
+
+        # Assert
+        assert cache.stats() == {"hit": 1, "stale": 1, "miss": 2}
+
+    @pytest.mark.asyncio
+    async def test_stale_snapshot_is_served_and_refreshed_in_background(self, clock):
+        """Test: Snapshot vencido se sirve mientras se refresca en segundo plano"""
+        # Arrange
+        loader = AsyncMock(side_effect=["v1", "v2"])
+        cache = SnapshotCache(loader=loader, ttl=10, max_staleness=60, clock=clock)
+        await cache.get()
+
+        # Act
+        clock.now = 30
+        stale = await cache.get()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        fresh = await cache.get()
+
+        # Assert
+        assert stale == "v1"
+        assert fresh == "v2"
+        assert loader.await_count == 2
+
+    @pytest.mark.asyncio
+    async def test_only_one_background_refresh_at_a_time(self, clock):
+        """Test: Varias lecturas vencidas disparan un solo refresh"""
+        # Arrange
+        release = asyncio.Event()
+        calls = 0
+
+        async def loader():
+            nonlocal calls
+            calls += 1
+            if calls > 1:
+                await release.wait()
+            return f"v{calls}"
+
+        cache = SnapshotCache(loader=loader, ttl=10, max_staleness=60, clock=clock)
+        await cache.get()
+        clock.now = 30
+
+        # Act
+        results = [await cache.get() for _ in range(5)]
+        await asyncio.sleep(0)
+        release.set()
+        await asyncio.sleep(0)
+
+        # Assert
+        assert results == ["v1"] * 5
+        assert calls == 2
+
+    @pytest.mark.asyncio
+    async def test_too_stale_snapshot_waits_for_reload(self, clock):
+        """Test: Superado max_staleness se espera la carga nueva"""
+        # Arrange
+        loader = AsyncMock(side_effect=["v1", "v2"])
+        cache = SnapshotCache(loader=loader, ttl=10, max_staleness=60, clock=clock)
+        await cache.get()
+
+        # Act
+        clock.now = 61
+        result = await cache.get()
+
+        # Assert
+        assert result == "v2"
+
+    @pytest.mark.asyncio
+    async def test_background_refresh_error_keeps_old_snapshot(self, clock):
+        """Test: Un error en el refresh no descarta el snapshot viejo"""
+        # Arrange
+        loader = AsyncMock(side_effect=["v1", Exception("API caída")])
+        cache = SnapshotCache(loader=loader, ttl=10, max_staleness=60, clock=clock)
+        await cache.get()
+
+        # Act
+        clock.now = 30
+        await cache.get()
+        await asyncio.sleep(0)
+        await asyncio.sleep(0)
+        result = await cache.get()
+
+        # Assert
+        assert result == "v1"
+
+    def test_on_change_only_for_new_versions(self):
+        """Test: on_change recibe (anterior, nuevo) sólo cuando cambia la versión"""
+        # Arrange
+        changes = []
+        cache = SnapshotCache(
+            loader=AsyncMock(),
+            versioner=lambda value: value,
+            on_change=lambda previous, current: changes.append(
+                (previous.value if previous else None, current.value)
+            )
+        )
+
+        # Act
+        cache.set("v1")
+        cache.set("v1")
+        cache.set("v2")
+
+        # Assert
+        assert changes == [(None, "v1"), ("v1", "v2")]
+
+    def test_age_of_counts_ttl_from_origin(self, clock):
+        """Test: Un valor que llega con edad (age_of) vence antes que uno recién cargado"""
+        # Arrange
+        clock.now = 100
+        cache = SnapshotCache(loader=AsyncMock(), ttl=60, max_staleness=600, clock=clock, age_of=lambda value: 45)
+
+        # Act
+        snapshot = cache.set("v1")
+
+        # Assert
+        assert snapshot.age(clock()) == 45
+        assert cache.time_to_live(snapshot) == 15
+
+    def test_invalid_configuration(self):
+        """Test: max_staleness menor que el TTL es inválido"""
+        # Act & Assert
+        with pytest.raises(ValueError):
+            SnapshotCache(loader=AsyncMock(), ttl=60, max_staleness=10)
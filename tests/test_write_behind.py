@@ -0,0 +1,205 @@
+"""
+Tests para la cola write-behind de persistencia.
+"""
+import pytest
+import asyncio
+from unittest.mock import Mock, AsyncMock, patch
+from sqlmodel import select
+
+from services.write_behind import WriteBehindQueue
+from services.exchange_rate_service import ExchangeRateService
+from repositories.exchange_rate_repository import ExchangeRateRepository
+from repositories.exchange_db_repository import ExchangeDBRepository
+from database.models import ExchangeRateDB
+from models.exchange_rate import ExchangeRate
+
+
+class TestWriteBehindQueue:
+    """Tests para WriteBehindQueue"""
+
+    @pytest.mark.asyncio
+    async def test_flushes_when_batch_is_full(self):
+        """Test: Al juntar max_batch items se escribe sin esperar max_delay"""
+        # Arrange
+        batches = []
+
+        async def flush(batch):
+            batches.append(batch)
+
+        queue = WriteBehindQueue(flush, max_batch=3, max_delay=60, maxsize=10)
+
+        # Act
+        for item in range(3):
+            await queue.put(item)
+        await asyncio.sleep(0.01)
+
+        # Assert
+        assert batches == [[0, 1, 2]]
+        await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_flushes_after_max_delay(self):
+        """Test: Un batch incompleto se escribe al vencer max_delay"""
+        # Arrange
+        batches = []
+
+        async def flush(batch):
+            batches.append(batch)
+
+        queue = WriteBehindQueue(flush, max_batch=10, max_delay=0.01, maxsize=10)
+
+        # Act
+        await queue.put("a")
+        await queue.put("b")
+        await asyncio.sleep(0.05)
+
+        # Assert
+        assert batches == [["a", "b"]]
+        await queue.stop()
+
+    @pytest.mark.asyncio
+    async def test_stop_drains_pending_items(self):
+        """Test: stop() escribe lo pendiente antes de terminar"""
+        # Arrange
+        flushed = []
+
+        async def flush(batch):
+            flushed.extend(batch)
+
+        queue = WriteBehindQueue(flush, max_batch=2, max_delay=60, maxsize=10)
+        for item in range(5):
+            await queue.put(item)
+
+        # Act
+        await queue.stop()
+
+        # Assert
+        assert flushed == [0, 1, 2, 3, 4]
+        assert not queue.is_running
+        assert queue.stats()["flushed"] == 5
+
+    @pytest.mark.asyncio
+    async def test_put_applies_backpressure_when_full(self):
+        """Test: Con la cola llena put() espera a que el worker libere lugar"""
+        # Arrange
+        release = asyncio.Event()
+
+        async def flush(batch):
+            await release.wait()
+
+        queue = WriteBehindQueue(flush, max_batch=1, max_delay=0, maxsize=1)
+        await queue.put(1)          # lo toma el worker y queda bloqueado en flush
+        await asyncio.sleep(0)
+        await queue.put(2)          # ocupa el único lugar de la cola
+
+        # Act
+        blocked = asyncio.create_task(queue.put(3))
+        await asyncio.sleep(0.01)
+
+        # Assert
+        assert not blocked.done()
+        release.set()
+        await asyncio.wait_for(blocked, 1)
+        await queue.stop()
+        assert queue.stats()["flushed"] == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_batch_does_not_stop_worker(self):
+        """Test: Un error en flush se cuenta y el worker sigue procesando"""
+        # Arrange
+        flushed = []
+
+        async def flush(batch):
+            if batch == ["malo"]:
+                raise RuntimeError("disco lleno")
+            flushed.extend(batch)
+
+        queue = WriteBehindQueue(flush, max_batch=1, max_delay=0, maxsize=10)
+
+        # Act
+        await queue.put("malo")
+        await queue.put("bueno")
+        await queue.stop()
+
+        # Assert
+        assert flushed == ["bueno"]
+        assert queue.failed == 1
+
+    def test_rejects_invalid_settings(self):
+        """Test: Parámetros inválidos lanzan ValueError"""
+        with pytest.raises(ValueError):
+            WriteBehindQueue(AsyncMock(), max_batch=0)
+        with pytest.raises(ValueError):
+            WriteBehindQueue(AsyncMock(), maxsize=0)
+
+
+class TestServiceWriteBehind:
+    """Tests para ExchangeRateService con cola write-behind"""
+
+    @pytest.mark.asyncio
+    async def test_service_enqueues_instead_of_writing(self, sample_exchange_data, test_async_session):
+        """Test: El servicio devuelve sin escribir y el worker persiste después"""
+        # Arrange
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(return_value=[
+            ExchangeRate(**data) for data in sample_exchange_data
+        ])
+
+        async def flush(responses):
+            await service.persist_responses_async(responses, test_async_session)
+
+        queue = WriteBehindQueue(flush, max_batch=10, max_delay=60, maxsize=10)
+        service = ExchangeRateService(api_repository=mock_api_repo, persist_queue=queue)
+
+        # Act
+        response = await service.get_all_rates_with_average(persist=True)
+        before = (await test_async_session.exec(select(ExchangeRateDB))).all()
+        await queue.stop()
+        after = (await test_async_session.exec(select(ExchangeRateDB))).all()
+
+        # Assert
+        assert len(response.rates) == 3
+        assert before == []
+        assert {row.type for row in after} == {"oficial", "blue", "bolsa"}
+
+    @pytest.mark.asyncio
+    async def test_failed_flush_is_requeued_on_unchanged_cycle(self, sample_exchange_data, test_async_session):
+        """Test: Si el batch falla, el siguiente ciclo sin cambios vuelve a encolar el snapshot"""
+        # Arrange
+        mock_api_repo = Mock(spec=ExchangeRateRepository)
+        mock_api_repo.get_all_rates = AsyncMock(return_value=[
+            ExchangeRate(**data) for data in sample_exchange_data
+        ])
+        mock_api_repo.get_rates_if_changed = AsyncMock(return_value=None)
+        db_repository = ExchangeDBRepository()
+        upsert = db_repository.upsert_many_async
+        failures = [RuntimeError("database is locked")]
+
+        async def flaky_upsert(rows, session):
+            if failures:
+                raise failures.pop()
+            await upsert(rows, session=session)
+
+        db_repository.upsert_many_async = flaky_upsert
+
+        async def flush(responses):
+            await service.persist_responses_async(responses, test_async_session)
+
+        queue = WriteBehindQueue(flush, max_batch=1, max_delay=0, maxsize=10)
+        service = ExchangeRateService(
+            api_repository=mock_api_repo,
+            db_repository=db_repository,
+            persist_queue=queue
+        )
+
+        # Act: falla el primer batch; los dos ciclos siguientes no traen cambios
+        with patch("builtins.print"):
+            for _ in range(3):
+                await service.get_all_rates_with_average(persist=True)
+                await queue.stop()
+        rows = (await test_async_session.exec(select(ExchangeRateDB))).all()
+
+        # Assert: un solo reintento, y nada más una vez escrito
+        assert queue.failed == 1
+        assert queue.flushed == 1
+        assert {row.type for row in rows} == {"oficial", "blue", "bolsa"}